@@ -1,11 +1,20 @@
 # api/endpoints/energy.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from models.energy_demand import predict_energy_consumption
+from typing import Any, Dict, List, Optional
+from api.responses import FastJSONResponse
+from models.energy_demand import predict_energy_batch, predict_energy_rows, forecast_energy_consumption, energy_cache
+from models.prediction_cache import energy_key
+from models.inference_scheduler import MicroBatcher
+from models.model_registry import registry
 
 router = APIRouter()
 
+# Concurrent /predict calls are coalesced into one batched, off-loop model call.
+scheduler = MicroBatcher("energy", predict_energy_rows)
+
 class EnergyInput(BaseModel):
     timestamp: str  # Format: 'dd/mm/yyyy HH:MM'
     lag_24h: float
@@ -14,12 +23,72 @@ class EnergyInput(BaseModel):
     FF: float
     P: float
 
-@router.post("/predict")
+class EnergyPrediction(BaseModel):
+    timestamp: str  # 'YYYY-MM-DD HH:MM'
+    predictions: Dict[str, int]
+
+class EnergyBatchPrediction(BaseModel):
+    results: List[EnergyPrediction]
+    stats: Dict[str, Any]
+
+class EnergyForecast(BaseModel):
+    start: str
+    horizon: int
+    driver: str
+    timestamps: List[str]
+    forecast: List[int]
+    predictions: Dict[str, List[int]]
+    elapsed_ms: float
+
+@router.post("/predict", response_model=EnergyPrediction)
 async def predict_energy(input_data: EnergyInput):
     try:
         print("Received input data:", input_data)
-        result = predict_energy_consumption(input_data.dict())
+        payload = input_data.dict()
+        key = energy_key(payload)
+        result = energy_cache.get(key)
+        if result is None:
+            result = await scheduler.submit(payload)
+            energy_cache.put(key, result)
         print("Prediction result:", result)
-        return result
+        return FastJSONResponse(result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/predict/batch", response_model=EnergyBatchPrediction)
+async def predict_energy_batch_route(input_data: List[EnergyInput]):
+    if not input_data:
+        raise HTTPException(status_code=400, detail="At least one row is required.")
+    try:
+        result = await run_in_threadpool(predict_energy_batch, [row.dict() for row in input_data])
+        return FastJSONResponse(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/forecast", response_model=EnergyForecast)
+async def forecast_energy(
+    horizon: int = Query(24, ge=1, le=24 * 28),
+    start: Optional[str] = None,  # 'YYYY-MM-DD HH:MM'; defaults to the hour after the history ends
+    model: Optional[str] = None,
+):
+    try:
+        result = await run_in_threadpool(forecast_energy_consumption, start=start, horizon=horizon, driver=model)
+        return FastJSONResponse(result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/models")
+async def energy_model_stats():
+    """Per-model load time and memory of the resident models."""
+    return registry.stats()
+
+@router.get("/scheduler")
+async def energy_scheduler_stats():
+    return scheduler.stats()
+
+
+@router.get("/cache")
+async def energy_cache_stats():
+    return energy_cache.stats()
@@ -1,21 +1,34 @@
 # api/endpoints/faults.py
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from models.fault_prediction import predict_fault
-import math
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Dict, Optional
+from api.responses import FastJSONResponse, dumps_str
+from models.fault_prediction import predict_fault_batch, score_fault_frame, fault_cache, cascade_stats, USE_BULB_STATE
+from models.prediction_cache import fault_key
+from models.inference_scheduler import MicroBatcher
+from models.bulb_state import bulb_state
+import asyncio
+import codecs
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
 
 router = APIRouter()
 
-def clean_nans(obj):
-    if isinstance(obj, float) and math.isnan(obj):
-        return None
-    if isinstance(obj, dict):
-        return {k: clean_nans(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [clean_nans(v) for v in obj]
-    return obj
+BULK_CHUNK_ROWS = int(os.getenv("SMARTGRID_BULK_CHUNK_ROWS", "5000"))
+STREAM_QUEUE_LIMIT = int(os.getenv("SMARTGRID_STREAM_QUEUE_LIMIT", "2048"))
+STREAM_BATCH_MAX = int(os.getenv("SMARTGRID_STREAM_BATCH_MAX", "256"))
+STREAM_BATCH_WINDOW_MS = float(os.getenv("SMARTGRID_STREAM_BATCH_WINDOW_MS", "20"))
 
+# Concurrent /predict calls are coalesced into one batched, off-loop model call.
+scheduler = MicroBatcher("faults", predict_fault_batch)
 
 class FaultInput(BaseModel):
     bulb_number: int
@@ -27,25 +40,387 @@ class FaultInput(BaseModel):
     current_fluctuations_env__Amperes: float
     environmental_conditions: str
 
-@router.post("/predict")
+class BinaryResult(BaseModel):
+    prediction: str
+    probability: Optional[float] = None
+    metrics: Dict[str, Optional[float]]
+
+class MulticlassResult(BaseModel):
+    prediction: str
+    probabilities: Optional[Dict[str, float]] = None
+    metrics: Dict[str, Optional[float]]
+    skipped: Optional[bool] = None  # True when the cascade did not run this stage
+
+class FaultPrediction(BaseModel):
+    binary: Dict[str, BinaryResult]
+    multiclass: Dict[str, MulticlassResult]
+
+def to_model_row(input_data: FaultInput) -> dict:
+    """API field names -> the dataset column names the models were trained on."""
+    return {
+        'bulb_number': input_data.bulb_number,
+        'timestamp': input_data.timestamp,
+        'power_consumption (Watts)': input_data.power_consumption__Watts,
+        'voltage_levels (Volts)': input_data.voltage_levels__Volts,
+        'current_fluctuations (Amperes)': input_data.current_fluctuations__Amperes,
+        'temperature (Celsius)': input_data.temperature__Celsius,
+        'current_fluctuations_env (Amperes)': input_data.current_fluctuations_env__Amperes,
+        'environmental_conditions': input_data.environmental_conditions
+    }
+
+@router.post("/predict", response_model=FaultPrediction)
 async def predict_fault_route(input_data: FaultInput):
     try:
-        data = {
-            'bulb_number': input_data.bulb_number,
-            'timestamp': input_data.timestamp,
-            'power_consumption (Watts)': input_data.power_consumption__Watts,
-            'voltage_levels (Volts)': input_data.voltage_levels__Volts,
-            'current_fluctuations (Amperes)': input_data.current_fluctuations__Amperes,
-            'temperature (Celsius)': input_data.temperature__Celsius,
-            'current_fluctuations_env (Amperes)': input_data.current_fluctuations_env__Amperes,
-            'environmental_conditions': input_data.environmental_conditions
-        }
+        data = to_model_row(input_data)
 
-        result = predict_fault(data)
-        # print("Raw Prediction Result:", data)
-        result = clean_nans(result)
+        if USE_BULB_STATE:
+            # Every reading updates the bulb's rolling state, so it must reach the models.
+            result = await scheduler.submit(data)
+        else:
+            key = fault_key(data)
+            result = fault_cache.get(key)
+            if result is None:
+                result = await scheduler.submit(data)
+                fault_cache.put(key, result)
         # print("Prediction Result:", result)
-        return result
+        return FastJSONResponse(result)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/scheduler")
+async def fault_scheduler_stats():
+    return scheduler.stats()
+
+
+@router.get("/cascade")
+async def fault_cascade_stats():
+    """How often the multiclass stage runs, and the time spent in each stage."""
+    return cascade_stats.stats()
+
+
+@router.get("/state")
+async def bulb_state_stats():
+    return {'bulbs': len(bulb_state), 'window': bulb_state.window, 'bytes': bulb_state.nbytes}
+
+@router.on_event("shutdown")
+def snapshot_bulb_state():
+    bulb_state.snapshot()
+
+
+@router.get("/cache")
+async def fault_cache_stats():
+    return fault_cache.stats()
+
+
+# -------- Bulk scoring --------
+async def _spool_body(request: Request) -> str:
+    """Copy the request body to a temp file and return its path.
+
+    StreamingResponse may consume the receive channel while it streams (to
+    watch for disconnects), so the body is read before the response starts.
+    """
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as spool:
+        async for chunk in request.stream():
+            await run_in_threadpool(spool.write, chunk)
+    return spool.name
+
+
+async def _file_blocks(path: str, size: int = 1 << 20):
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                block = await run_in_threadpool(f.read, size)
+                if not block:
+                    return
+                yield block
+    finally:
+        os.unlink(path)
+
+
+async def _iter_json_array(blocks):
+    """Yield the elements of a JSON array from byte blocks without holding the whole body."""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buf, pos, started = '', 0, False
+    async for chunk in blocks:
+        buf = buf[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ',')):
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError("Body must be a JSON array")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # element continues in the next chunk
+            pos = end
+            yield obj
+    if not started or buf[pos:].strip():
+        raise ValueError("Truncated JSON array")
+
+
+async def _csv_chunks(path: str):
+    try:
+        with pd.read_csv(path, chunksize=BULK_CHUNK_ROWS) as reader:
+            while True:
+                chunk = await run_in_threadpool(next, reader, None)
+                if chunk is None:
+                    return
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+async def _json_chunks(path: str, errors: list):
+    rows, index = [], 0
+    async for obj in _iter_json_array(_file_blocks(path)):
+        try:
+            rows.append(to_model_row(FaultInput(**obj)))
+        except (ValidationError, TypeError) as e:
+            errors.append({'row': index, 'error': str(e)})
+            rows.append(None)
+        index += 1
+        if len(rows) >= BULK_CHUNK_ROWS:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+async def _score_stream(chunks, errors: list):
+    """NDJSON: one line per scored row (plus error lines), then a summary line.
+
+    A chunk that fails to score yields ``{"rows": [first, last], "error": ...}``
+    and the stream continues with the next chunk.
+    """
+    t0 = time.perf_counter()
+    offset = scored = faults = failed = 0
+    try:
+        async for chunk in chunks:
+            size = len(chunk)
+            if isinstance(chunk, list):
+                valid = [(offset + i, r) for i, r in enumerate(chunk) if r is not None]
+                frame = pd.DataFrame([r for _, r in valid])
+                row_numbers = [i for i, _ in valid]
+            else:
+                frame, row_numbers = chunk, None
+            for error in errors:
+                yield dumps_str(error) + "\n"
+            errors.clear()
+            if len(frame):
+                try:
+                    results = await run_in_threadpool(score_fault_frame, frame, offset)
+                except Exception as e:
+                    # Features and the model call are per chunk (placeholder rolling features, no history),
+                    # so the failure cannot be pinned on one row: report the whole chunk and go on.
+                    first, last = (row_numbers[0], row_numbers[-1]) if row_numbers else (offset, offset + size - 1)
+                    yield dumps_str({'rows': [first, last], 'error': f"{type(e).__name__}: {e}"}) + "\n"
+                    failed += len(frame)
+                    offset += size
+                    continue
+                lines = []
+                for j, result in enumerate(results):
+                    if row_numbers is not None:
+                        result['row'] = row_numbers[j]
+                    faults += any(r['prediction'] == 'Fault' for r in result['binary'].values())
+                    lines.append(dumps_str(result))
+                scored += len(results)
+                yield "\n".join(lines) + "\n"
+            offset += size
+    except ValueError as e:
+        # The body itself is malformed (truncated JSON, unparsable CSV), so there is nothing
+        # further to read: report it and stop, keeping what was already streamed.
+        yield dumps_str({'row': offset, 'error': f"{type(e).__name__}: {e}"}) + "\n"
+    for error in errors:
+        yield dumps_str(error) + "\n"
+    elapsed = time.perf_counter() - t0
+    yield dumps_str({'summary': {
+        'rows': offset,
+        'scored': scored,
+        'failed': failed,
+        'faults': faults,
+        'elapsed_ms': round(elapsed * 1000, 3),
+        'rows_per_second': round(scored / elapsed, 1) if elapsed > 0 else None
+    }}) + "\n"
+
+
+@router.post("/predict/bulk")
+async def predict_fault_bulk_csv(file: UploadFile = File(...)):
+    """Score a telemetry CSV (dataset column names) and stream NDJSON results."""
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="File must be .csv")
+    # The upload is closed once this handler returns, so stream from our own spool file.
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as spool:
+        await run_in_threadpool(shutil.copyfileobj, file.file, spool, 1 << 20)
+    errors = []
+    return StreamingResponse(_score_stream(_csv_chunks(spool.name), errors), media_type="application/x-ndjson")
+
+
+@router.post("/predict/bulk/json")
+async def predict_fault_bulk_json(request: Request):
+    """Score a JSON array of FaultInput objects and stream NDJSON results."""
+    path = await _spool_body(request)
+    errors = []
+    return StreamingResponse(_score_stream(_json_chunks(path, errors), errors), media_type="application/x-ndjson")
+
+
+# -------- Streaming ingestion --------
+class _StreamStats:
+    def __init__(self, connection_id: int):
+        self.connection_id = connection_id
+        self.started = time.monotonic()
+        self.received = self.scored = self.alerts = self.invalid = self.failed = self.batches = 0
+        self.max_queue_depth = 0
+        self.score_ms_total = 0.0
+
+    def as_dict(self, queue_depth: int) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            'connection': self.connection_id,
+            'seconds': round(elapsed, 3),
+            'received': self.received,
+            'scored': self.scored,
+            'alerts': self.alerts,
+            'invalid': self.invalid,
+            'failed': self.failed,
+            'batches': self.batches,
+            'mean_batch_size': round(self.scored / self.batches, 2) if self.batches else None,
+            'mean_batch_ms': round(self.score_ms_total / self.batches, 3) if self.batches else None,
+            'readings_per_second': round(self.scored / elapsed, 1) if elapsed > 0 else None,
+            'queue_depth': queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+        }
+
+
+_connection_ids = itertools.count(1)
+_active_streams = {}  # connection id -> (stats, queue)
+
+
+async def _stream_reader(websocket: WebSocket, queue: asyncio.Queue, stats: _StreamStats, send):
+    """Validate incoming readings and queue them; a full queue blocks reading (back-pressure)."""
+    while True:
+        try:
+            message = json.loads(await websocket.receive_text())
+        except ValueError as e:
+            await send({'type': 'error', 'seq': None, 'detail': f"Invalid JSON: {e}"})
+            continue
+        if isinstance(message, dict) and message.get('type') == 'stats':
+            await send({'type': 'stats', **stats.as_dict(queue.qsize())})
+            continue
+        readings = message.get('readings', [message]) if isinstance(message, dict) else message
+        if not isinstance(readings, list):
+            await send({'type': 'error', 'seq': None,
+                        'detail': "Send a reading object, a JSON array or {\"readings\": [...]}"})
+            continue
+        for reading in readings:
+            seq = stats.received
+            stats.received += 1
+            try:
+                row = to_model_row(FaultInput(**reading))
+            except (ValidationError, TypeError) as e:
+                stats.invalid += 1
+                await send({'type': 'error', 'seq': seq, 'detail': str(e)})
+                continue
+            await queue.put((seq, row))
+            stats.max_queue_depth = max(stats.max_queue_depth, queue.qsize())
+
+
+async def _stream_scorer(queue: asyncio.Queue, stats: _StreamStats, send, alerts_only: bool):
+    """Score queued readings in micro-batches and push results back."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + STREAM_BATCH_WINDOW_MS / 1000
+        while len(batch) < STREAM_BATCH_MAX:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        t0 = time.perf_counter()
+        try:
+            results = await run_in_threadpool(predict_fault_batch, [row for _, row in batch])
+        except Exception as e:
+            # Report the readings of the failed batch and keep the connection scoring.
+            stats.failed += len(batch)
+            for seq, _ in batch:
+                await send({'type': 'error', 'seq': seq, 'detail': f"{type(e).__name__}: {e}"})
+            continue
+        stats.score_ms_total += (time.perf_counter() - t0) * 1000
+        stats.batches += 1
+        stats.scored += len(batch)
+
+        messages = []
+        for (seq, row), result in zip(batch, results):
+            is_fault = any(r['prediction'] == 'Fault' for r in result['binary'].values())
+            stats.alerts += is_fault
+            if is_fault or not alerts_only:
+                messages.append({
+                    'type': 'alert' if is_fault else 'result',
+                    'seq': seq,
+                    'bulb_number': row['bulb_number'],
+                    'timestamp': row['timestamp'],
+                    'binary': result['binary'],
+                    'multiclass': result['multiclass'],
+                })
+        for message in messages:
+            await send(message)
+
+
+@router.websocket("/stream")
+async def fault_stream(websocket: WebSocket, alerts_only: bool = True):
+    """Continuous fault detection over one WebSocket.
+
+    Send FaultInput objects (one per message, a JSON array, or
+    ``{"readings": [...]}``); fault alerts come back on the same connection
+    (every result when ``alerts_only=false``). Send ``{"type": "stats"}`` for
+    this connection's throughput counters.
+    """
+    await websocket.accept()
+    stats = _StreamStats(next(_connection_ids))
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_LIMIT)
+    _active_streams[stats.connection_id] = (stats, queue)
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict):
+        async with send_lock:
+            await websocket.send_text(dumps_str(message))
+
+    reader = asyncio.create_task(_stream_reader(websocket, queue, stats, send))
+    scorer = asyncio.create_task(_stream_scorer(queue, stats, send, alerts_only))
+    try:
+        done, _ = await asyncio.wait({reader, scorer}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                print(f"Fault stream {stats.connection_id} closed: {error}")
+                try:
+                    await websocket.close(code=1011)
+                except RuntimeError:
+                    pass
+    finally:
+        reader.cancel()
+        scorer.cancel()
+        _active_streams.pop(stats.connection_id, None)
+        print(f"Fault stream {stats.connection_id} finished: {stats.as_dict(queue.qsize())}")
+
+
+@router.get("/stream/stats")
+async def fault_stream_stats():
+    return [stats.as_dict(queue.qsize()) for stats, queue in _active_streams.values()]
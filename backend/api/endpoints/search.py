@@ -1,13 +1,24 @@
 # api/endpoints/search.py
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Union
+from api.responses import FastJSONResponse
 from models.fast_search import FastTimestampSearch
+from models.search_snapshot import SnapshotError
+from fastapi.concurrency import run_in_threadpool
 import pandas as pd
-import io
+import os
+import tempfile
+import threading
 
 router = APIRouter()
 
 MODEL_PATH = "models/ml_models/model.joblib"
+BATCH_MAX_QUERIES = int(os.getenv("SMARTGRID_SEARCH_BATCH_MAX", "100000"))
+BATCH_MAX_K = int(os.getenv("SMARTGRID_SEARCH_BATCH_MAX_K", "1000"))
+# Uploads are spooled here before parsing; unset means the system temp directory.
+UPLOAD_DIR = os.getenv("SMARTGRID_UPLOAD_DIR") or None
+UPLOAD_BLOCK_BYTES = 1 << 20
 searcher = FastTimestampSearch()
 dataset_loaded = False
 print(searcher.timestamp_col)
@@ -17,9 +28,45 @@ print(searcher.timestamp_col)
 # except FileNotFoundError:
 #     raise RuntimeError(f"❌ model not found at {MODEL_PATH}")
 
+# Restore the last persisted index so a restart does not need a re-upload.
+try:
+    dataset_loaded = searcher.load_snapshot()
+except SnapshotError as e:
+    print(f"Ignoring search index snapshot: {e}")
+
+def _snapshot_in_background():
+    threading.Thread(target=searcher.save_snapshot, daemon=True).start()
+
 # -------- Models --------
+class SearchFilters(BaseModel):
+    bulb_number: Optional[int] = None
+    environmental_conditions: Optional[str] = None
+    fault_type: Optional[int] = None
+
 class TimestampQuery(BaseModel):
     timestamp: str
+    backend: Optional[str] = None  # 'balltree' or 'sorted'; defaults to SMARTGRID_SEARCH_BACKEND
+    # Filters or a time window switch to the per-partition sorted indexes (distances in seconds).
+    filters: Optional[SearchFilters] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+class RangeQuery(BaseModel):
+    start: Optional[str] = None
+    end: Optional[str] = None
+    limit: int = 1000
+    filters: Optional[SearchFilters] = None
+
+class LastQuery(BaseModel):
+    timestamp: str
+    n: int = 10
+    filters: Optional[SearchFilters] = None
+
+class BatchQuery(BaseModel):
+    timestamps: List[str]
+    k: Union[int, List[int]] = 5  # one k for all, or one per timestamp
+    columns: Optional[List[str]] = None  # dataset columns to return; all by default
+    backend: Optional[str] = None
 
 class BulbEntry(BaseModel):
     bulb_number: int
@@ -31,48 +78,163 @@ class BulbEntry(BaseModel):
     current_fluctuations_env__Amperes: float
     environmental_conditions: str
 
+class SearchResult(BaseModel):
+    query_timestamp: str
+    elapsed_ms: float
+    neighbours: List[Dict[str, Any]]  # dataset columns plus "distance" (seconds with the sorted backend)
+
+class BatchSearchResult(BaseModel):
+    queries: int
+    elapsed_ms: float
+    # Neighbours of query i are positions offsets[i]:offsets[i + 1] of the flat lists below.
+    offsets: List[int]
+    indices: List[int]
+    distances: List[float]
+    columns: Dict[str, List[Any]]
+
+class RowsResult(BaseModel):
+    count: int
+    elapsed_ms: float
+    rows: List[Dict[str, Any]]
+
+def _filters(filters: Optional[SearchFilters]) -> dict:
+    return {k: v for k, v in filters.dict().items() if v is not None} if filters else {}
 
 
+
+async def _spool_upload(file: UploadFile, suffix: str) -> str:
+    """Copy an upload to a temporary file one block at a time; returns its path."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=UPLOAD_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while block := await file.read(UPLOAD_BLOCK_BYTES):
+                out.write(block)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
 @router.post("/search/upload")
-async def upload_dataset(file: UploadFile = File(...)):
+async def upload_dataset(file: UploadFile = File(...), timestamp_format: Optional[str] = Form(None)):
+    """Load a .csv or .xlsx dataset. ``timestamp_format`` (strftime, or 'ISO8601')
+    defaults to SMARTGRID_TIMESTAMP_FORMAT for CSVs."""
     global dataset_loaded
     if not file.filename.endswith(('.csv', '.xlsx')):
         raise HTTPException(status_code=400, detail="File must be .csv or .xlsx")
+    file_type = 'csv' if file.filename.endswith('.csv') else 'excel'
+    path = await _spool_upload(file, os.path.splitext(file.filename)[1])
     try:
-        contents = await file.read()
-        file_obj = io.BytesIO(contents)
-        file_type = 'csv' if file.filename.endswith('.csv') else 'excel'
-        searcher.load_data(file_obj, file_type)
-        dataset_loaded = True
-        return {"message": "Dataset uploaded and BallTree built."}
+        # Parsed and indexed off the event loop; queries keep using the current
+        # index until the new one is published.
+        stats = await run_in_threadpool(searcher.ingest, path, file_type, timestamp_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        print(f"Error loading data: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        os.unlink(path)
+    dataset_loaded = True
+    _snapshot_in_background()
+    return {"message": "Dataset uploaded and BallTree built.", **stats}
 
 
 # -------- Search Endpoint --------
-@router.post("/search")
+@router.post("/search", response_model=SearchResult)
 async def search_timestamp(query: TimestampQuery):
     if not dataset_loaded:
         raise HTTPException(status_code=400, detail="Dataset not loaded yet.")
     
     try:
-        idx, dist, ms = searcher.search(query.timestamp, k=5)
+        index = searcher.index  # rows below come from the same snapshot as the neighbours
+        idx, dist, ms = searcher.search(query.timestamp, k=5, backend=query.backend,
+                                        filters=_filters(query.filters), start=query.start, end=query.end,
+                                        index=index)
         print(f"Search completed in {ms} ms, found {len(idx)} neighbours")
         if len(idx) == 0:
             raise HTTPException(status_code=404, detail="No neighbours found")
 
-        rows = searcher.data.iloc[idx].copy()
+        rows = index.rows(idx)
         rows["distance"] = dist.round(4)
 
-        return {
+        return FastJSONResponse({
             "query_timestamp": query.timestamp,
             "elapsed_ms": round(ms, 3),
             "neighbours": rows.to_dict(orient="records")
-        }
+        })
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error during search: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error during search: {str(e)}")
 
+@router.post("/search/batch", response_model=BatchSearchResult)
+async def search_batch(query: BatchQuery):
+    """Neighbours for many timestamps in one vectorized query, returned column-wise."""
+    if not dataset_loaded:
+        raise HTTPException(status_code=400, detail="Dataset not loaded yet.")
+    if len(query.timestamps) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUERIES} timestamps per batch")
+    if max(query.k if isinstance(query.k, list) else [query.k], default=0) > BATCH_MAX_K:
+        raise HTTPException(status_code=400, detail=f"k must be at most {BATCH_MAX_K}")
+    try:
+        index = searcher.index
+        offsets, idx, dist, ms = await run_in_threadpool(
+            searcher.search_batch, query.timestamps, k=query.k, backend=query.backend, index=index)
+        columns = index.columns_at(idx, query.columns)
+        print(f"Batch search of {len(query.timestamps)} timestamps completed in {ms} ms")
+        return FastJSONResponse({
+            "queries": len(query.timestamps),
+            "elapsed_ms": round(ms, 3),
+            "offsets": offsets,
+            "indices": idx,
+            "distances": dist.round(4),
+            "columns": columns,
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error during batch search: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error during batch search: {str(e)}")
+
+def _rows_response(idx, ms, index):
+    return FastJSONResponse({
+        "count": len(idx),
+        "elapsed_ms": round(ms, 3),
+        "rows": index.rows(idx).to_dict(orient="records")
+    })
+
+@router.post("/range", response_model=RowsResult)
+async def search_range(query: RangeQuery):
+    """Rows with start <= timestamp <= end, in time order."""
+    if not dataset_loaded:
+        raise HTTPException(status_code=400, detail="Dataset not loaded yet.")
+    try:
+        index = searcher.index
+        idx, ms = searcher.search_range(query.start, query.end, query.limit, filters=_filters(query.filters),
+                                        index=index)
+        return _rows_response(idx, ms, index)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/last", response_model=RowsResult)
+async def search_last(query: LastQuery):
+    """The n latest rows at or before a timestamp, most recent first."""
+    if not dataset_loaded:
+        raise HTTPException(status_code=400, detail="Dataset not loaded yet.")
+    try:
+        index = searcher.index
+        idx, ms = searcher.last_before(query.timestamp, query.n, filters=_filters(query.filters), index=index)
+        return _rows_response(idx, ms, index)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # -------- Add Bulb Endpoint --------
 @router.post("/add")
 async def add_bulb(entry: BulbEntry):
@@ -99,8 +261,24 @@ async def add_bulb(entry: BulbEntry):
         print(f"Entry added: {entry_dict}")
         global dataset_loaded
         dataset_loaded = True  # Ensure dataset is marked as loaded after adding entry
-        return {"message": "Bulb entry added and BallTree rebuilt."}
+        return {"message": "Bulb entry added.", "records": len(searcher), "version": searcher.index.version}
     except Exception as e:
         print(f"Error adding bulb entry: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# -------- Snapshots --------
+@router.post("/snapshot")
+async def save_search_snapshot():
+    """Persist the current rows and index now (also done after uploads and at shutdown)."""
+    if not dataset_loaded:
+        raise HTTPException(status_code=400, detail="Dataset not loaded yet.")
+    try:
+        path = await run_in_threadpool(searcher.save_snapshot)
+        return {"message": "Snapshot written.", "path": path, "records": len(searcher)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.on_event("shutdown")
+def snapshot_search_index():
+    if dataset_loaded and searcher.dirty:
+        searcher.save_snapshot()
@@ -0,0 +1,65 @@
+# api/responses.py
+# JSON encoding shared by the routers. NumPy scalars and arrays, pandas
+# Timestamps and NaN/inf (as null) are handled while the response is encoded,
+# so endpoints can return model output as-is instead of cleaning it first.
+# Uses orjson when it is installed and falls back to the stdlib encoder.
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _default(obj):
+    """Types orjson does not encode natively (non-contiguous arrays, Timestamps, NaT, other NumPy scalars)."""
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _clean(obj):
+    """Stdlib fallback: a plain-Python copy with NaN/inf as None."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k if isinstance(k, str) else str(k): _clean(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_clean(v) for v in obj]
+    if isinstance(obj, (np.ndarray, np.generic, pd.Timestamp)) or obj is pd.NaT:
+        return _clean(_default(obj))
+    return obj
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(_clean(content), separators=(',', ':'), allow_nan=False).encode()
+
+
+def dumps_str(content) -> str:
+    """``dumps`` for text channels (NDJSON lines, WebSocket messages)."""
+    return dumps(content).decode()
+
+
+class FastJSONResponse(JSONResponse):
+    """Returned directly by hot endpoints, which also skips FastAPI's jsonable_encoder
+    and response-model validation; the ``response_model`` of the route then only
+    documents the schema."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,36 @@
+# benchmarks/energy_batch.py
+# Throughput of /energy/predict/batch's scoring path as N grows.
+# Run from backend/:  python -m benchmarks.energy_batch --sizes 1 10 100 1000
+
+import argparse
+import time
+
+from benchmarks.payloads import energy_payloads
+from models.energy_demand import predict_energy_batch, predict_energy_consumption
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--single-max', type=int, default=100,
+                        help="largest N also timed as N single-row calls")
+    args = parser.parse_args()
+
+    predict_energy_batch(energy_payloads(4))  # warm-up: loads every model
+    print(f"{'N':>6} {'batch ms':>10} {'rows/s':>10} {'single ms':>10} {'speed-up':>9}")
+    for n in args.sizes:
+        payloads = energy_payloads(n, seed=n)
+        stats = predict_energy_batch(payloads)['stats']
+        single_ms = None
+        if n <= args.single_max:
+            t0 = time.perf_counter()
+            for p in payloads:
+                predict_energy_consumption(p)
+            single_ms = (time.perf_counter() - t0) * 1000
+        speedup = f"{single_ms / stats['elapsed_ms']:.1f}x" if single_ms else '-'
+        single = f"{single_ms:.1f}" if single_ms else '-'
+        print(f"{n:>6} {stats['elapsed_ms']:>10.1f} {stats['rows_per_second']:>10.1f} {single:>10} {speedup:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/fault_cascade.py
+# Latency of fault scoring with the binary -> multiclass cascade against the
+# full path (both stages on every row) and the previous path (separate
+# predict and predict_proba calls plus a per-row roc_auc_score).
+# Run from backend/:  python -m benchmarks.fault_cascade --rows 2000 --batch 1 64 --threshold 0.5
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+
+import models.fault_prediction as fp
+from benchmarks.payloads import fault_rows, percentiles
+from models.feature_kernels import fault_feature_matrix, parse_fault_time
+
+
+def _model_rows(n: int) -> list:
+    df = fault_rows(n, seed=5)
+    df['timestamp'] = pd.to_datetime(df['timestamp']).dt.strftime('%d/%m/%Y %H:%M')
+    return df.drop(columns=[c for c in ('fault_type',) if c in df]).to_dict(orient='records')
+
+
+def _previous_batch(rows: list) -> list:
+    # Scoring as it was before the cascade: predict and predict_proba on both
+    # models for every row, and roc_auc_score on each single sample.
+    X = fault_feature_matrix(rows, [parse_fault_time(r['timestamp']) for r in rows])
+    models = fp.load_fault_models()
+    out = []
+    for name, model in models['binary'].items():
+        preds, probas = model.predict(X), model.predict_proba(X)[:, 1]
+        for p, pr in zip(preds, probas):
+            try:
+                roc_auc_score([1 if p == 'Fault' else 0], [pr])
+            except ValueError:
+                pass
+        out.append(preds)
+    for name, model in models['multiclass'].items():
+        out.append((model.predict(X), model.predict_proba(X)))
+    return out
+
+
+def _time(fn, rows: list, batch: int) -> dict:
+    latencies = []
+    for i in range(0, len(rows), batch):
+        t0 = time.perf_counter()
+        fn(rows[i:i + batch])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    total = sum(latencies)
+    return {'latency_ms': percentiles(latencies), 'rows_per_second': round(len(rows) / total * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 64])
+    parser.add_argument('--threshold', type=float, default=fp.FAULT_CASCADE_THRESHOLD)
+    args = parser.parse_args()
+
+    fp.USE_BULB_STATE = False  # keep the state store (and its snapshots) out of the timings
+    fp.FAULT_CASCADE_THRESHOLD = args.threshold
+    rows = _model_rows(args.rows)
+    fp.predict_fault_batch(rows[:8])  # warm-up: loads the models
+
+    print(f"{'path':<10} {'batch':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rows/s':>10} {'skip rate':>10}")
+    for batch in args.batch:
+        for path in ('previous', 'full', 'cascade'):
+            if path == 'previous':
+                fn = _previous_batch
+            else:
+                fp.FAULT_CASCADE = path == 'cascade'
+                fn = fp.predict_fault_batch
+            fp.cascade_stats = fp.CascadeStats()
+            r = _time(fn, rows, batch)
+            skip = fp.cascade_stats.stats()['skip_rate'] if path != 'previous' else None
+            lat = r['latency_ms']
+            print(f"{path:<10} {batch:>6} {lat['p50']:>9} {lat['p95']:>9} {lat['p99']:>9} "
+                  f"{r['rows_per_second']:>10} {skip if skip is not None else '-':>10}")
+
+    # The binary stage is identical in both modes; only skipped rows differ in the multiclass result.
+    fp.FAULT_CASCADE = False
+    full = fp.predict_fault_batch(rows)
+    fp.FAULT_CASCADE = True
+    cascade = fp.predict_fault_batch(rows)
+    assert all(a['binary'] == b['binary'] for a, b in zip(full, cascade))
+    escalated = [a['multiclass'] == b['multiclass'] for a, b in zip(full, cascade)
+                 if not any(r.get('skipped') for r in b['multiclass'].values())]
+    assert all(escalated)
+    print(f"\ncascade matches the full path on {len(escalated)} escalated rows; "
+          f"{np.mean([r != 'No Fault' for r in (next(iter(a['multiclass'].values()))['prediction'] for a in full)]):.1%} "
+          f"of rows have a non-'No Fault' multiclass prediction on the full path")
+
+
+if __name__ == '__main__':
+    main()
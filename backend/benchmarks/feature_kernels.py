@@ -0,0 +1,52 @@
+# benchmarks/feature_kernels.py
+# Parity and per-call latency of the DataFrame-free feature kernels against
+# the pandas reference implementations.
+# Run from backend/:  python -m benchmarks.feature_kernels --rows 2000
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.payloads import energy_payloads, fault_rows
+from models.energy_demand import FEATURES, build_feature_frame
+from models.fault_prediction import create_features_batch
+from models.feature_kernels import energy_feature_row, fault_feature_row
+
+
+def _per_call_us(fn, items):
+    t0 = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - t0) * 1e6 / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    energy = energy_payloads(args.rows)
+    faults = fault_rows(args.rows).drop(columns=['fault_type']).to_dict(orient='records')
+
+    # Parity: every row must match the reference bit for bit.
+    for p in energy:
+        expected = build_feature_frame([p])[FEATURES].to_numpy(dtype=float)[0]
+        np.testing.assert_array_equal(energy_feature_row(p), expected, err_msg=str(p))
+    for r in faults:
+        expected = create_features_batch([r]).to_numpy(dtype=float)[0]
+        np.testing.assert_array_equal(fault_feature_row(r), expected, err_msg=str(r))
+    print(f"parity OK on {len(energy)} energy and {len(faults)} fault rows")
+
+    sample_e, sample_f = energy[:500], faults[:500]
+    ref_e = _per_call_us(lambda p: build_feature_frame([p])[FEATURES].to_numpy(), sample_e)
+    fast_e = _per_call_us(energy_feature_row, sample_e)
+    ref_f = _per_call_us(lambda r: create_features_batch([r]).to_numpy(), sample_f)
+    fast_f = _per_call_us(fault_feature_row, sample_f)
+    print(f"{'kernel':<8} {'pandas us':>10} {'fast us':>9} {'speed-up':>9}")
+    print(f"{'energy':<8} {ref_e:>10.1f} {fast_e:>9.1f} {ref_e / fast_e:>8.1f}x")
+    print(f"{'fault':<8} {ref_f:>10.1f} {fast_f:>9.1f} {ref_f / fast_f:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
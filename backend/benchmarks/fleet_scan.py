@@ -0,0 +1,41 @@
+# benchmarks/fleet_scan.py
+# Scaling of the sharded fleet scan from 1 to N worker processes, plus a check
+# that every worker count produces the same per-bulb summary.
+# Run from backend/:  python -m benchmarks.fleet_scan --workers 1 2 4 8 --repeat 4
+
+import argparse
+import os
+
+import pandas as pd
+
+from benchmarks.payloads import FAULT_CSV
+from models.fleet_scan import fleet_scan
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--repeat', type=int, default=1, help="tile the dataset this many times (new bulb ids)")
+    args = parser.parse_args()
+
+    base = pd.read_csv(FAULT_CSV)
+    offset = int(base['bulb_number'].max()) + 1
+    df = pd.concat([base.assign(bulb_number=base['bulb_number'] + i * offset) for i in range(args.repeat)],
+                   ignore_index=True)
+    print(f"{len(df)} readings, {df['bulb_number'].nunique()} bulbs")
+
+    reference, base_s = None, None
+    print(f"{'workers':>8} {'shards':>7} {'features s':>11} {'scan s':>8} {'rows/s':>11} {'speed-up':>9}")
+    for n in args.workers:
+        result = fleet_scan(df, workers=n)
+        if reference is None:
+            reference = result['bulbs']
+        assert result['bulbs'] == reference, f"per-bulb results differ with {n} workers"
+        t = result['timing']
+        base_s = base_s or t['scan_s']
+        print(f"{n:>8} {t['shards']:>7} {t['features_s']:>11.3f} {t['scan_s']:>8.3f} "
+              f"{t['rows_per_second']:>11} {base_s / t['scan_s']:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/load_test.py
+# In-process load test of every API router through an ASGI client.
+#
+# Run from backend/:
+#   python -m benchmarks.load_test --requests 500 --concurrency 16 --save benchmarks/baselines/main.json
+#   python -m benchmarks.load_test --compare benchmarks/baselines/main.json
+#
+# Needs httpx (the ASGI transport); payloads are sampled from data/*.csv.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.payloads import FAULT_CSV, energy_payloads, fault_payloads, fault_rows, percentiles
+
+SCENARIOS = ['energy_predict', 'fault_predict', 'search_upload', 'search_query', 'search_add']
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def _upload_csv(rows: int) -> bytes:
+    return fault_rows(rows, seed=1).to_csv(index=False).encode()
+
+
+def _search_timestamps(n: int) -> list:
+    ts = pd.to_datetime(pd.read_csv(FAULT_CSV, usecols=['timestamp'])['timestamp'])
+    return ts.sample(n=n, replace=True, random_state=2).dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+
+
+def _search_entries(n: int) -> list:
+    entries = fault_payloads(n, seed=3)
+    for e in entries:
+        e['timestamp'] = pd.to_datetime(e['timestamp'], dayfirst=True).strftime('%Y-%m-%d %H:%M:%S')
+    return entries
+
+
+async def _drive(client, requests: list, concurrency: int) -> dict:
+    """Send ``requests`` (callables returning an awaitable response) with at most ``concurrency`` in flight."""
+    latencies, errors = [], 0
+    queue = list(reversed(requests))
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            make = queue.pop()
+            t0 = time.perf_counter()
+            try:
+                response = await make(client)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += not ok
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(requests)) or 1)))
+    elapsed = time.perf_counter() - t0
+    return {
+        'requests': len(requests),
+        'errors': errors,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(requests) / elapsed, 1) if elapsed > 0 else None,
+        'latency_ms': percentiles(latencies),
+    }
+
+
+def _build_requests(name: str, n: int, args) -> list:
+    if name == 'energy_predict':
+        return [lambda c, p=p: c.post('/energy/predict', json=p) for p in energy_payloads(n)]
+    if name == 'fault_predict':
+        return [lambda c, p=p: c.post('/faults/predict', json=p) for p in fault_payloads(n)]
+    if name == 'search_upload':
+        body = _upload_csv(args.upload_rows)
+        return [lambda c: c.post('/search/search/upload', files={'file': ('telemetry.csv', body, 'text/csv')})
+                for _ in range(max(1, n // 50))]
+    if name == 'search_query':
+        return [lambda c, t=t: c.post('/search/search', json={'timestamp': t}) for t in _search_timestamps(n)]
+    if name == 'search_add':
+        return [lambda c, e=e: c.post('/search/add', json=e) for e in _search_entries(n)]
+    raise ValueError(f"Unknown scenario {name}")
+
+
+async def run(args) -> dict:
+    import httpx
+    from main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+        # The search routes need a dataset; upload one before anything else touches them.
+        await client.post('/search/search/upload',
+                          files={'file': ('telemetry.csv', _upload_csv(args.upload_rows), 'text/csv')})
+        for name in args.scenarios:
+            requests = _build_requests(name, args.requests, args)
+            if args.warmup:
+                await _drive(client, requests[:args.warmup], args.concurrency)
+            results[name] = await _drive(client, requests, args.concurrency)
+            results[name]['peak_rss_mb'] = round(_peak_rss_mb(), 1)
+            r = results[name]
+            print(f"{name:<15} {r['throughput_rps']:>9} req/s  p50 {r['latency_ms']['p50']:>9} ms  "
+                  f"p95 {r['latency_ms']['p95']:>9} ms  p99 {r['latency_ms']['p99']:>9} ms  "
+                  f"errors {r['errors']}  rss {r['peak_rss_mb']} MB")
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'upload_rows': args.upload_rows,
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> bool:
+    """Print p99/throughput deltas; False if any p99 regressed by more than ``tolerance``."""
+    ok = True
+    print(f"\n{'scenario':<15} {'p99 base':>10} {'p99 now':>10} {'delta':>8} {'rps base':>10} {'rps now':>10}")
+    for name, now in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        b99, n99 = base['latency_ms']['p99'], now['latency_ms']['p99']
+        delta = (n99 - b99) / b99 if b99 else 0.0
+        flag = ''
+        if delta > tolerance:
+            ok, flag = False, '  REGRESSION'
+        print(f"{name:<15} {b99:>10} {n99:>10} {delta:>+7.1%} {base['throughput_rps']:>10} "
+              f"{now['throughput_rps']:>10}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200, help="requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--upload-rows', type=int, default=5000)
+    parser.add_argument('--scenarios', nargs='+', default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument('--save', help="write the results as a JSON baseline")
+    parser.add_argument('--compare', help="baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed p99 regression (fraction)")
+    args = parser.parse_args()
+
+    current = asyncio.run(run(args))
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(current, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
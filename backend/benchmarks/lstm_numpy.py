@@ -0,0 +1,73 @@
+# benchmarks/lstm_numpy.py
+# Numerical parity of the NumPy LSTM with the Keras model, plus startup time
+# and resident memory of a process that loads each. Needs TensorFlow installed.
+# Run from backend/:  python -m benchmarks.lstm_numpy
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from models.energy_demand import LSTM_PATH, SEQ_LEN, FEATURES
+from models.lstm_numpy import NumpyLSTMModel
+
+_STARTUP = {
+    'numpy': (
+        "from models.lstm_numpy import NumpyLSTMModel\n"
+        "m = NumpyLSTMModel.from_h5({path!r})\n"
+        "import numpy as np; m(np.zeros((1, 24, 12), dtype=np.float32))\n"
+    ),
+    'keras': (
+        "from models.energy_demand import _load_keras_lstm\n"
+        "m = _load_keras_lstm({path!r})\n"
+        "import numpy as np; m(np.zeros((1, 24, 12), dtype=np.float32))\n"
+    ),
+}
+
+
+def _startup(backend: str) -> dict:
+    code = (
+        "import time, resource, json\nt0 = time.perf_counter()\n"
+        + _STARTUP[backend].format(path=LSTM_PATH)
+        + "print(json.dumps({'seconds': time.perf_counter() - t0,"
+          " 'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))\n"
+    )
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=512)
+    args = parser.parse_args()
+
+    from models.energy_demand import _load_keras_lstm
+    keras_model = _load_keras_lstm(LSTM_PATH)
+    numpy_model = NumpyLSTMModel.from_h5(LSTM_PATH)
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((args.rows, SEQ_LEN, len(FEATURES))).astype(np.float32)
+    expected = np.asarray(keras_model(X))
+    got = numpy_model(X)
+    np.testing.assert_allclose(got, expected, rtol=1e-4, atol=1e-3)
+    np.testing.assert_allclose(numpy_model(X[:1]), np.asarray(keras_model(X[:1])), rtol=1e-4, atol=1e-3)
+    print(f"parity OK on {args.rows} sequences (max abs diff {np.abs(got - expected).max():.2e})")
+
+    for label, model in (('keras', keras_model), ('numpy', numpy_model)):
+        for n in (1, args.rows):
+            model(X[:n])
+            t0 = time.perf_counter()
+            for _ in range(20):
+                model(X[:n])
+            print(f"{label:<6} batch {n:>5}: {(time.perf_counter() - t0) * 1000 / 20:8.2f} ms")
+
+    for backend in ('keras', 'numpy'):
+        r = _startup(backend)
+        print(f"{backend:<6} startup {r['seconds']:6.2f} s, max RSS {r['max_rss_mb']:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/payloads.py
+# Realistic request payloads sampled from the bundled datasets.
+
+import numpy as np
+import pandas as pd
+
+ENERGY_CSV = "data/merged_consumption_weather.csv"
+FAULT_CSV = "data/street_light_fault_prediction_dataset.csv"
+
+
+def energy_payloads(n: int, seed: int = 0) -> list:
+    """``n`` EnergyInput-shaped dicts taken from consecutive-day rows of the consumption data."""
+    df = pd.read_csv(ENERGY_CSV)
+    df['Time'] = pd.to_datetime(df['Time'], format='%d/%m/%Y %H:%M')
+    df['lag_24h'] = df['building 41'].shift(24)
+    df = df.dropna(subset=['lag_24h', 'Temp', 'RH', 'FF', 'P'])
+    rows = df.sample(n=n, replace=n > len(df), random_state=seed)
+    return [
+        {
+            'timestamp': t.strftime('%Y-%m-%d %H:%M'),
+            'lag_24h': float(lag),
+            'Temp': float(temp),
+            'RH': float(rh) * 100,
+            'FF': float(ff),
+            'P': float(p),
+        }
+        for t, lag, temp, rh, ff, p in zip(rows['Time'], rows['lag_24h'], rows['Temp'],
+                                           rows['RH'], rows['FF'], rows['P'])
+    ]
+
+
+def fault_rows(n: int, seed: int = 0) -> pd.DataFrame:
+    df = pd.read_csv(FAULT_CSV)
+    return df.sample(n=n, replace=n > len(df), random_state=seed).reset_index(drop=True)
+
+
+def fault_payloads(n: int, seed: int = 0) -> list:
+    """``n`` FaultInput-shaped dicts (API field names) from the street-light dataset."""
+    rows = fault_rows(n, seed)
+    return [
+        {
+            'bulb_number': int(r['bulb_number']),
+            'timestamp': pd.Timestamp(r['timestamp']).strftime('%d/%m/%Y %H:%M'),
+            'power_consumption__Watts': float(r['power_consumption (Watts)']),
+            'voltage_levels__Volts': float(r['voltage_levels (Volts)']),
+            'current_fluctuations__Amperes': float(r['current_fluctuations (Amperes)']),
+            'temperature__Celsius': float(r['temperature (Celsius)']),
+            'current_fluctuations_env__Amperes': float(r['current_fluctuations_env (Amperes)']),
+            'environmental_conditions': str(r['environmental_conditions']),
+        }
+        for _, r in rows.iterrows()
+    ]
+
+
+def percentiles(samples_ms) -> dict:
+    a = np.asarray(samples_ms, dtype=float)
+    if a.size == 0:
+        return {'p50': None, 'p95': None, 'p99': None}
+    return {
+        'p50': round(float(np.percentile(a, 50)), 3),
+        'p95': round(float(np.percentile(a, 95)), 3),
+        'p99': round(float(np.percentile(a, 99)), 3),
+    }
@@ -0,0 +1,75 @@
+# benchmarks/search_batch.py
+# FastTimestampSearch.search_batch against a loop of single searches: queries
+# per second for both backends, and a check that every query returns the same
+# neighbours either way (rows in the delta buffer included).
+# Run from backend/:  python -m benchmarks.search_batch --rows 200000 --queries 1000 20000
+
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.payloads import fault_rows
+from models.fast_search import FastTimestampSearch
+
+
+def _stamps(searcher: FastTimestampSearch, n: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    times = searcher.store.column(searcher.timestamp_col)
+    lo, hi = times.min().astype(np.int64), times.max().astype(np.int64)
+    picked = rng.integers(lo, hi, n).astype('datetime64[ns]')
+    return pd.DatetimeIndex(picked).strftime('%Y-%m-%d %H:%M:%S').tolist()
+
+
+def _check_same(searcher: FastTimestampSearch, stamps: list, ks: np.ndarray, backend: str):
+    offsets, idx, dist, _ = searcher.search_batch(stamps, k=ks, backend=backend)
+    for i, (ts, k) in enumerate(zip(stamps, ks)):
+        one_idx, one_dist, _ = searcher.search(ts, k=int(k), backend=backend)
+        got = slice(offsets[i], offsets[i + 1])
+        assert np.allclose(dist[got], one_dist, rtol=0, atol=1e-6), (backend, ts, dist[got], one_dist)
+        # Ties may come back in another order; the distances above pin the neighbour set.
+        assert offsets[i + 1] - offsets[i] == len(one_idx)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--adds', type=int, default=500, help="rows left in the delta buffer")
+    parser.add_argument('--queries', type=int, nargs='+', default=[1000, 20_000])
+    parser.add_argument('--loop-max', type=int, default=5000, help="largest batch also run as single searches")
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    searcher = FastTimestampSearch()
+    searcher.load_data(io.BytesIO(fault_rows(args.rows, seed=1).to_csv(index=False).encode()), 'csv')
+    for entry in fault_rows(args.adds, seed=2).to_dict(orient='records'):
+        searcher.add_entry(entry)
+    print(f"{len(searcher)} rows, tree covers {searcher.index.n_tree}")
+
+    rng = np.random.default_rng(4)
+    check = _stamps(searcher, 300, seed=3)
+    for backend in ('balltree', 'sorted'):
+        _check_same(searcher, check, rng.integers(1, 12, len(check)), backend)
+    print(f"{len(check)} mixed-k queries per backend matched single searches")
+
+    print(f"{'queries':>8} {'backend':<9} {'batch q/s':>10} {'loop q/s':>10} {'speed-up':>9}")
+    for m in args.queries:
+        stamps = _stamps(searcher, m, seed=m)
+        for backend in ('balltree', 'sorted'):
+            t0 = time.perf_counter()
+            searcher.search_batch(stamps, k=args.k, backend=backend)
+            batch_s = time.perf_counter() - t0
+            loop, speedup = '-', '-'
+            if m <= args.loop_max:
+                t0 = time.perf_counter()
+                for ts in stamps:
+                    searcher.search(ts, k=args.k, backend=backend)
+                loop_s = time.perf_counter() - t0
+                loop, speedup = f"{m / loop_s:.0f}", f"{loop_s / batch_s:.0f}x"
+            print(f"{m:>8} {backend:<9} {m / batch_s:>10.0f} {loop:>10} {speedup:>9}")
+
+
+if __name__ == '__main__':
+    main()
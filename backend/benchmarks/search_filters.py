@@ -0,0 +1,84 @@
+# benchmarks/search_filters.py
+# Filtered and windowed nearest-timestamp queries served by the per-partition
+# indexes, checked against a brute-force scan of every row and timed against
+# that scan (what filtering on the client amounted to).
+# Run from backend/:  python -m benchmarks.search_filters --rows 1000000 --queries 500
+
+import argparse
+import io
+import time
+
+import numpy as np
+
+from benchmarks.payloads import fault_rows, percentiles
+from models.fast_search import FastTimestampSearch
+
+
+def _brute(searcher: FastTimestampSearch, t: int, k: int, filters: dict, start, end):
+    store = searcher.store
+    times = store.column(searcher.timestamp_col).view(np.int64)
+    mask = times != np.iinfo(np.int64).min
+    for column, value in filters.items():
+        mask &= store.column(column) == value
+    if start is not None:
+        mask &= times >= start
+    if end is not None:
+        mask &= times <= end
+    rows = np.flatnonzero(mask)
+    delta = np.abs(times[rows] - t)
+    return np.sort(delta)[:k] / 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--adds', type=int, default=500, help="rows left in the insert deltas")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    searcher = FastTimestampSearch()
+    searcher.load_data(io.BytesIO(fault_rows(args.rows, seed=1).to_csv(index=False).encode()), 'csv')
+    for entry in fault_rows(args.adds, seed=2).to_dict(orient='records'):
+        searcher.add_entry(entry)
+    print(f"{len(searcher)} rows; partitions: "
+          + ", ".join(f"{c} {len(p)}" for c, p in searcher.index.partitions.partitions.items())
+          + f" ({searcher.index.partitions.nbytes / 2 ** 20:.1f} MB)")
+
+    rng = np.random.default_rng(3)
+    store = searcher.store
+    times = store.column(searcher.timestamp_col).view(np.int64)
+    lo, hi = times.min(), times.max()
+    cases = {
+        'bulb': lambda r: {'bulb_number': int(store.column('bulb_number')[r])},
+        'bulb+conditions': lambda r: {'bulb_number': int(store.column('bulb_number')[r]),
+                                      'environmental_conditions': store.column('environmental_conditions')[r]},
+        'conditions+fault': lambda r: {'environmental_conditions': store.column('environmental_conditions')[r],
+                                       'fault_type': int(store.column('fault_type')[r])},
+        'window': lambda r: {},
+    }
+    print(f"{'filter':<17} {'index p50 ms':>13} {'index p99 ms':>13} {'scan p50 ms':>12}")
+    for name, make in cases.items():
+        fast, slow = [], []
+        for _ in range(args.queries):
+            filters = make(int(rng.integers(0, len(store))))
+            t = int(rng.integers(lo, hi))
+            start, end = (t - 30 * 86400 * 10 ** 9, t + 30 * 86400 * 10 ** 9) if name == 'window' or rng.random() < 0.3 \
+                else (None, None)
+            stamp = str(np.datetime64(t, 'ns'))
+            window = [None if v is None else str(np.datetime64(v, 'ns')) for v in (start, end)]
+            idx, dist, ms = searcher.search_filtered(stamp, args.k, filters, *window)
+            fast.append(ms)
+            t0 = time.perf_counter()
+            expected = _brute(searcher, t, args.k, filters, start, end)
+            slow.append((time.perf_counter() - t0) * 1000)
+            assert np.allclose(dist, expected, rtol=0, atol=1e-9), (name, filters, dist, expected)
+            for column, value in filters.items():
+                assert (store.column(column)[idx] == value).all()
+        f, s = percentiles(fast), percentiles(slow)
+        print(f"{name:<17} {f['p50']:>13} {f['p99']:>13} {s['p50']:>12}")
+    print("every filtered query matched the brute-force scan")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/search_ingest.py
+# Peak RSS and time of loading a large CSV upload the old way (whole body in
+# memory, BytesIO, one read_csv with inferred dates) against the chunked
+# ingestion into typed columns. Each loader runs in its own process so the
+# peaks do not mix; both must keep the same rows.
+# Run from backend/:  python -m benchmarks.search_ingest --rows 5000000
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.payloads import fault_rows
+from models.csv_ingest import peak_rss_bytes, read_csv_columns
+
+MB = 2 ** 20
+
+
+def _write_csv(path: str, rows: int, block: int = 500_000):
+    base = fault_rows(min(rows, block), seed=0)
+    with open(path, 'w') as f:
+        for start in range(0, rows, block):
+            part = base.iloc[:min(block, rows - start)]
+            part.to_csv(f, index=False, header=start == 0)
+
+
+def _child(mode: str, path: str):
+    t0 = time.perf_counter()
+    if mode == 'old':
+        with open(path, 'rb') as f:
+            contents = f.read()
+        df = pd.read_csv(io.BytesIO(contents), parse_dates=['timestamp'])
+        df = df.dropna(subset=['timestamp'])
+        rows, checksum = len(df), int(df['timestamp'].to_numpy().view(np.int64).sum(dtype=np.uint64))
+    else:
+        store, col, _ = read_csv_columns(path, 'timestamp')
+        rows, checksum = len(store), int(store.column(col).view(np.int64).sum(dtype=np.uint64))
+    print(json.dumps({'seconds': time.perf_counter() - t0, 'peak_rss_bytes': peak_rss_bytes(),
+                      'rows': rows, 'checksum': checksum}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return _child(*args.child)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'upload.csv')
+        _write_csv(path, args.rows)
+        size = os.path.getsize(path)
+        print(f"{args.rows} rows, {size / MB:.0f} MB CSV")
+        results = {}
+        for mode in ('old', 'chunked'):
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.search_ingest', '--child', mode, path],
+                                 capture_output=True, text=True, check=True)
+            results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+            r = results[mode]
+            print(f"{mode:<8} {r['seconds']:>7.1f} s  peak RSS {r['peak_rss_bytes'] / MB:>7.0f} MB  "
+                  f"({r['peak_rss_bytes'] / size:.2f}x file size)")
+        assert results['old']['rows'] == results['chunked']['rows']
+        assert results['old']['checksum'] == results['chunked']['checksum']
+        print("same rows and timestamps from both loaders")
+
+
+if __name__ == '__main__':
+    main()
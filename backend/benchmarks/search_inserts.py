@@ -0,0 +1,64 @@
+# benchmarks/search_inserts.py
+# Per-add latency of FastTimestampSearch.add_entry on a loaded index, and a
+# check that queries stay exact while rows sit in the delta buffer.
+# Run from backend/:  python -m benchmarks.search_inserts --adds 5000 --queries 200
+
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.payloads import fault_rows, percentiles
+from models.fast_search import FastTimestampSearch
+
+
+def _check_exact(searcher: FastTimestampSearch, stamps: list, k: int) -> int:
+    """Compare ``search`` with a brute-force scan over every row's features."""
+    snap = searcher.index
+    pre = snap.pre[:snap.n]
+    for ts in stamps:
+        idx, dist, _ = searcher.search(ts, k=k, index=snap)
+        q = searcher._prep([ts])[0]
+        expected = np.sort(np.sqrt(((pre - q) ** 2).sum(axis=1)))[:k]
+        assert np.allclose(dist, expected, rtol=0, atol=1e-6), (ts, dist, expected)
+    return len(stamps)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=34000)
+    parser.add_argument('--adds', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    searcher = FastTimestampSearch()
+    t0 = time.perf_counter()
+    searcher.load_data(io.BytesIO(fault_rows(args.rows, seed=1).to_csv(index=False).encode()), 'csv')
+    print(f"initial build: {args.rows} rows in {time.perf_counter() - t0:.2f} s")
+
+    entries = fault_rows(args.adds, seed=2).to_dict(orient='records')
+    stamps = pd.to_datetime(pd.Series([e['timestamp'] for e in entries]))
+    stamps = stamps.sample(n=args.queries, replace=True, random_state=3).dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+
+    latencies = []
+    checked = 0
+    for i, entry in enumerate(entries):
+        t0 = time.perf_counter()
+        searcher.add_entry(entry)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if i % max(1, args.adds // 5) == 0:
+            checked += _check_exact(searcher, stamps[:20], args.k)
+    checked += _check_exact(searcher, stamps, args.k)
+
+    lat = percentiles(latencies)
+    total = sum(latencies) / 1000
+    print(f"{args.adds} adds: p50 {lat['p50']} ms  p95 {lat['p95']} ms  p99 {lat['p99']} ms  "
+          f"{args.adds / total:.0f} adds/s")
+    print(f"rows {len(searcher)}, tree covers {searcher.index.n_tree}; {checked} queries matched brute force")
+
+
+if __name__ == '__main__':
+    main()
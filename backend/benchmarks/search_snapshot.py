@@ -0,0 +1,65 @@
+# benchmarks/search_snapshot.py
+# Save and restore time of search index snapshots against rebuilding the
+# index from the CSV, and a check that the restored index answers the same.
+# Run from backend/:  python -m benchmarks.search_snapshot --rows 1000000
+
+import argparse
+import io
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.payloads import fault_rows
+from models.fast_search import FastTimestampSearch
+from models.search_snapshot import SnapshotError, load_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=100)
+    args = parser.parse_args()
+
+    csv = fault_rows(args.rows, seed=1).to_csv(index=False).encode()
+    searcher = FastTimestampSearch()
+    t0 = time.perf_counter()
+    searcher.load_data(io.BytesIO(csv), 'csv')
+    build_s = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as root:
+        t0 = time.perf_counter()
+        searcher.save_snapshot(root)
+        save_s = time.perf_counter() - t0
+
+        restored = FastTimestampSearch()
+        t0 = time.perf_counter()
+        assert restored.load_snapshot(root)
+        restore_s = time.perf_counter() - t0
+
+        stamps = pd.to_datetime(pd.read_csv(io.BytesIO(csv), usecols=['timestamp'])['timestamp'])
+        stamps = stamps.sample(n=args.queries, random_state=2).dt.strftime('%Y-%m-%d %H:%M:%S')
+        for ts in stamps:
+            for backend in ('balltree', 'sorted'):
+                a_idx, a_dist, _ = searcher.search(ts, k=5, backend=backend)
+                b_idx, b_dist, _ = restored.search(ts, k=5, backend=backend)
+                assert np.array_equal(a_dist, b_dist)
+                assert searcher.rows(a_idx).equals(restored.rows(b_idx))
+
+        # A snapshot written for a different feature layout must be rejected.
+        meta_path = f"{root}/{open(f'{root}/CURRENT').read()}/meta.json"
+        meta = open(meta_path).read()
+        with open(meta_path, 'w') as f:
+            f.write(meta.replace('"iso_week"', '"week"'))
+        try:
+            load_snapshot(root)
+            raise AssertionError("snapshot with a different feature layout was accepted")
+        except SnapshotError as e:
+            print(f"layout mismatch rejected: {e}")
+
+    print(f"{args.rows} rows: rebuild from CSV {build_s:.2f} s, save {save_s:.2f} s, restore {restore_s * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/search_stress.py
+# Query latency while the index is rebuilt underneath. Reader threads search
+# continuously; a writer alternates quiet periods with full re-ingests and
+# bursts of adds (which trigger background tree merges). Every answer is
+# checked against the snapshot it pinned, and p50/p99 are reported for the
+# quiet and the rebuilding periods.
+# Run from backend/:  python -m benchmarks.search_stress --rows 500000 --readers 4 --seconds 10
+
+import argparse
+import io
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.payloads import fault_rows, percentiles
+from models.fast_search import FastTimestampSearch
+
+
+def _reader(searcher, stamps, backend, stop, rebuilding, out, errors, seed):
+    rng = np.random.default_rng(seed)
+    while not stop.is_set():
+        ts = stamps[int(rng.integers(0, len(stamps)))]
+        busy = rebuilding.is_set()
+        t0 = time.perf_counter()
+        snap = searcher.index
+        idx, dist, _ = searcher.search(ts, k=5, backend=backend, index=snap)
+        ms = (time.perf_counter() - t0) * 1000
+        try:
+            assert len(idx) and idx.max() < snap.n, "row outside the pinned snapshot"
+            if backend == 'sorted':
+                times = snap.store.column(snap.timestamp_col)[idx].view(np.int64)
+                expected = np.abs(times - pd.Timestamp(ts).value) / 1e9
+            else:
+                q = searcher._prep([ts])[0]
+                expected = np.sqrt(((snap.pre[idx] - q) ** 2).sum(axis=1))
+            assert np.allclose(dist, expected, rtol=0, atol=1e-6), "distances do not match the pinned rows"
+        except AssertionError as e:
+            errors.append(f"v{snap.version}: {e}")
+        out['rebuilding' if busy or rebuilding.is_set() else 'quiet'].append(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10, help="length of each quiet and rebuilding period")
+    parser.add_argument('--rounds', type=int, default=2)
+    parser.add_argument('--adds', type=int, default=3000, help="adds per rebuilding period")
+    args = parser.parse_args()
+
+    csv = fault_rows(args.rows, seed=1).to_csv(index=False).encode()
+    searcher = FastTimestampSearch()
+    searcher.ingest(io.BytesIO(csv), 'csv')
+    stamps = pd.DatetimeIndex(searcher.store.column(searcher.timestamp_col)[::max(1, args.rows // 5000)])
+    stamps = stamps.strftime('%Y-%m-%d %H:%M:%S').tolist()
+    entries = fault_rows(args.adds, seed=2).to_dict(orient='records')
+
+    stop, rebuilding = threading.Event(), threading.Event()
+    latencies = {'quiet': [], 'rebuilding': []}
+    errors = []
+    readers = [
+        threading.Thread(target=_reader, args=(searcher, stamps, ('balltree', 'sorted')[i % 2], stop, rebuilding,
+                                               latencies, errors, i), daemon=True)
+        for i in range(args.readers)
+    ]
+    for t in readers:
+        t.start()
+
+    first_version = searcher.index.version
+    rebuilds = 0
+    for _ in range(args.rounds):
+        time.sleep(args.seconds)
+        rebuilding.set()
+        deadline = time.perf_counter() + args.seconds
+        while time.perf_counter() < deadline:
+            searcher.ingest(io.BytesIO(csv), 'csv')
+            rebuilds += 1
+            for entry in entries:
+                searcher.add_entry(dict(entry))
+        rebuilding.clear()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in readers:
+        t.join()
+
+    print(f"{args.readers} readers, {rebuilds} full rebuilds, "
+          f"{searcher.index.version - first_version} snapshots published")
+    print(f"{'period':<11} {'queries':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for period, samples in latencies.items():
+        p = percentiles(samples)
+        print(f"{period:<11} {len(samples):>8} {p['p50']:>8} {p['p99']:>8}")
+    assert not errors, f"{len(errors)} inconsistent answers, e.g. {errors[:3]}"
+    print("every answer was consistent with the snapshot it pinned")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/serialization.py
+# Response encoding time: FastAPI's previous path (clean_nans walk +
+# jsonable_encoder + json.dumps) against api.responses.dumps, for response
+# shapes and sizes the routers actually return.
+# Run from backend/:  python -m benchmarks.serialization --repeat 20
+
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from api.responses import dumps, orjson
+from benchmarks.payloads import fault_rows
+
+
+def _clean_nans(obj):
+    # The per-response walk faults.py used to do before encoding.
+    if isinstance(obj, float) and math.isnan(obj):
+        return None
+    if isinstance(obj, dict):
+        return {k: _clean_nans(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_clean_nans(v) for v in obj]
+    return obj
+
+
+def _legacy(content) -> bytes:
+    return json.dumps(jsonable_encoder(_clean_nans(content)), separators=(',', ':')).encode()
+
+
+def fault_results(n: int) -> list:
+    rng = np.random.default_rng(n)
+    metrics = {'accuracy': None, 'precision': None, 'recall': None, 'f1': None, 'roc_auc': float('nan')}
+    return [
+        {
+            'binary': {'random_forest': {'prediction': 'No Fault', 'probability': float(rng.random()),
+                                         'metrics': dict(metrics)}},
+            'multiclass': {'random_forest': {
+                'prediction': 'No Fault',
+                'probabilities': dict(zip(['No Fault', 'Electrical Fault', 'Temperature Fault', 'Environmental Fault'],
+                                          rng.dirichlet(np.ones(4)).tolist())),
+                'metrics': dict(metrics)}},
+        }
+        for _ in range(n)
+    ]
+
+
+def search_result(k: int) -> dict:
+    rows = fault_rows(k, seed=k)
+    rows['timestamp'] = pd.to_datetime(rows['timestamp'], dayfirst=True)
+    rows['distance'] = np.random.default_rng(k).random(k).round(4)
+    rows.loc[rows.index[::7], 'temperature (Celsius)'] = np.nan
+    return {'query_timestamp': '2023-03-28 16:28:00', 'elapsed_ms': 0.5, 'neighbours': rows.to_dict(orient='records')}
+
+
+def forecast(horizon: int) -> dict:
+    rng = np.random.default_rng(horizon)
+    stamps = np.arange(0, horizon).astype('datetime64[h]')
+    return {
+        'start': '2024-01-01 00:00', 'horizon': horizon, 'driver': 'mean',
+        'timestamps': [s.replace('T', ' ') for s in np.datetime_as_string(stamps, unit='m').tolist()],
+        'forecast': rng.integers(0, 5000, horizon).tolist(),
+        'predictions': {m: rng.integers(0, 5000, horizon).tolist() for m in ('xgboost', 'lightgbm', 'lstm', 'ensemble')},
+        'elapsed_ms': 12.5,
+    }
+
+
+CASES = [
+    ('fault /predict', lambda: fault_results(1)[0]),
+    ('fault bulk x1000', lambda: fault_results(1000)),
+    ('search k=5', lambda: search_result(5)),
+    ('search k=1000', lambda: search_result(1000)),
+    ('forecast 24h', lambda: forecast(24)),
+    ('forecast 672h', lambda: forecast(672)),
+]
+
+
+def _time(fn, content, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(content)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    print(f"{'response':<18} {'bytes':>9} {'legacy ms':>10} {'fast ms':>9} {'speed-up':>9}")
+    for name, build in CASES:
+        content = build()
+        assert json.loads(dumps(content)) == json.loads(_legacy(content).replace(b'NaN', b'null'))
+        legacy = _time(_legacy, content, args.repeat)
+        fast = _time(dumps, content, args.repeat)
+        print(f"{name:<18} {len(dumps(content)):>9} {legacy:>10.3f} {fast:>9.3f} {legacy / fast:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
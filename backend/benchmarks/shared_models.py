@@ -0,0 +1,61 @@
+# benchmarks/shared_models.py
+# Per-worker private vs shared memory with N worker processes holding every
+# model at once, with and without memory-mapped shared models.
+# Workers are spawned (a fresh interpreter each), as uvicorn --workers does.
+# Run from backend/ (Linux, reads /proc/<pid>/smaps):
+#   python -m benchmarks.shared_models --workers 4
+
+import argparse
+import multiprocessing as mp
+
+MB = 2 ** 20
+
+
+def _worker(shared: bool, ready, done, reports):
+    import os
+    os.environ["SMARTGRID_SHARED_MODELS"] = "1" if shared else "0"
+    import models.energy_demand  # noqa: F401  (registers the energy models)
+    import models.fault_prediction  # noqa: F401
+    from models.model_registry import registry
+    from models.shared_models import memory_report
+
+    registry.get_all()
+    ready.wait()  # every worker has loaded its models before anyone measures
+    reports.put(memory_report())
+    done.wait()
+
+
+def run(workers: int, shared: bool) -> list:
+    ctx = mp.get_context("spawn")
+    ready, done = ctx.Barrier(workers + 1), ctx.Event()
+    reports = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(shared, ready, done, reports)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    ready.wait()
+    results = [reports.get() for _ in procs]
+    done.set()
+    for p in procs:
+        p.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'pid':>8} {'rss MB':>8} {'private':>8} {'shared':>8} {'pss':>8} {'models rss':>11} {'models shared':>14}")
+    for shared in (False, True):
+        mode = 'mmap' if shared else 'private'
+        reports = run(args.workers, shared)
+        for r in reports:
+            m = r['model_files']
+            print(f"{mode:<8} {r['pid']:>8} {r['rss'] / MB:>8.1f} {r['private'] / MB:>8.1f} "
+                  f"{r['shared'] / MB:>8.1f} {r['pss'] / MB:>8.1f} {m['rss'] / MB:>11.1f} {m['shared'] / MB:>14.1f}")
+        total = sum(r['pss'] for r in reports)
+        print(f"{mode:<8} total pss of {args.workers} workers: {total / MB:.1f} MB\n")
+
+
+if __name__ == '__main__':
+    main()
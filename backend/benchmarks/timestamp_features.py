@@ -0,0 +1,76 @@
+# benchmarks/timestamp_features.py
+# Rows/second of the vectorized timestamp features against the per-Timestamp
+# loop they replace, plus a bit-for-bit comparison of the two.
+# Run from backend/:  python -m benchmarks.timestamp_features --sizes 10000 1000000 --loop-max 100000
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from models.timestamp_features import timestamp_features
+
+
+def _loop_features(ts) -> np.ndarray:
+    # FastTimestampSearch._prep / EnhancedTimestampSearch.enhanced_preprocess before vectorizing.
+    feats = []
+    for dt in pd.to_datetime(ts, errors="coerce"):
+        if pd.isna(dt):
+            feats.append([0] * 13)
+            continue
+        feats.append([
+            dt.timestamp(),
+            np.sin(2 * np.pi * dt.hour / 23), np.cos(2 * np.pi * dt.hour / 23),
+            dt.dayofweek, dt.month, dt.hour, dt.minute, dt.day,
+            dt.isocalendar().week, dt.dayofyear, dt.year,
+            int(dt.month > 6), int((dt.hour >= 18) | (dt.hour <= 6))
+        ])
+    return np.array(feats, dtype=float)
+
+
+def _sample(n: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('1999-12-25T00:00:00', 's').astype(np.int64)
+    seconds = start + rng.integers(0, 30 * 365 * 86400, n)
+    ts = pd.Series(seconds.astype('datetime64[s]').astype('datetime64[ns]'))
+    ts.iloc[::97] = pd.NaT
+    ts.iloc[1::89] += pd.to_timedelta(rng.integers(1, 999_999, len(ts.iloc[1::89])), unit='us')
+    return ts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--loop-max', type=int, default=100_000, help="largest size also run through the loop")
+    parser.add_argument('--chunk-rows', type=int, default=None)
+    args = parser.parse_args()
+
+    # Year boundaries (ISO weeks 52/53/1), leap days, NaT and a time zone.
+    edge = pd.Series(pd.date_range('2014-12-25', '2027-01-08', freq='17h'))
+    assert np.array_equal(timestamp_features(edge, chunk_rows=1000), _loop_features(edge))
+    tz = pd.Series(pd.date_range('2020-12-25', periods=2000, freq='7h', tz='Europe/Amsterdam'))
+    assert np.array_equal(timestamp_features(tz), _loop_features(tz))
+    text = edge.dt.strftime('%Y-%m-%d %H:%M:%S').tolist() + ['not a date']
+    assert np.array_equal(timestamp_features(text), _loop_features(text))
+
+    print(f"{'rows':>10} {'vector rows/s':>14} {'loop rows/s':>12} {'speed-up':>9}")
+    for n in args.sizes:
+        ts = _sample(n, seed=n)
+        kwargs = {'chunk_rows': args.chunk_rows} if args.chunk_rows else {}
+        t0 = time.perf_counter()
+        fast = timestamp_features(ts, **kwargs)
+        vec_s = time.perf_counter() - t0
+        loop = '-'
+        speedup = '-'
+        if n <= args.loop_max:
+            t0 = time.perf_counter()
+            slow = _loop_features(ts)
+            loop_s = time.perf_counter() - t0
+            assert np.array_equal(fast, slow), "vectorized features differ from the loop"
+            loop, speedup = f"{n / loop_s:.0f}", f"{loop_s / vec_s:.0f}x"
+        print(f"{n:>10} {n / vec_s:>14.0f} {loop:>12} {speedup:>9}")
+
+
+if __name__ == '__main__':
+    main()
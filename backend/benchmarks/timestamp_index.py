@@ -0,0 +1,73 @@
+# benchmarks/timestamp_index.py
+# Sorted int64 timestamp index against the BallTree over the 13 timestamp
+# features: build time, index memory and k-nearest query latency, plus how
+# often both return the same nearest row.
+# Run from backend/:  python -m benchmarks.timestamp_index --sizes 1000000 10000000
+
+import argparse
+import time
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from benchmarks.payloads import percentiles
+from models.fast_search import FastTimestampSearch
+from models.timestamp_index import SortedTimestampIndex
+
+MB = 2 ** 20
+START = np.datetime64('2020-01-01T00:00:00', 'ns').astype(np.int64)
+SPAN = 4 * 365 * 86400 * 10 ** 9
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--skip-balltree-above', type=int, default=None,
+                        help="only time the sorted index for sizes above this")
+    args = parser.parse_args()
+
+    prep = FastTimestampSearch()._prep
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'engine':<9} {'build s':>8} {'index MB':>9} {'p50 ms':>8} {'p99 ms':>8} {'same nearest':>13}")
+    for n in args.sizes:
+        times = START + rng.integers(0, SPAN // 10 ** 9, n) * 10 ** 9
+        queries = START + rng.integers(0, SPAN // 10 ** 9, args.queries) * 10 ** 9
+        query_text = [str(np.datetime64(int(q), 'ns')) for q in queries]
+
+        index, build_s = _timed(lambda: SortedTimestampIndex(times))
+        lat, sorted_rows = [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            rows, _ = index.nearest(int(q), args.k)
+            lat.append((time.perf_counter() - t0) * 1000)
+            sorted_rows.append(rows[0])
+        p = percentiles(lat)
+        print(f"{n:>10} {'sorted':<9} {build_s:>8.2f} {index.nbytes / MB:>9.1f} {p['p50']:>8} {p['p99']:>8} {'':>13}")
+
+        if args.skip_balltree_above is not None and n > args.skip_balltree_above:
+            continue
+        features, prep_s = _timed(lambda: prep(times.astype('datetime64[ns]')))
+        tree, build_s = _timed(lambda: BallTree(features))
+        tree_bytes = sum(a.nbytes for a in tree.get_arrays())
+        lat, same = [], 0
+        for text, expected in zip(query_text, sorted_rows):
+            q = prep([text])
+            t0 = time.perf_counter()
+            _, idx = tree.query(q, k=args.k)
+            lat.append((time.perf_counter() - t0) * 1000)
+            same += times[idx[0][0]] == times[expected]
+        p = percentiles(lat)
+        print(f"{n:>10} {'balltree':<9} {build_s:>8.2f} {tree_bytes / MB:>9.1f} {p['p50']:>8} {p['p99']:>8} "
+              f"{same / len(queries):>12.1%}   (+{prep_s:.2f} s feature prep)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/tree_compiler.py
+# Prediction equivalence, latency and memory of compiled tree ensembles
+# versus the joblib-loaded originals.
+# Run from backend/:  python -m benchmarks.tree_compiler --rows 2000
+
+import argparse
+import gc
+import glob
+import os
+import time
+
+import joblib
+import numpy as np
+
+from benchmarks.payloads import energy_payloads, fault_rows
+from models.feature_kernels import energy_feature_matrix, fault_feature_matrix, scale_rows
+from models.model_registry import _rss_bytes
+from models.tree_compiler import compile_model
+
+
+def _features_for(model, energy_X, fault_X):
+    n = getattr(model, 'n_features_in_', None)
+    if n == energy_X.shape[1]:
+        return energy_X
+    if n == fault_X.shape[1]:
+        return fault_X
+    return None
+
+
+def _latency_us(fn, X, repeat):
+    fn(X)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - t0) * 1e6 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    scaler = joblib.load('models/ml_models/scaler.joblib')
+    energy_X = scale_rows(scaler, energy_feature_matrix(energy_payloads(args.rows)))
+    fault_X = fault_feature_matrix(fault_rows(args.rows).to_dict(orient='records'))
+
+    print(f"{'model':<36} {'1-row us':>16} {'batch ms':>16} {'memory MB':>16}")
+    for path in sorted(glob.glob('models/ml_models/*.joblib')):
+        gc.collect()
+        rss0 = _rss_bytes()
+        model = joblib.load(path)
+        loaded_mb = (_rss_bytes() - rss0) / 2**20
+        try:
+            compiled = compile_model(model)
+        except NotImplementedError:
+            continue
+        X = _features_for(model, energy_X, fault_X)
+        if X is None:
+            print(f"{os.path.basename(path):<36} skipped: no matching feature set")
+            continue
+
+        # Equivalence against the original model.
+        if compiled.classes_ is not None:
+            np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=1e-6, atol=1e-9)
+            np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+        else:
+            np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=1e-6, atol=1e-6)
+
+        one = X[:1]
+        orig_1 = _latency_us(model.predict, one, args.repeat)
+        comp_1 = _latency_us(compiled.predict, one, args.repeat)
+        orig_b = _latency_us(model.predict, X, 5) / 1000
+        comp_b = _latency_us(compiled.predict, X, 5) / 1000
+        print(f"{os.path.basename(path):<36} {orig_1:>7.0f} -> {comp_1:>6.0f} "
+              f"{orig_b:>7.1f} -> {comp_b:>6.1f} {loaded_mb:>7.1f} -> {compiled.nbytes / 2**20:>6.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,11 @@
 from fastapi import FastAPI
 from api.endpoints import energy, faults, search
 from fastapi.middleware.cors import CORSMiddleware
+from api.responses import FastJSONResponse
+from models.model_registry import registry
+from models.shared_models import print_memory_report
 
-app = FastAPI(title="Smart Grid Platform")
+app = FastAPI(title="Smart Grid Platform", default_response_class=FastJSONResponse)
 
 # CORS configuration
 app.add_middleware(
@@ -18,6 +21,13 @@ app.include_router(energy.router, prefix="/energy", tags=["Energy"])
 app.include_router(faults.router, prefix="/faults", tags=["Faults"])
 app.include_router(search.router, prefix="/search", tags=["Search"])
 
+@app.on_event("startup")
+def warm_models():
+    # Load every registered model before serving, then report how much of this
+    # worker's memory is private and how much is shared with other workers.
+    registry.get_all()
+    print_memory_report()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
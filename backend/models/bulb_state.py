@@ -0,0 +1,206 @@
+# models/bulb_state.py
+
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+STATE_PATH = os.getenv("SMARTGRID_BULB_STATE_PATH", "data/bulb_state.npz")
+SNAPSHOT_INTERVAL = float(os.getenv("SMARTGRID_BULB_SNAPSHOT_SECONDS", "60"))
+WINDOW = 5  # rolling window used when the fault models were trained
+
+# Same order as the *_rolling_avg / *_rolling_std model features.
+ROLLING_COLS = ['power_consumption (Watts)', 'voltage_levels (Volts)', 'current_fluctuations (Amperes)']
+_NO_TIME = np.iinfo(np.int64).min
+
+
+class BulbStateStore:
+    """Rolling per-bulb statistics for the fault features, in flat arrays.
+
+    Each bulb owns one slot: a ring buffer of its last ``window`` readings for
+    the three rolling columns plus a running mean and M2 (sum of squared
+    deviations). Adding a reading to a full window replaces the oldest one with
+    the sliding-window form of Welford's update, so every update and lookup is
+    O(1). The statistics live in preallocated arrays; the only per-bulb Python
+    object is the ``bulb -> slot`` entry in ``_slots``. Array memory is roughly
+    ``(window * 3 + 8) * 8`` bytes per bulb.
+
+    Features match training: the window includes the current reading, std uses
+    ddof=1 (0 until two readings are seen) and ``days_since_last_record`` is
+    the whole days since the bulb's previous reading (0 for the first one).
+    """
+
+    def __init__(self, window: int = WINDOW, capacity: int = 1024):
+        self.window = window
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._allocate(capacity)
+        self._dirty = False
+        self._last_snapshot = time.monotonic()
+
+    def _allocate(self, capacity: int):
+        k = len(ROLLING_COLS)
+        self.bulbs = np.zeros(capacity, dtype=np.int64)
+        self.buf = np.zeros((capacity, k, self.window), dtype=np.float64)
+        self.head = np.zeros(capacity, dtype=np.int16)
+        self.count = np.zeros(capacity, dtype=np.int16)
+        self.mean = np.zeros((capacity, k), dtype=np.float64)
+        self.m2 = np.zeros((capacity, k), dtype=np.float64)
+        self.last_ts = np.full(capacity, _NO_TIME, dtype=np.int64)
+
+    def _grow(self):
+        old = (self.bulbs, self.buf, self.head, self.count, self.mean, self.m2, self.last_ts)
+        n = len(self._slots)
+        self._allocate(max(2 * len(self.bulbs), 1024))
+        for new, prev in zip((self.bulbs, self.buf, self.head, self.count, self.mean, self.m2, self.last_ts), old):
+            new[:n] = prev[:n]
+
+    def _slot(self, bulb: int) -> int:
+        slot = self._slots.get(bulb)
+        if slot is None:
+            slot = len(self._slots)
+            if slot >= len(self.bulbs):
+                self._grow()
+            self._slots[bulb] = slot
+            self.bulbs[slot] = bulb
+        return slot
+
+    def __len__(self):
+        return len(self._slots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.bulbs, self.buf, self.head, self.count, self.mean, self.m2, self.last_ts))
+
+    def _load(self, bulb: int) -> list:
+        """A private copy of one bulb's slot: ``[buf, head, count, mean, m2, last_ts]``."""
+        s = self._slots.get(bulb)
+        if s is None:
+            k = len(ROLLING_COLS)
+            return [np.zeros((k, self.window)), 0, 0, np.zeros(k), np.zeros(k), _NO_TIME]
+        return [self.buf[s].copy(), int(self.head[s]), int(self.count[s]), self.mean[s].copy(),
+                self.m2[s].copy(), int(self.last_ts[s])]
+
+    def _store(self, bulb: int, state: list):
+        s = self._slot(bulb)
+        self.buf[s], self.head[s], self.count[s], self.mean[s], self.m2[s], self.last_ts[s] = state
+
+    def _step(self, state: list, ts_seconds: int, x: np.ndarray) -> tuple:
+        """Add one reading to ``state`` in place; returns its features."""
+        buf, head, n, mean, m2, last = state
+        if last != _NO_TIME and ts_seconds < last:
+            raise ValueError(f"Reading at {ts_seconds} is older than the bulb's latest reading at {last}")
+        repeat = last == ts_seconds
+        days = 0 if last == _NO_TIME or repeat else (ts_seconds - last) // 86400
+        if not repeat:
+            if n < self.window:
+                n += 1
+                delta = x - mean
+                mean += delta / n
+                m2 += delta * (x - mean)
+            else:
+                old = buf[:, head].copy()
+                prev_mean = mean.copy()
+                mean += (x - old) / n
+                m2 += (x - old) * (x - mean + old - prev_mean)
+            buf[:, head] = x
+            state[1:3] = [(head + 1) % self.window, n]
+            state[5] = ts_seconds
+        std = np.sqrt(np.maximum(m2, 0.0) / (n - 1)) if n > 1 else np.zeros(len(ROLLING_COLS))
+        return mean.copy(), std, int(days)
+
+    @staticmethod
+    def _values(values) -> np.ndarray:
+        x = np.asarray(values, dtype=np.float64)
+        if not np.isfinite(x).all():
+            raise ValueError(f"Readings must be finite, got {x.tolist()}")
+        return x
+
+    def observe(self, bulb: int, ts_seconds: int, values) -> tuple:
+        """Add one reading and return ``(rolling_avg[3], rolling_std[3], days_since_last_record)``.
+
+        Re-sending a bulb's latest reading (same timestamp) does not add it twice.
+        Raises ValueError for non-finite values or a reading older than the
+        bulb's latest one.
+        """
+        x = self._values(values)
+        with self._lock:
+            state = self._load(int(bulb))
+            features = self._step(state, int(ts_seconds), x)
+            self._store(int(bulb), state)
+            self._dirty = True
+            return features
+
+    def preview(self, readings: list) -> list:
+        """Features for ``[(bulb, ts_seconds, values), ...]`` in order, as ``observe``
+        would return them, without changing the store. Raises like ``observe``.
+
+        Scoring previews a batch and commits it only after the models succeed,
+        so a failed batch that is retried item by item is not recorded twice.
+        """
+        readings = [(int(b), int(t), self._values(v)) for b, t, v in readings]
+        with self._lock:
+            states, features = {}, []
+            for bulb, ts, x in readings:
+                if bulb not in states:
+                    states[bulb] = self._load(bulb)
+                features.append(self._step(states[bulb], ts, x))
+        return features
+
+    def commit(self, readings: list):
+        """Record previewed readings. One that another request has already moved
+        the bulb past is skipped."""
+        for bulb, ts, values in readings:
+            try:
+                self.observe(bulb, ts, values)
+            except ValueError:
+                pass
+
+    # ---------- persistence ----------
+    def snapshot(self, path: str = STATE_PATH):
+        """Write the store atomically (temp file + rename)."""
+        with self._lock:
+            n = len(self._slots)
+            arrays = {
+                'window': np.array(self.window), 'bulbs': self.bulbs[:n].copy(), 'buf': self.buf[:n].copy(),
+                'head': self.head[:n].copy(), 'count': self.count[:n].copy(), 'mean': self.mean[:n].copy(),
+                'm2': self.m2[:n].copy(), 'last_ts': self.last_ts[:n].copy(),
+            }
+            self._dirty = False
+            self._last_snapshot = time.monotonic()
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        # Unique temp name in the same directory, so concurrent snapshots never share a file.
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def maybe_snapshot(self, path: str = STATE_PATH, interval: float = SNAPSHOT_INTERVAL):
+        """Snapshot in a background thread if there are changes and ``interval`` has passed."""
+        if self._dirty and time.monotonic() - self._last_snapshot >= interval:
+            self._last_snapshot = time.monotonic()
+            threading.Thread(target=self.snapshot, args=(path,), daemon=True).start()
+
+    @classmethod
+    def load(cls, path: str = STATE_PATH):
+        """Restore a snapshot, or start empty if there is none."""
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            store = cls(window=int(data['window']), capacity=max(len(data['bulbs']), 1024))
+            n = len(data['bulbs'])
+            for name in ('bulbs', 'buf', 'head', 'count', 'mean', 'm2', 'last_ts'):
+                getattr(store, name)[:n] = data[name]
+        store._slots = {int(b): i for i, b in enumerate(store.bulbs[:n])}
+        print(f"Restored rolling state for {n} bulbs from {path}")
+        return store
+
+
+bulb_state = BulbStateStore.load()
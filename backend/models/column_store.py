@@ -0,0 +1,140 @@
+# models/column_store.py
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def _missing_value(dtype: np.dtype):
+    if dtype.kind == 'M':
+        return np.datetime64('NaT')
+    if dtype.kind == 'f':
+        return np.nan
+    if dtype.kind == 'O':
+        return None
+    raise ValueError(f"No missing value for dtype {dtype}")
+
+
+class ColumnStore:
+    """Append-only table with one growable NumPy array per column.
+
+    Appends write past the current row count and arrays grow by doubling, so
+    rows ``[0, len)`` never change once written: a reader that took
+    ``len(store)`` earlier keeps seeing a consistent prefix while rows are added.
+    """
+
+    def __init__(self, columns: dict, rows: int = None):
+        self._lock = threading.Lock()
+        self._cols = {name: np.asarray(values) for name, values in columns.items()}
+        self._n = rows if rows is not None else (len(next(iter(self._cols.values()))) if self._cols else 0)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        columns = {}
+        for name in df.columns:
+            col = df[name]
+            if isinstance(col.dtype, pd.CategoricalDtype) or col.dtype == object or pd.api.types.is_string_dtype(col):
+                columns[name] = col.astype(object).to_numpy()
+            elif pd.api.types.is_datetime64_any_dtype(col):
+                columns[name] = col.to_numpy(dtype='datetime64[ns]')
+            else:
+                columns[name] = col.to_numpy()
+        return cls(columns, rows=len(df))
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def columns(self) -> list:
+        return list(self._cols)
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of the first ``len`` values of a column."""
+        view = self._cols[name][:self._n]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a[:self._n].nbytes for a in self._cols.values())
+
+    def append(self, row: dict) -> int:
+        """Add one row and return its position.
+
+        Columns the row lacks get a null value; keys that are not columns yet
+        become new columns that are null for every earlier row.
+        """
+        with self._lock:
+            n = self._n
+            unknown = [name for name in row if name not in self._cols]
+            if unknown:
+                # A new dict rather than an insert, so readers iterating the old one are unaffected.
+                self._cols = {**self._cols, **{name: self._null_column(row[name], n) for name in unknown}}
+            for name, arr in self._cols.items():
+                if name in row:
+                    value = row[name]
+                elif arr.dtype.kind in 'iub':
+                    # An integer column cannot hold a null: widen it to float.
+                    arr = self._cols[name] = arr.astype(np.float64)
+                    value = np.nan
+                else:
+                    value = _missing_value(arr.dtype)
+                if n >= len(arr):
+                    grown = np.empty(max(2 * len(arr), 1024), dtype=arr.dtype)
+                    grown[:n] = arr[:n]
+                    arr = self._cols[name] = grown
+                if arr.dtype.kind == 'M':
+                    value = np.datetime64(pd.Timestamp(value), 'ns') if value is not None else np.datetime64('NaT')
+                arr[n] = value
+            self._n = n + 1
+        return n
+
+    @staticmethod
+    def _null_column(value, rows: int) -> np.ndarray:
+        """Room for ``rows`` nulls plus one value like ``value``."""
+        if isinstance(value, (pd.Timestamp, np.datetime64)):
+            dtype = np.dtype('datetime64[ns]')
+        elif isinstance(value, (bool, int, float, np.number, np.bool_)):
+            dtype = np.dtype(np.float64)
+        else:
+            dtype = np.dtype(object)
+        arr = np.empty(max(rows + 1, 1024), dtype=dtype)
+        arr[:rows] = _missing_value(dtype)
+        return arr
+
+    def extend(self, columns: dict) -> int:
+        """Append equal-length arrays, one per column (a bulk ``append``); returns the new length.
+
+        A column whose incoming values do not fit its dtype is widened (int to
+        float when a chunk has nulls, anything to object when types are mixed).
+        """
+        if set(columns) != set(self._cols):
+            raise ValueError(f"Chunk has different columns than existing data: {sorted(set(columns) ^ set(self._cols))}")
+        m = len(next(iter(columns.values()))) if columns else 0
+        with self._lock:
+            n = self._n
+            for name, arr in self._cols.items():
+                values = np.asarray(columns[name])
+                if values.dtype != arr.dtype:
+                    try:
+                        dtype = np.result_type(arr.dtype, values.dtype)
+                    except TypeError:
+                        dtype = np.dtype(object)
+                    if dtype != arr.dtype:
+                        arr = self._cols[name] = arr.astype(dtype)
+                if n + m > len(arr):
+                    grown = np.empty(max(2 * len(arr), n + m, 1024), dtype=arr.dtype)
+                    grown[:n] = arr[:n]
+                    arr = self._cols[name] = grown
+                arr[n:n + m] = values
+            self._n = n + m
+        return self._n
+
+    def take(self, idx) -> pd.DataFrame:
+        idx = np.asarray(idx, dtype=np.int64)
+        return pd.DataFrame({name: arr[idx] for name, arr in self._cols.items()})
+
+    def to_frame(self) -> pd.DataFrame:
+        n = self._n
+        return pd.DataFrame({name: arr[:n] for name, arr in self._cols.items()})
@@ -0,0 +1,95 @@
+# models/consumption_history.py
+
+import numpy as np
+import pandas as pd
+
+HISTORY_PATH = "data/merged_consumption_weather.csv"
+TARGET_COL = 'building 41'
+WEATHER_COLS = ['Temp', 'RH', 'FF', 'P']
+NS_PER_HOUR = 3_600_000_000_000
+
+
+def hour_index(ts) -> int:
+    """Whole hours since the Unix epoch (timestamps are floored to the hour)."""
+    return int(pd.Timestamp(ts).value // NS_PER_HOUR)
+
+
+class ConsumptionHistory:
+    """Hourly consumption and weather history in flat arrays indexed by hour.
+
+    Row ``i`` holds hour ``start + i`` (hours since the epoch), so a timestamp
+    maps to its row with one subtraction. A prefix sum over the consumption
+    series makes any trailing-window mean a two-element lookup.
+    """
+
+    def __init__(self, start: int, values: np.ndarray, weather: dict):
+        self.start = start
+        self.values = values
+        self.weather = weather
+        self._csum = np.concatenate(([0.0], np.cumsum(values)))
+
+    @classmethod
+    def from_csv(cls, path: str = HISTORY_PATH, target_col: str = TARGET_COL):
+        df = pd.read_csv(path, usecols=['Time', target_col] + WEATHER_COLS)
+        hours = pd.to_datetime(df['Time'], format='%d/%m/%Y %H:%M').values.astype('datetime64[h]').astype(np.int64)
+        start, end = int(hours.min()), int(hours.max())
+        rows = hours - start
+
+        def column(name):
+            arr = np.full(end - start + 1, np.nan)
+            arr[rows] = df[name].to_numpy(dtype=float)
+            # Same gap handling as training: linear interpolation between neighbours.
+            return pd.Series(arr).interpolate(limit_direction='both').to_numpy()
+
+        weather = {name: column(name) for name in WEATHER_COLS}
+        return cls(start, column(target_col), weather)
+
+    @property
+    def end(self) -> int:
+        """Hour index one past the last stored hour."""
+        return self.start + len(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def contains(self, hour: int) -> bool:
+        return self.start <= hour < self.end
+
+    def value_at(self, hour: int) -> float:
+        if not self.contains(hour):
+            raise KeyError(f"No consumption recorded for hour {hour}")
+        return float(self.values[hour - self.start])
+
+    def lag(self, hour: int, hours: int) -> float:
+        return self.value_at(hour - hours)
+
+    def rolling_mean(self, hour: int, window: int = 24) -> float:
+        """Mean of the ``window`` hours ending at ``hour`` (inclusive)."""
+        lo, hi = hour - window + 1 - self.start, hour + 1 - self.start
+        if lo < 0 or hi > len(self.values):
+            raise KeyError(f"History does not cover {window}h ending at hour {hour}")
+        return float((self._csum[hi] - self._csum[lo]) / window)
+
+    def series(self, first: int, last: int) -> np.ndarray:
+        """Copy of the consumption series for hours ``[first, last)``, NaN outside history."""
+        out = np.full(last - first, np.nan)
+        lo, hi = max(first, self.start), min(last, self.end)
+        if lo < hi:
+            out[lo - first:hi - first] = self.values[lo - self.start:hi - self.start]
+        return out
+
+    def weather_series(self, first: int, last: int) -> dict:
+        """Weather for hours ``[first, last)``.
+
+        Hours past the end of the history reuse the same hour of the last stored
+        day (persistence forecast); hours before it are NaN.
+        """
+        hours = np.arange(first, last)
+        src = np.where(hours >= self.end, hours - 24 * ((hours - self.end) // 24 + 1), hours)
+        valid = (src >= self.start) & (src < self.end)
+        out = {}
+        for name, arr in self.weather.items():
+            col = np.full(len(hours), np.nan)
+            col[valid] = arr[src[valid] - self.start]
+            out[name] = col
+        return out
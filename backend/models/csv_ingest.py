@@ -0,0 +1,110 @@
+# models/csv_ingest.py
+# Chunked CSV ingestion straight into typed column arrays. Only one chunk of
+# parsed text is alive at a time; strings are interned and timestamps parsed
+# with an explicit format into datetime64[ns], so an upload is never held in
+# memory as raw bytes, parser buffers and a DataFrame all at once.
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from models.column_store import ColumnStore
+from models.model_registry import _rss_bytes
+
+INGEST_CHUNK_ROWS = int(os.getenv("SMARTGRID_INGEST_CHUNK_ROWS", "250000"))
+# strftime format of the timestamp column; 'ISO8601' accepts any ISO 8601 layout.
+TIMESTAMP_FORMAT = os.getenv("SMARTGRID_TIMESTAMP_FORMAT", "%Y-%m-%d %H:%M:%S")
+TIMESTAMP_ALIASES = ['Timestamp', 'datetime', 'Date', 'time']
+
+
+def resolve_timestamp_col(columns, preferred: str) -> str:
+    """``preferred`` if present, else the first common timestamp column name."""
+    if preferred in columns:
+        return preferred
+    for col in TIMESTAMP_ALIASES:
+        if col in columns:
+            return col
+    raise ValueError("No timestamp column found")
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size since process start; only meaningful in a process of its own."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+def _intern(values: np.ndarray, vocab: dict) -> np.ndarray:
+    """Object array whose equal strings share one object (missing values become None)."""
+    codes, uniques = pd.factorize(values)
+    table = np.array([vocab.setdefault(u, u) for u in uniques] + [None], dtype=object)
+    return table[codes]
+
+
+def read_csv_columns(source, timestamp_col: str, timestamp_format: str = TIMESTAMP_FORMAT,
+                     chunk_rows: int = INGEST_CHUNK_ROWS):
+    """Parse a CSV path or file object ``chunk_rows`` at a time into a ColumnStore.
+
+    Rows whose timestamp is missing or does not match ``timestamp_format`` are
+    dropped; the latter are counted in ``stats['format_mismatch']``. If none
+    in the first chunk match, the format is assumed wrong and ValueError is
+    raised. Memory is reported as the growth of this process's RSS over the
+    ingest, sampled once per chunk. Returns ``(store, timestamp_col, stats)``.
+    """
+    rss_start = rss_high = _rss_bytes()
+    t0 = time.perf_counter()
+    store, vocab = None, {}
+    rows = dropped = mismatched = chunks = 0
+    for chunk in pd.read_csv(source, chunksize=chunk_rows):
+        if store is None:
+            timestamp_col = resolve_timestamp_col(chunk.columns, timestamp_col)
+        stamps = pd.to_datetime(chunk[timestamp_col], format=timestamp_format, errors='coerce')
+        ok = stamps.notna().to_numpy()
+        if store is None and len(chunk) and not ok.any():
+            raise ValueError(f"No values of '{timestamp_col}' match timestamp format {timestamp_format!r}")
+        rows += len(chunk)
+        dropped += int(len(ok) - ok.sum())
+        mismatched += int((~ok & chunk[timestamp_col].notna().to_numpy()).sum())
+        chunks += 1
+
+        columns = {}
+        for name in chunk.columns:
+            if name == timestamp_col:
+                values = stamps.to_numpy(dtype='datetime64[ns]')[ok]
+            else:
+                values = chunk[name].to_numpy()[ok]
+                if values.dtype == object:
+                    values = _intern(values, vocab.setdefault(name, {}))
+            columns[name] = values
+        if store is None:
+            store = ColumnStore(columns)
+        else:
+            store.extend(columns)
+        rss_high = max(rss_high, _rss_bytes())
+        del chunk, columns, stamps
+
+    if store is None:
+        raise ValueError("CSV file has no rows")
+    if mismatched:
+        print(f"{mismatched} rows dropped: '{timestamp_col}' does not match timestamp format {timestamp_format!r}")
+    stats = {
+        'rows': rows - dropped,
+        'dropped': dropped,
+        'format_mismatch': mismatched,
+        'chunks': chunks,
+        'seconds': round(time.perf_counter() - t0, 3),
+        'store_bytes': store.nbytes,
+        'rss_growth_bytes': max(rss_high - rss_start, 0),
+    }
+    return store, timestamp_col, stats
@@ -2,115 +2,334 @@
 
 import pandas as pd
 import numpy as np
-import joblib
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.metrics import MeanSquaredError
 import holidays
-from datetime import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 
-# Load scaler
-scaler = joblib.load("models/ml_models/scaler.joblib")
+from models.model_registry import registry
+from models.consumption_history import ConsumptionHistory, HISTORY_PATH, hour_index
+from models.feature_kernels import energy_feature_matrix, parse_energy_time, scale_rows
+from models.tree_compiler import load_tree_model
+from models.prediction_cache import PredictionCache, energy_key
+from models.lstm_numpy import NumpyLSTMModel
+
+ENERGY_MODEL_PATHS = {
+    'random_forest': 'models/ml_models/random_forest.joblib',
+    'xgboost': 'models/ml_models/xgboost.joblib',
+    'lightgbm': 'models/ml_models/lightgbm.joblib',
+    'gradient_boosting': 'models/ml_models/gradient_boosting.joblib',
+    'ensemble': 'models/ml_models/ensemble.joblib'
+}
+LSTM_PATH = "models/ml_models/lstm_model.h5"
+SCALER_PATH = "models/ml_models/scaler.joblib"
+# 'numpy' runs the LSTM without TensorFlow; 'keras' loads it with TensorFlow (imported only then).
+LSTM_BACKEND = os.getenv("SMARTGRID_LSTM_BACKEND", "numpy")
+MODEL_THREADS = int(os.getenv("SMARTGRID_MODEL_THREADS", str(min(4, os.cpu_count() or 1))))
+
+_model_pool = ThreadPoolExecutor(max_workers=MODEL_THREADS, thread_name_prefix="energy-model")
+
+
+def _load_keras_lstm(path):
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.metrics import MeanSquaredError
+    lstm_model = load_model(path, custom_objects={"mse": MeanSquaredError()})
+    lstm_model.compile(optimizer='adam', loss='mse', metrics=['mse'])
+    return lstm_model
+
+
+def _load_lstm(path):
+    if LSTM_BACKEND == 'keras':
+        return _load_keras_lstm(path)
+    return NumpyLSTMModel.from_h5(path)
+
+
+registry.register('scaler', SCALER_PATH)
+for _name, _path in ENERGY_MODEL_PATHS.items():
+    registry.register(_name, _path, loader=load_tree_model)
+registry.register('lstm', LSTM_PATH, loader=_load_lstm)
+registry.register('consumption_history', HISTORY_PATH, loader=ConsumptionHistory.from_csv)
+
+# Load scaler eagerly so a missing scaler fails at startup, as before
+registry.get('scaler')
+
+# Cleared whenever the registry reloads the scaler or one of the models.
+energy_cache = PredictionCache("energy")
+_energy_registry_names = {'scaler', 'lstm', *ENERGY_MODEL_PATHS}
+registry.add_reload_listener(
+    lambda name: energy_cache.clear(f"{name} reloaded") if name in _energy_registry_names else None
+)
 
 # Load models
 def load_energy_models():
-    models = {}
-    model_paths = {
-        'random_forest': 'models/ml_models/random_forest.joblib',
-        'xgboost': 'models/ml_models/xgboost.joblib',
-        'lightgbm': 'models/ml_models/lightgbm.joblib',
-        'gradient_boosting': 'models/ml_models/gradient_boosting.joblib',
-        'ensemble': 'models/ml_models/ensemble.joblib'
-    }
-    for name, path in model_paths.items():
-        try:
-            print(f"Loading model: {name} from {path}")
-            models[name] = joblib.load(path)
-            print(f"Model {name} loaded successfully.")
-        except:
-            pass
-
-    try:
-        print("Loading LSTM model...")
-        lstm_model = load_model("models/ml_models/lstm_model.h5", custom_objects={"mse": MeanSquaredError()})
-        lstm_model.compile(optimizer='adam', loss='mse', metrics=['mse'])
-        models['lstm'] = lstm_model
-        print("LSTM model loaded successfully.")
-    except:
-        pass
-
-    return models
+    """Return the resident energy models; files are only re-read when they change."""
+    return registry.get_all(list(ENERGY_MODEL_PATHS) + ['lstm'])
 
-# Preprocess input
-def preprocess_input(payload: dict):
-    time_str = payload['timestamp']
-    # Parse using the original format
-    print("input time: ", time_str)
-    dt = datetime.strptime(time_str, '%Y-%m-%dT%H:%M' if 'T' in time_str else '%Y-%m-%d %H:%M')
-
-    # Reformat to desired format
-    reformatted_time_str = dt.strftime('%d/%m/%Y %H:%M')
-    print("converted time format + ", reformatted_time_str)
-    input_time = pd.to_datetime(reformatted_time_str, format='%d/%m/%Y %H:%M')
-    lag_24h = payload['lag_24h']
+FEATURES = [
+    'hour_sin', 'hour_cos', 'is_weekend', 'is_holiday',
+    'building 41_lag_24h', 'building 41_lag_48h', 'building 41_lag_72h',
+    'building 41_rolling_24h_mean', 'Temp', 'RH', 'FF', 'P'
+]
+SEQ_LEN = 24
+
+
+def parse_timestamp(time_str: str) -> pd.Timestamp:
+    return pd.Timestamp(parse_energy_time(time_str))
+
+
+def build_feature_frame(payloads: list) -> pd.DataFrame:
+    """Feature rows for a list of payloads, in model column order.
+
+    Reference implementation of the features; the request path uses the
+    equivalent DataFrame-free kernel in models/feature_kernels.py.
+    """
+    times = pd.DatetimeIndex([parse_timestamp(p['timestamp']) for p in payloads])
+    lag_24h = np.array([p['lag_24h'] for p in payloads], dtype=float)
     lag_48h = lag_72h = rolling_mean = lag_24h
-    
+
     df = pd.DataFrame({
-        'Time': [input_time],
-        'building 41_lag_24h': [lag_24h],
-        'building 41_lag_48h': [lag_48h],
-        'building 41_lag_72h': [lag_72h],
-        'building 41_rolling_24h_mean': [rolling_mean],
-        'Temp': [payload['Temp']],
-        'RH': [payload['RH']/100],  # Normalize RH to [0, 1]
-        'FF': [payload['FF']],
-        'P': [payload['P']]
+        'Time': times,
+        'building 41_lag_24h': lag_24h,
+        'building 41_lag_48h': lag_48h,
+        'building 41_lag_72h': lag_72h,
+        'building 41_rolling_24h_mean': rolling_mean,
+        'Temp': [p['Temp'] for p in payloads],
+        'RH': [p['RH'] / 100 for p in payloads],  # Normalize RH to [0, 1]
+        'FF': [p['FF'] for p in payloads],
+        'P': [p['P'] for p in payloads]
     })
-    
+
     df['hour'] = df['Time'].dt.hour
     df['day_of_week'] = df['Time'].dt.dayofweek
     df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
-    nl_holidays = holidays.Netherlands(years=[input_time.year])
+    nl_holidays = holidays.Netherlands(years=sorted(set(times.year)))
     df['is_holiday'] = df['Time'].dt.date.isin(nl_holidays).astype(int)
     df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24)
     df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24)
 
-    features = [
-        'hour_sin', 'hour_cos', 'is_weekend', 'is_holiday',
-        'building 41_lag_24h', 'building 41_lag_48h', 'building 41_lag_72h',
-        'building 41_rolling_24h_mean', 'Temp', 'RH', 'FF', 'P'
-    ]
+    return df
+
+
+def _as_tensor(X_seq: np.ndarray):
+    # float32 like the Keras model; both LSTM backends accept a NumPy array.
+    return np.ascontiguousarray(X_seq, dtype=np.float32)
+
+
+def _to_sequences(X_scaled: np.ndarray):
+    # Without history every step of the LSTM window is the current row.
+    return _as_tensor(np.repeat(X_scaled[:, np.newaxis, :], SEQ_LEN, axis=1))
+
+
+# Preprocess input
+def preprocess_batch(payloads: list):
+    times = [parse_energy_time(p['timestamp']) for p in payloads]
+    X_scaled = scale_rows(registry.get('scaler'), energy_feature_matrix(payloads, times))
+    return X_scaled, _to_sequences(X_scaled), times
+
+
+def preprocess_input(payload: dict):
+    print("input time: ", payload['timestamp'])
+    X_scaled, X_seq, times = preprocess_batch([payload])
+    return X_scaled, X_seq, times[0]
+
+
+def _run_model(name: str, model, X_scaled, X_seq):
+    t0 = time.perf_counter()
+    if name.rsplit('/', 1)[-1] == 'lstm':
+        out = np.asarray(model(X_seq), dtype=float).reshape(-1)
+    else:
+        out = np.asarray(model.predict(X_scaled), dtype=float).reshape(-1)
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def _predict_rows(models: dict, X_scaled, X_seq, timings: dict = None) -> dict:
+    """Evaluate the model graph; returns ``{name: array of N floats}``.
+
+    Every base model is a node evaluated exactly once, concurrently on
+    ``_model_pool`` (XGBoost, LightGBM and TensorFlow release the GIL). The
+    ensemble is a node over their outputs: members it shares with the base
+    models reuse those predictions, and only members that are not also base
+    models get a node of their own (``ensemble/<name>``). Per-node latency is
+    written into ``timings`` when given.
+    """
+    ensemble = models.get('ensemble')
+    nodes = {name: model for name, model in models.items() if name != 'ensemble'}
+    if ensemble is not None:
+        for m_name, m in ensemble['models'].items():
+            if m_name not in nodes:
+                nodes[f'ensemble/{m_name}'] = m
+
+    if len(nodes) > 1:
+        futures = {name: _model_pool.submit(_run_model, name, m, X_scaled, X_seq) for name, m in nodes.items()}
+        outputs = {name: f.result() for name, f in futures.items()}
+    else:
+        outputs = {name: _run_model(name, m, X_scaled, X_seq) for name, m in nodes.items()}
+
+    raw = {}
+    for name in models:
+        if name != 'ensemble':
+            raw[name] = outputs[name][0]
+            continue
+        t0 = time.perf_counter()
+        members = list(ensemble['models'])
+        member_preds = [outputs[m if m in outputs else f'ensemble/{m}'][0] for m in members]
+        raw[name] = np.average(np.vstack(member_preds), axis=0,
+                               weights=[ensemble['weights'][m] for m in members])
+        if timings is not None:
+            timings[name] = round((time.perf_counter() - t0) * 1000, 3)
+
+    if timings is not None:
+        for name, (_, ms) in outputs.items():
+            timings[name] = round(ms, 3)
+    return raw
 
-    X_scaled = scaler.transform(df[features])
-    X_seq = np.repeat(X_scaled, 24, axis=0).reshape(1, 24, len(features))
-    
-    return X_scaled, tf.convert_to_tensor(X_seq, dtype=tf.float32), input_time
 
 # Predict
 def predict_energy_consumption(payload: dict):
+    key = energy_key(payload)
+    cached = energy_cache.get(key)
+    if cached is not None:
+        return cached
+
     models = load_energy_models()
-    print("Models loaded successfully.")
     X_scaled, X_seq, input_time = preprocess_input(payload)
     print("Input data preprocessed successfully.")
-    predictions = {}
-
-    for name, model in models.items():
-        if name == 'lstm':
-            pred = np.round(model(X_seq).numpy().flatten()[0]).astype(int)
-        elif name == 'ensemble':
-            weights = model['weights']
-            model_preds = []
-            for m_name, m in model['models'].items():
-                if m_name == 'lstm':
-                    model_preds.append(model['models'][m_name](X_seq).numpy().flatten()[0])
-                else:
-                    model_preds.append(model['models'][m_name].predict(X_scaled)[0])
-            pred = np.round(np.average(model_preds, weights=[weights[m] for m in model['models']])).astype(int)
-        else:
-            pred = np.round(model.predict(X_scaled)[0]).astype(int)
-        predictions[name] = int(pred)
+    timings = {}
+    raw = _predict_rows(models, X_scaled, X_seq, timings)
+    print("Per-model latency (ms):", timings)
+    predictions = {name: int(np.round(values[0])) for name, values in raw.items()}
 
-    return {
+    result = {
         'timestamp': input_time.strftime('%Y-%m-%d %H:%M'),
         'predictions': predictions
     }
+    energy_cache.put(key, result)
+    return result
+
+
+def predict_energy_batch(payloads: list):
+    """Score N payloads with one scaler call, one predict per model and one LSTM call."""
+    t0 = time.perf_counter()
+    models = load_energy_models()
+    X_scaled, X_seq, times = preprocess_batch(payloads)
+    t1 = time.perf_counter()
+    timings = {}
+    raw = _predict_rows(models, X_scaled, X_seq, timings)
+    t2 = time.perf_counter()
+
+    rounded = {name: np.round(values).astype(int) for name, values in raw.items()}
+    stamps = [t.strftime('%Y-%m-%d %H:%M') for t in times]
+    results = [
+        {
+            'timestamp': stamps[i],
+            'predictions': {name: int(values[i]) for name, values in rounded.items()}
+        }
+        for i in range(len(payloads))
+    ]
+    elapsed = time.perf_counter() - t0
+    n = len(payloads)
+
+    return {
+        'results': results,
+        'stats': {
+            'rows': n,
+            'preprocess_ms': round((t1 - t0) * 1000, 3),
+            'predict_ms': round((t2 - t1) * 1000, 3),
+            'model_ms': timings,
+            'elapsed_ms': round(elapsed * 1000, 3),
+            'ms_per_row': round(elapsed * 1000 / n, 4) if n else 0.0,
+            'rows_per_second': round(n / elapsed, 1) if elapsed > 0 else None
+        }
+    }
+
+
+def predict_energy_rows(payloads: list) -> list:
+    """Per-row results of ``predict_energy_batch``; the micro-batching scheduler's batch function."""
+    return predict_energy_batch(payloads)['results']
+
+
+# Forecast
+FORECAST_BLOCK = 24  # the shortest lag: every feature of a block is known before it is scored
+MAX_LAG = 72
+
+
+def _holiday_days(years) -> np.ndarray:
+    epoch = date(1970, 1, 1)
+    return np.array([(d - epoch).days for d in holidays.Netherlands(years=years)], dtype=np.int64)
+
+
+def _feature_matrix(hours, lag_24h, lag_48h, lag_72h, rolling_mean, weather) -> np.ndarray:
+    """Unscaled feature rows (FEATURES order) for whole-hour epoch indices."""
+    hour_of_day = hours % 24
+    days = hours // 24
+    day_of_week = (days + 3) % 7  # 1970-01-01 was a Thursday
+    years = np.unique(days.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970)
+    is_holiday = np.isin(days, _holiday_days(years.tolist()))
+    return np.column_stack([
+        np.sin(2 * np.pi * hour_of_day / 24),
+        np.cos(2 * np.pi * hour_of_day / 24),
+        (day_of_week >= 5).astype(float),
+        is_holiday.astype(float),
+        lag_24h, lag_48h, lag_72h, rolling_mean,
+        weather['Temp'], weather['RH'], weather['FF'], weather['P'],
+    ])
+
+
+def forecast_energy_consumption(start: str = None, horizon: int = 24, driver: str = None):
+    """Recursive multi-step forecast from the consumption history.
+
+    Steps are scored in blocks of ``FORECAST_BLOCK`` hours: lags of 24h and more
+    and the trailing 24h mean of the lagged series are all known at the start of
+    a block, so each block is one vectorized pass through the model pipeline and
+    its predictions become the history of the next block. ``driver`` picks the
+    model whose predictions are fed back (default: the mean of all models).
+    """
+    t_start = time.perf_counter()
+    history = registry.get('consumption_history')
+    t0 = history.end if start is None else hour_index(parse_timestamp(start))
+    first = t0 - (SEQ_LEN - 1) - MAX_LAG
+    if first < history.start or t0 > history.end:
+        raise ValueError("Not enough consumption history before the forecast start.")
+
+    models = load_energy_models()
+    if driver is not None and driver not in models:
+        raise ValueError(f"Unknown model '{driver}'. Available: {sorted(models)}")
+    scaler = registry.get('scaler')
+
+    values = np.concatenate([history.series(first, t0), np.full(horizon, np.nan)])
+    weather = history.weather_series(t0 - (SEQ_LEN - 1), t0 + horizon)
+    forecast = np.empty(horizon)
+    per_model = {name: np.empty(horizon) for name in models}
+
+    for b in range(t0, t0 + horizon, FORECAST_BLOCK):
+        e = min(b + FORECAST_BLOCK, t0 + horizon)
+        # Feature rows for the block plus the SEQ_LEN - 1 hours before it (LSTM window).
+        hours = np.arange(b - (SEQ_LEN - 1), e)
+        idx = hours - first
+        windows = np.lib.stride_tricks.sliding_window_view(values, SEQ_LEN)
+        rolling_mean = windows[idx - 24 - (SEQ_LEN - 1)].mean(axis=1)
+        w = {name: col[hours - (t0 - (SEQ_LEN - 1))] for name, col in weather.items()}
+        F = _feature_matrix(hours, values[idx - 24], values[idx - 48], values[idx - 72], rolling_mean, w)
+        F = scale_rows(scaler, F)
+
+        X_scaled = F[SEQ_LEN - 1:]
+        X_seq = np.lib.stride_tricks.sliding_window_view(F, SEQ_LEN, axis=0).transpose(0, 2, 1)
+        raw = _predict_rows(models, X_scaled, _as_tensor(X_seq))
+
+        block = raw[driver] if driver is not None else np.mean(np.vstack(list(raw.values())), axis=0)
+        values[b - first:e - first] = block
+        forecast[b - t0:e - t0] = block
+        for name, preds in raw.items():
+            per_model[name][b - t0:e - t0] = preds
+
+    stamps = np.arange(t0, t0 + horizon).astype('datetime64[h]')
+    return {
+        'start': str(stamps[0].astype('datetime64[m]')).replace('T', ' '),
+        'horizon': horizon,
+        'driver': driver or 'mean',
+        'timestamps': [s.replace('T', ' ') for s in np.datetime_as_string(stamps, unit='m').tolist()],
+        'forecast': np.round(forecast).astype(int).tolist(),
+        'predictions': {name: np.round(p).astype(int).tolist() for name, p in per_model.items()},
+        'elapsed_ms': round((time.perf_counter() - t_start) * 1000, 3)
+    }
@@ -1,121 +1,501 @@
 # -*- coding: utf-8 -*-
 # fast_timestamp.py
-import numpy as np, pandas as pd, time, joblib, sys
+import numpy as np, pandas as pd, time, joblib, sys, os, threading
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.neighbors import BallTree
 
+from models.column_store import ColumnStore
+from models.csv_ingest import TIMESTAMP_FORMAT, read_csv_columns, resolve_timestamp_col
+from models.model_registry import _rss_bytes
+from models.timestamp_index import SortedTimestampIndex
+from models.partition_index import PARTITION_COLUMNS, PartitionedTimestampIndex
+from models.timestamp_features import timestamp_features
+from models.search_snapshot import SNAPSHOT_DIR, load_snapshot, save_snapshot
+
+# Rows added since the last tree build are searched by brute force; past this
+# many the tree is rebuilt in the background to include them.
+DELTA_MERGE_ROWS = int(os.getenv("SMARTGRID_SEARCH_DELTA_ROWS", "1024"))
+# 'balltree' (13 timestamp features) or 'sorted' (nearest epoch time, O(log n)).
+SEARCH_BACKEND = os.getenv("SMARTGRID_SEARCH_BACKEND", "balltree")
+SEARCH_BACKENDS = ('balltree', 'sorted')
+# Batch queries of at least this many timestamps are split across threads
+# (BallTree.query releases the GIL).
+BATCH_THREADS = int(os.getenv("SMARTGRID_SEARCH_BATCH_THREADS", str(min(4, os.cpu_count() or 1))))
+BATCH_PARALLEL_ROWS = int(os.getenv("SMARTGRID_SEARCH_BATCH_PARALLEL_ROWS", "2048"))
+# Bounds the (queries x delta rows x features) temporary of the delta scan.
+_DELTA_BLOCK_BYTES = 64 * 2 ** 20
+
+_batch_pool = ThreadPoolExecutor(max_workers=BATCH_THREADS, thread_name_prefix="search-batch")
+
+def _epoch_ns(ts) -> int:
+    t = pd.Timestamp(ts)
+    if pd.isna(t):
+        raise ValueError(f"Invalid timestamp: {ts!r}")
+    return t.value
+
+def _parse_many(values) -> pd.DatetimeIndex:
+    """Parse a batch of query timestamps, vectorized when they share one format.
+
+    pandas infers a single format for the whole list, so a batch that mixes
+    formats or time zones is parsed again one value at a time, the way
+    ``search`` parses its single timestamp.
+    """
+    values = list(values)
+    try:
+        stamps = pd.DatetimeIndex(pd.to_datetime(values, errors='coerce'))
+    except (TypeError, ValueError):
+        stamps = None
+    if stamps is not None and not stamps.hasnans:
+        return stamps
+    epochs, bad = np.empty(len(values), dtype=np.int64), []
+    for i, value in enumerate(values):
+        try:
+            epochs[i] = _epoch_ns(value)
+        except (TypeError, ValueError):
+            bad.append(i)
+    if bad:
+        raise ValueError(f"Invalid timestamps at positions {bad[:10]}")
+    return pd.DatetimeIndex(epochs.view('datetime64[ns]'))
+
+class IndexSnapshot(NamedTuple):
+    """One consistent, immutable view of the searchable rows and their indexes.
+
+    Queries pin the current snapshot once and use nothing else, so a rebuild
+    or an add published meanwhile cannot mix old rows with a new tree.
+    ``store`` and ``pre`` are shared with later snapshots of the same dataset
+    but only ever appended to, so their first ``n`` rows never change.
+    """
+    version: int
+    generation: int                 # bumped when the dataset is replaced
+    timestamp_col: str
+    store: ColumnStore | None
+    n: int                          # rows visible in this snapshot
+    pre: np.ndarray | None          # timestamp features of rows [0, n)
+    tree: BallTree | None
+    n_tree: int                     # rows covered by ``tree``
+    time_index: SortedTimestampIndex | None
+    partitions: PartitionedTimestampIndex | None
+
+    def rows(self, idx) -> pd.DataFrame:
+        return self.store.take(idx)
+
+    def columns_at(self, idx, names=None) -> dict:
+        """``{column: values at idx}`` as arrays, for columnar responses."""
+        names = self.store.columns if names is None else names
+        unknown = [c for c in names if c not in self.store.columns]
+        if unknown:
+            raise ValueError(f"Unknown columns: {unknown}")
+        out = {}
+        for name in names:
+            values = self.store.column(name)[idx]
+            if values.dtype.kind == 'M':  # ISO text, None for NaT
+                text = np.datetime_as_string(values, unit='s').astype(object)
+                text[np.isnat(values)] = None
+                values = text
+            out[name] = values
+        return out
+
+
+_EMPTY = IndexSnapshot(0, 0, "timestamp", None, 0, None, None, 0, None, None)
+
+
 class FastTimestampSearch:
-    """بحث سريع عن أقرب سجلات زمنية باستخدام BallTree فقط."""
+    """بحث سريع عن أقرب سجلات زمنية باستخدام BallTree فقط.
+
+    Rows live in an append-only ColumnStore and their features in ``pre``. The
+    BallTree covers the first ``n_tree`` rows; rows added after that form a
+    small delta that each query scans exactly, so adds are O(1) and results
+    stay exact while the merged tree is built on a background thread.
+
+    ``time_index`` answers the same rows by raw timestamp (nearest, range,
+    last N before t) with bisection; ``search(backend='sorted')`` uses it.
+    ``partitions`` holds one such index per bulb, condition and fault type, so
+    filtered queries only touch the rows of the most selective filter.
+
+    All of it is published as one IndexSnapshot (``index``). Readers take no
+    lock; writers build the next snapshot and swap it in under ``_lock``.
+    Query methods accept ``index=`` so a caller can answer a query and fetch
+    its rows from the same pinned snapshot.
+    """
 
     def __init__(self):
-        self.timestamp_col = "timestamp"
-        self.data: pd.DataFrame | None = None
-        self.pre : np.ndarray   | None = None
-        self.ball_tree: BallTree | None = None
+        self._index = _EMPTY
+        self._merging = False
+        self._dirty = False   # changed since the last snapshot
+        self._lock = threading.Lock()  # serialises writers only
+        self._snapshot_lock = threading.Lock()
+
+    @property
+    def index(self) -> IndexSnapshot:
+        """The current snapshot; pin it once per query."""
+        return self._index
+
+    @property
+    def timestamp_col(self) -> str:
+        return self._index.timestamp_col
+
+    @property
+    def store(self) -> ColumnStore | None:
+        return self._index.store
+
+    # ---------- rows ----------
+    @property
+    def data(self) -> pd.DataFrame | None:
+        """The rows as a DataFrame (materialised on each access; prefer ``rows``)."""
+        snap = self._index
+        return snap.store.take(np.arange(snap.n)) if snap.store is not None else None
+
+    def rows(self, idx, index: IndexSnapshot = None) -> pd.DataFrame:
+        return (index or self._index).rows(idx)
+
+    def columns_at(self, idx, names=None, index: IndexSnapshot = None) -> dict:
+        return (index or self._index).columns_at(idx, names)
+
+    def __len__(self):
+        return self._index.n
+
+    # ---------- publishing ----------
+    def _build_index(self, store: ColumnStore, timestamp_col: str) -> IndexSnapshot:
+        """A complete snapshot over ``store``; runs without any lock held."""
+        t0 = time.perf_counter()
+        stamps = store.column(timestamp_col)
+        pre = self._prep(stamps)
+        tree = BallTree(pre)
+        time_index = SortedTimestampIndex.from_datetimes(stamps)
+        partitions = _partition(store, time_index)
+        print(f"BallTree built successfully ({len(pre)} rows, {(time.perf_counter() - t0) * 1000:.1f} ms).")
+        return IndexSnapshot(0, 0, timestamp_col, store, len(pre), pre, tree, len(pre), time_index, partitions)
+
+    def _replace_dataset(self, snap: IndexSnapshot, dirty: bool = True) -> IndexSnapshot:
+        """Publish a snapshot of a new dataset; queries already running keep the old one."""
+        with self._lock:
+            current = self._index
+            self._index = snap._replace(version=current.version + 1, generation=current.generation + 1)
+            self._dirty = dirty
+            return self._index
 
     # ---------- تحميل البيانات من ملف ----------
-    def load_data(self, file_obj, file_type='csv'): # Corrected indentation
+    def load_data(self, file_obj, file_type='csv', timestamp_format: str = None): # Corrected indentation
         """Load dataset from file object with robust timestamp handling."""
         try:
-            print(f"Loading data from {file_type} file...")
-            if file_type == 'csv':
-                print("Parsing CSV file...")
-                self.data = pd.read_csv(file_obj, parse_dates=[self.timestamp_col])
-                print(f"CSV file loaded with {len(self.data)} records")
-            elif file_type == 'excel':
-                self.data = pd.read_excel(file_obj, parse_dates=[self.timestamp_col])
-            else:
-                raise ValueError("Unsupported file type")
-
-            print(f"Loaded {len(self.data)} records from {file_type} file")
-            # Ensure timestamp column exists
-            if self.timestamp_col not in self.data.columns:
-                # Try common timestamp column names
-                for col in ['Timestamp', 'datetime', 'Date', 'time']:
-                    if col in self.data.columns:
-                        self.timestamp_col = col
-                        break
-                else:
-                    raise ValueError("No timestamp column found")
-
-            # Convert to datetime if not already
-            if not pd.api.types.is_datetime64_any_dtype(self.data[self.timestamp_col]):
-                self.data[self.timestamp_col] = pd.to_datetime(
-                    self.data[self.timestamp_col],
-                    errors='coerce'
-                )
-
-            # Remove rows with invalid timestamps
-            initial_count = len(self.data)
-            self.data = self.data.dropna(subset=[self.timestamp_col])
-            final_count = len(self.data)
-            self._build_tree()
-
-            print(f"Loaded {final_count} records ({initial_count - final_count} invalid timestamps removed)")
-            print(f"Time range: {self.data[self.timestamp_col].min()} to {self.data[self.timestamp_col].max()}")
-            print(self.data.tail(5))  # Print last 5 records for verification
-
+            self.ingest(file_obj, file_type, timestamp_format)
             return True
         except Exception as e:
             print(f"Error loading data: {str(e)}")
             return False
 
+    def ingest(self, source, file_type='csv', timestamp_format: str = None) -> dict:
+        """Load a dataset from a path or file object and publish a new index; raises on bad input.
+
+        CSVs are parsed in chunks straight into typed columns with an explicit
+        timestamp format (models/csv_ingest.py); Excel files are read whole.
+        The current index keeps serving queries until the new one is swapped in.
+        Returns ingestion stats (rows, dropped rows, seconds, RSS growth, version).
+        """
+        print(f"Loading data from {file_type} file...")
+        rss_start = _rss_bytes()
+        if file_type == 'csv':
+            store, timestamp_col, stats = read_csv_columns(
+                source, self.timestamp_col, timestamp_format or TIMESTAMP_FORMAT)
+        elif file_type == 'excel':
+            t0 = time.perf_counter()
+            df = pd.read_excel(source)
+            timestamp_col = resolve_timestamp_col(df.columns, self.timestamp_col)
+            present = df[timestamp_col].notna()
+            df[timestamp_col] = pd.to_datetime(df[timestamp_col], format=timestamp_format, errors='coerce')
+            mismatched = int((present & df[timestamp_col].isna()).sum())
+            initial_count = len(df)
+            df = df.dropna(subset=[timestamp_col])
+            store = ColumnStore.from_frame(df.reset_index(drop=True))
+            stats = {'rows': len(df), 'dropped': initial_count - len(df), 'format_mismatch': mismatched,
+                     'chunks': 1, 'seconds': round(time.perf_counter() - t0, 3), 'store_bytes': store.nbytes,
+                     'rss_growth_bytes': max(_rss_bytes() - rss_start, 0)}
+        else:
+            raise ValueError("Unsupported file type")
+
+        snap = self._replace_dataset(self._build_index(store, timestamp_col))
+        stats['total_rss_growth_bytes'] = max(_rss_bytes() - rss_start, stats['rss_growth_bytes'], 0)
+        stats['version'] = snap.version
+        stamps = store.column(timestamp_col)
+        print(f"Loaded {stats['rows']} records ({stats['dropped']} invalid timestamps removed) "
+              f"in {stats['seconds']} s, RSS grew {stats['total_rss_growth_bytes'] / 2 ** 20:.0f} MB")
+        print(f"Time range: {stamps.min()} to {stamps.max()}")
+        return stats
+
 
     # ---------- تحويل الطابع الزمني إلى ميزات ----------
     def _prep(self, ts) -> np.ndarray:
-        dt_idx = pd.to_datetime(ts, errors="coerce")
-        feats = []
-        for dt in dt_idx:
-            if pd.isna(dt):
-                feats.append([0]*13); continue
-            if isinstance(dt, np.datetime64):
-                dt = pd.Timestamp(dt)
-            feats.append([
-                dt.timestamp(),
-                np.sin(2*np.pi*dt.hour/23), np.cos(2*np.pi*dt.hour/23),
-                dt.dayofweek, dt.month, dt.hour, dt.minute, dt.day,
-                dt.isocalendar().week, dt.dayofyear, dt.year,
-                int(dt.month > 6), int((dt.hour >= 18) | (dt.hour <= 6))
-            ])
-        return np.array(feats, dtype=float)
+        """13 timestamp features per row (models/timestamp_features.py); zeros for invalid timestamps."""
+        return timestamp_features(ts)
 
     # ---------- تحميل نموذج محفوظ ----------
     def load_model(self, joblib_path: str):
         bundle = joblib.load(joblib_path)
-        self.ball_tree = bundle["ball_tree"]
-        self.pre       = bundle["pre"]
-        self.data      = bundle["data"]
+        store = ColumnStore.from_frame(bundle["data"].reset_index(drop=True))
+        pre = np.ascontiguousarray(bundle["pre"], dtype=float)
+        time_index = SortedTimestampIndex.from_datetimes(store.column(self.timestamp_col))
+        self._replace_dataset(IndexSnapshot(
+            0, 0, self.timestamp_col, store, len(pre), pre, bundle["ball_tree"], len(pre),
+            time_index, _partition(store, time_index)))
         print(f"✓ تم تحميل النموذج من {joblib_path}")
 
     # ---------- البحث ----------
-    def search(self, ts_text: str, k: int = 5):
+    def search(self, ts_text: str, k: int = 5, backend: str = None, filters: dict = None,
+               start: str = None, end: str = None, index: IndexSnapshot = None):
+        snap = index or self._index
+        if filters or start is not None or end is not None:
+            if backend not in (None, 'sorted'):
+                raise ValueError("Filtered and windowed searches use the sorted timestamp indexes; "
+                                 "omit backend or use 'sorted'")
+            return self.search_filtered(ts_text, k, filters, start, end, index=snap)
+        backend = backend or SEARCH_BACKEND
+        if backend == 'sorted':
+            return self.search_time(ts_text, k, index=snap)
+        if backend != 'balltree':
+            raise ValueError(f"Unknown search backend '{backend}'. Available: {list(SEARCH_BACKENDS)}")
         q = self._prep([ts_text])[0]
         t0 = time.perf_counter()                 # ← بدلاً من time.time()
-        dist, idx = self.ball_tree.query([q], k=k)
+        tree, pre, n_tree, n = snap.tree, snap.pre, snap.n_tree, snap.n
+        k_tree = min(k, n_tree)
+        if k_tree:
+            dist, idx = tree.query([q], k=k_tree)
+            dist, idx = dist[0], idx[0]
+        else:
+            dist, idx = np.empty(0), np.empty(0, dtype=np.intp)
+        if n > n_tree:
+            # Exact scan of the rows the tree does not cover yet.
+            delta_dist = np.sqrt(((pre[n_tree:n] - q) ** 2).sum(axis=1))
+            dist = np.concatenate([dist, delta_dist])
+            idx = np.concatenate([idx, np.arange(n_tree, n)])
+            order = np.argsort(dist, kind='stable')[:k]
+            dist, idx = dist[order], idx[order]
         elapsed_ms = (time.perf_counter() - t0) * 1000   # ملي ثانية بدقّة عالية
-        return idx[0], dist[0], elapsed_ms
-    
-    def _build_tree(self):
-        """Build BallTree from current data."""
-        self.pre = self._prep(self.data[self.timestamp_col])
-        self.ball_tree = BallTree(self.pre)
-        print("BallTree built successfully.")
+        return idx, dist, elapsed_ms
+
+    def search_batch(self, timestamps, k=5, backend: str = None, index: IndexSnapshot = None):
+        """Neighbours of many timestamps with one vectorized query.
+
+        ``k`` is an int or one int per timestamp. Results are in CSR layout: the
+        neighbours of query ``i`` are ``indices[offsets[i]:offsets[i + 1]]``,
+        closest first. Returns ``(offsets, indices, distances, elapsed_ms)``.
+        """
+        snap = index or self._index
+        backend = backend or SEARCH_BACKEND
+        if backend not in SEARCH_BACKENDS:
+            raise ValueError(f"Unknown search backend '{backend}'. Available: {list(SEARCH_BACKENDS)}")
+        m = len(timestamps)
+        ks = np.asarray(k, dtype=np.int64)
+        if ks.ndim and len(ks) != m:
+            raise ValueError(f"k has {len(ks)} values for {m} timestamps")
+        ks = np.broadcast_to(ks, (m,))
+        if m and ks.min() < 1:
+            raise ValueError("k must be at least 1")
+        if m == 0:
+            return np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0), 0.0
+        stamps = _parse_many(timestamps)
+        kmax = int(ks.max())
+
+        t0 = time.perf_counter()
+        if backend == 'sorted':
+            idx, dist = snap.time_index.nearest_many(stamps.asi8, kmax)
+        else:
+            idx, dist = self._query_tree_batch(snap, self._prep(stamps), kmax)
+        cols = idx.shape[1]
+        take = np.minimum(ks, cols)
+        mask = np.arange(cols) < take[:, np.newaxis]
+        offsets = np.concatenate([[0], np.cumsum(take)])
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        return offsets, idx[mask], dist[mask], elapsed_ms
+
+    def _query_tree_batch(self, snap: IndexSnapshot, Q: np.ndarray, k: int):
+        tree, pre, n_tree, n = snap.tree, snap.pre, snap.n_tree, snap.n
+        m = len(Q)
+        k_tree = min(k, n_tree)
+        if k_tree == 0:
+            dist, idx = np.empty((m, 0)), np.empty((m, 0), dtype=np.intp)
+        elif m >= BATCH_PARALLEL_ROWS and BATCH_THREADS > 1:
+            parts = list(_batch_pool.map(lambda chunk: tree.query(chunk, k=k_tree),
+                                         np.array_split(Q, BATCH_THREADS)))
+            dist = np.vstack([d for d, _ in parts])
+            idx = np.vstack([i for _, i in parts])
+        else:
+            dist, idx = tree.query(Q, k=k_tree)
+        if n > n_tree:
+            delta = pre[n_tree:n]
+            block = max(1, _DELTA_BLOCK_BYTES // (len(delta) * delta.shape[1] * 8))
+            delta_dist = np.empty((m, len(delta)))
+            for s in range(0, m, block):
+                delta_dist[s:s + block] = np.sqrt(((Q[s:s + block, np.newaxis, :] - delta) ** 2).sum(axis=2))
+            dist = np.concatenate([dist, delta_dist], axis=1)
+            idx = np.concatenate([idx, np.broadcast_to(np.arange(n_tree, n), (m, len(delta)))], axis=1)
+            order = np.argsort(dist, axis=1, kind='stable')[:, :k]
+            dist, idx = np.take_along_axis(dist, order, axis=1), np.take_along_axis(idx, order, axis=1)
+        return idx, dist
+
+    def search_time(self, ts_text: str, k: int = 5, index: IndexSnapshot = None):
+        """k nearest rows by timestamp alone; distances are in seconds."""
+        snap = index or self._index
+        t = _epoch_ns(ts_text)
+        t0 = time.perf_counter()
+        idx, dist = snap.time_index.nearest(t, k)
+        return idx, dist, (time.perf_counter() - t0) * 1000
+
+    def search_filtered(self, ts_text: str, k: int = 5, filters: dict = None, start: str = None, end: str = None,
+                        index: IndexSnapshot = None):
+        """k nearest rows by timestamp among those matching ``filters`` ({column: value})
+        with ``start <= timestamp <= end``; distances are in seconds."""
+        snap = index or self._index
+        t = _epoch_ns(ts_text)
+        window = (_epoch_ns(start) if start else None, _epoch_ns(end) if end else None)
+        t0 = time.perf_counter()
+        found, keep = _filtered_index(snap, filters)
+        if found is None:
+            idx, dist = np.empty(0, dtype=np.int64), np.empty(0)
+        else:
+            idx, dist = found.nearest_within(t, k, *window, keep=keep)
+        return idx, dist, (time.perf_counter() - t0) * 1000
+
+    def search_range(self, start: str = None, end: str = None, limit: int = None, filters: dict = None,
+                     index: IndexSnapshot = None):
+        """Rows with ``start <= timestamp <= end`` in time order, optionally filtered."""
+        snap = index or self._index
+        window = (_epoch_ns(start) if start else None, _epoch_ns(end) if end else None)
+        t0 = time.perf_counter()
+        found, keep = _filtered_index(snap, filters)
+        if found is None:
+            idx = np.empty(0, dtype=np.int64)
+        elif keep is None:
+            idx = found.range(*window, limit)
+        else:
+            idx = found.range(*window)
+            idx = idx[keep(idx)][:limit]
+        return idx, (time.perf_counter() - t0) * 1000
+
+    def last_before(self, ts_text: str, n: int = 10, filters: dict = None, index: IndexSnapshot = None):
+        """The ``n`` latest rows at or before ``ts_text``, most recent first, optionally filtered."""
+        snap = index or self._index
+        t = _epoch_ns(ts_text)
+        t0 = time.perf_counter()
+        found, keep = _filtered_index(snap, filters)
+        if found is None:
+            idx = np.empty(0, dtype=np.int64)
+        elif keep is None:
+            idx = found.last_before(t, n)
+        else:
+            # Nearest within (-inf, t] is most recent first.
+            idx, _ = found.nearest_within(t, n, end=t, keep=keep)
+        return idx, (time.perf_counter() - t0) * 1000
+
+    def _merge_delta(self, generation: int):
+        """Rebuild the tree over every row so far and publish it (background thread)."""
+        try:
+            snap = self._index
+            t0 = time.perf_counter()
+            tree = BallTree(snap.pre[:snap.n])
+            with self._lock:
+                current = self._index
+                if current.generation == generation and snap.n > current.n_tree:
+                    self._index = current._replace(version=current.version + 1, tree=tree, n_tree=snap.n)
+            print(f"BallTree merged {snap.n} rows in {(time.perf_counter() - t0) * 1000:.1f} ms.")
+        finally:
+            self._merging = False
 
     def add_entry(self, entry: dict):
         print("Adding new entry from core logic:", entry)
         # Ensure timestamp is a pandas Timestamp
         if isinstance(entry[self.timestamp_col], str):
             entry[self.timestamp_col] = pd.to_datetime(entry[self.timestamp_col], errors='coerce')
-        if self.data is None:
+        if self._index.store is None:
             print("No data loaded, initializing with the new entry.")
-            self.data = pd.DataFrame([entry])
-        else:
-            print(f"Current data size: {len(self.data)} records")
-            self.data = pd.concat([self.data, pd.DataFrame([entry])], ignore_index=True)
-        # Ensure the whole column is datetime
-        self.data[self.timestamp_col] = pd.to_datetime(self.data[self.timestamp_col], errors='coerce')
-        if not set(entry.keys()).issubset(set(self.data.columns)):
-            raise ValueError("New entry has different columns than existing data")
-        self._build_tree()
-        print(f"New entry added. Total records: {len(self.data)}")
-        print(f"Time range: {self.data[self.timestamp_col].min()} to {self.data[self.timestamp_col].max()}")
-        print(self.data.tail(5))  # Print last 5 records for verification
\ No newline at end of file
+            self._replace_dataset(self._build_index(ColumnStore.from_frame(pd.DataFrame([entry])), self.timestamp_col))
+            return
+        q = self._prep([entry[self.timestamp_col]])[0]
+        ts = pd.Timestamp(entry[self.timestamp_col])
+        with self._lock:
+            snap = self._index
+            n = snap.store.append(entry)
+            pre = snap.pre
+            if n >= len(pre) or not pre.flags.writeable:
+                # Grow into a new array; earlier snapshots keep the old one.
+                grown = np.empty((max(2 * len(pre), n + 1, 1024), pre.shape[1]))
+                grown[:n] = pre[:n]
+                pre = grown
+            pre[n] = q
+            time_index, partitions = snap.time_index, snap.partitions
+            if not pd.isna(ts):
+                time_index = time_index.inserted(_epoch_ns(ts), n)
+                partitions = partitions.inserted(entry, _epoch_ns(ts), n)
+            self._index = snap._replace(version=snap.version + 1, n=n + 1, pre=pre,
+                                        time_index=time_index, partitions=partitions)
+            self._dirty = True
+            merge = n + 1 - snap.n_tree >= DELTA_MERGE_ROWS and not self._merging
+            if merge:
+                self._merging = True
+        if merge:
+            threading.Thread(target=self._merge_delta, args=(snap.generation,), daemon=True).start()
+        print(f"New entry added. Total records: {n + 1} ({n + 1 - snap.n_tree} awaiting merge)")
+
+    # ---------- snapshots ----------
+    def save_snapshot(self, root: str = SNAPSHOT_DIR) -> str:
+        """Persist the rows and the index as a new snapshot version (models/search_snapshot.py)."""
+        with self._snapshot_lock:
+            with self._lock:
+                snap = self._index
+                self._dirty = False
+            n = snap.n
+            columns = {name: snap.store.column(name)[:n] for name in snap.store.columns}
+            t0 = time.perf_counter()
+            times, time_rows = snap.time_index.sorted_arrays()
+            path = save_snapshot(root, columns, snap.timestamp_col, snap.pre[:n], snap.tree, snap.n_tree,
+                                 times, time_rows)
+            print(f"Search index snapshot ({n} rows) written to {path} in {(time.perf_counter() - t0) * 1000:.1f} ms")
+            return path
+
+    def load_snapshot(self, root: str = SNAPSHOT_DIR) -> bool:
+        """Restore the current snapshot; False if there is none. Raises SnapshotError if it is invalid."""
+        t0 = time.perf_counter()
+        snap = load_snapshot(root)
+        if snap is None:
+            return False
+        meta = snap['meta']
+        store = ColumnStore(snap['columns'], rows=meta['rows'])
+        time_index = SortedTimestampIndex.from_sorted(snap['times'], snap['time_rows'])
+        # Partitions are not stored; one stable sort over the restored index rebuilds them.
+        partitions = _partition(store, time_index)
+        # ``pre`` is a read-only memory map; the first add copies it into a growable array.
+        self._replace_dataset(IndexSnapshot(
+            0, 0, meta['timestamp_col'], store, meta['rows'], snap['features'], snap['tree'], meta['n_tree'],
+            time_index, partitions), dirty=False)
+        print(f"Restored search index v{meta['version']} ({meta['rows']} rows) from {snap['path']} "
+              f"in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        return True
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+
+def _partition(store: ColumnStore, time_index: SortedTimestampIndex) -> PartitionedTimestampIndex:
+    columns = {c: store.column(c) for c in PARTITION_COLUMNS if c in store.columns}
+    return PartitionedTimestampIndex.build(columns, *time_index.sorted_arrays())
+
+
+def _filtered_index(snap: IndexSnapshot, filters: dict = None):
+    """The timestamp index to scan for ``filters`` and a predicate for the
+    filters it does not cover: ``(index, keep)``. ``index`` is None when
+    nothing can match; ``keep`` is None when the index is exact."""
+    if not filters:
+        return snap.time_index, None
+    index, column = snap.partitions.most_selective(filters)
+    rest = {c: v for c, v in filters.items() if c != column}
+    if index is None or not rest:
+        return index, None
+    columns = [(snap.store.column(c), v) for c, v in rest.items()]
+
+    def keep(rows):
+        mask = np.ones(len(rows), dtype=bool)
+        for values, value in columns:
+            mask &= values[rows] == value
+        return mask
+    return index, keep
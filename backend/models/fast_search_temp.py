@@ -12,6 +12,8 @@ import matplotlib.pyplot as plt
 import os
 import io
 
+from models.timestamp_features import timestamp_features
+
 class EnhancedTimestampSearch:
     def __init__(self):
         """Initialize the search system."""
@@ -34,43 +36,7 @@ class EnhancedTimestampSearch:
                 dt_objects = [datetime.strptime(ts, '%Y-%m-%d %H:%M:%S') for ts in timestamps]
                 dt_objects = pd.to_datetime(dt_objects, errors='coerce')
 
-        features = []
-        for dt in dt_objects:
-            if pd.isna(dt):
-                features.append([0]*13)  # Default values for null timestamps
-                continue
-
-            # Convert to pandas Timestamp if it's numpy datetime64
-            if isinstance(dt, np.datetime64):
-                dt = pd.Timestamp(dt)
-
-            # Unix timestamp (works for pandas Timestamp)
-            unix_ts = dt.timestamp()
-
-            # Cyclical time features
-            hour_sin = np.sin(2 * np.pi * dt.hour/23.0)
-            hour_cos = np.cos(2 * np.pi * dt.hour/23.0)
-
-            # Date components
-            day_of_week = dt.dayofweek  # Monday=0, Sunday=6
-            month = dt.month
-
-            features.append([
-                unix_ts,
-                hour_sin, hour_cos,
-                day_of_week,
-                month,
-                dt.hour,
-                dt.minute,
-                dt.day,
-                dt.week,
-                dt.dayofyear,
-                dt.year,
-                int(dt.month > 6),  # Second half of year
-                int((dt.hour >= 18) | (dt.hour <= 6))  # Night time
-            ])
-
-        return np.array(features)
+        return timestamp_features(dt_objects)
 
     def load_data(self, file_obj, file_type='csv'): # Corrected indentation
         """Load dataset from file object with robust timestamp handling."""
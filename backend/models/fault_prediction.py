@@ -2,25 +2,61 @@
 
 import pandas as pd
 import numpy as np
-import joblib
 from datetime import datetime
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+import os
+import threading
+import time
 
-# Load pre-trained models once
-models = {
+from models.feature_kernels import fault_feature_matrix, parse_fault_time, parse_fault_times
+from models.bulb_state import bulb_state, WINDOW
+from models.tree_compiler import load_tree_model
+from models.model_registry import registry
+from models.prediction_cache import PredictionCache, fault_key
+
+FAULT_MODEL_PATHS = {
     'binary': {
-        # 'gradient_boosting': joblib.load('models/ml_models/binary_gradient_boosting.joblib'),
-        # 'logistic_regression': joblib.load('models/binary_logistic_regression.joblib'),
-        # 'xgboost': joblib.load('models/binary_xgboost.joblib'),
-        'random_forest': joblib.load('models/ml_models/binary_random_forest.joblib'),
+        # 'gradient_boosting': 'models/ml_models/binary_gradient_boosting.joblib',
+        # 'logistic_regression': 'models/binary_logistic_regression.joblib',
+        # 'xgboost': 'models/binary_xgboost.joblib',
+        'random_forest': 'models/ml_models/binary_random_forest.joblib',
     },
     'multiclass': {
-        # 'gradient_boosting': joblib.load('models/ml_models/multiclass_gradient_boosting.joblib'),
-        # 'xgboost': joblib.load('models/multiclass_xgboost.joblib'),
-        'random_forest': joblib.load('models/ml_models/multiclass_random_forest.joblib')
+        # 'gradient_boosting': 'models/ml_models/multiclass_gradient_boosting.joblib',
+        # 'xgboost': 'models/multiclass_xgboost.joblib',
+        'random_forest': 'models/ml_models/multiclass_random_forest.joblib'
     }
 }
 
+for _task, _paths in FAULT_MODEL_PATHS.items():
+    for _name, _path in _paths.items():
+        registry.register(f'{_task}_{_name}', _path, loader=load_tree_model)
+
+def load_fault_models() -> dict:
+    """``{'binary': {...}, 'multiclass': {...}}`` of the resident fault models."""
+    return {
+        task: {name: registry.get(f'{task}_{name}') for name in paths}
+        for task, paths in FAULT_MODEL_PATHS.items()
+    }
+
+# Load pre-trained models once, at startup
+load_fault_models()
+
+# Cleared whenever the registry reloads one of the fault models.
+fault_cache = PredictionCache("faults")
+_fault_registry_names = {f'{task}_{name}' for task, paths in FAULT_MODEL_PATHS.items() for name in paths}
+registry.add_reload_listener(
+    lambda name: fault_cache.clear(f"{name} reloaded") if name in _fault_registry_names else None
+)
+
+# Read rolling features from the per-bulb state store instead of placeholders.
+# The result then depends on the bulb's history, so fault_cache is not used.
+USE_BULB_STATE = os.getenv("SMARTGRID_BULB_STATE", "1") == "1"
+# Cascade mode: the multiclass models only score rows whose fault probability
+# (highest over the binary models) reaches the threshold.
+FAULT_CASCADE = os.getenv("SMARTGRID_FAULT_CASCADE", "0") == "1"
+FAULT_CASCADE_THRESHOLD = float(os.getenv("SMARTGRID_FAULT_CASCADE_THRESHOLD", "0.5"))
+_EPOCH = datetime(1970, 1, 1)
+
 fault_types = {
     0: 'No Fault',
     1: 'Electrical Fault',
@@ -28,9 +64,42 @@ fault_types = {
     3: 'Environmental Fault'
 }
 
+FAULT_FEATURES = [
+    'bulb_number',
+    'power_consumption (Watts)',
+    'voltage_levels (Volts)',
+    'current_fluctuations (Amperes)',
+    'temperature (Celsius)',
+    'current_fluctuations_env (Amperes)',
+    'power_consumption (Watts)_rolling_avg',
+    'voltage_levels (Volts)_rolling_avg',
+    'current_fluctuations (Amperes)_rolling_avg',
+    'power_consumption (Watts)_rolling_std',
+    'voltage_levels (Volts)_rolling_std',
+    'current_fluctuations (Amperes)_rolling_std',
+    'days_since_last_record',
+    'hour', 'day_of_week', 'month', 'is_weekend',
+    'is_rainy', 'is_cloudy', 'power_voltage_ratio', 'current_imbalance'
+]
+
 def create_features(input_data: dict) -> pd.DataFrame:
-    df = pd.DataFrame([input_data])
-    df['timestamp'] = pd.to_datetime(df['timestamp'], dayfirst=True)
+    return create_features_batch([input_data])
+
+def create_features_batch(rows: list) -> pd.DataFrame:
+    """Reference feature construction; predict_fault_batch uses the equivalent
+    DataFrame-free kernel (models/feature_kernels.py)."""
+    return create_features_frame(pd.DataFrame(rows))
+
+def create_features_frame(df: pd.DataFrame, with_history: bool = False) -> pd.DataFrame:
+    """Vectorized features for a frame of raw readings (modified in place).
+
+    With ``with_history`` the frame is treated as each bulb's history: it is
+    sorted by bulb and time in place and the rolling stats and days since the
+    last record are computed per bulb as in training, instead of placeholders.
+    """
+    df['timestamp'] = parse_fault_times(df['timestamp'])
+    if with_history:
+        df.sort_values(['bulb_number', 'timestamp'], kind='stable', inplace=True)
 
     df['hour'] = df['timestamp'].dt.hour
     df['day_of_week'] = df['timestamp'].dt.dayofweek
@@ -44,82 +113,227 @@ def create_features(input_data: dict) -> pd.DataFrame:
     df['power_voltage_ratio'].fillna(0, inplace=True)
     df['current_imbalance'] = df['current_fluctuations (Amperes)'] - df['current_fluctuations_env (Amperes)']
 
-    # Add placeholder values for rolling stats and days since last record
     rolling_cols = ['power_consumption (Watts)', 'voltage_levels (Volts)', 'current_fluctuations (Amperes)']
-    for col in rolling_cols:
-        df[f'{col}_rolling_avg'] = df[col]
-        df[f'{col}_rolling_std'] = 0
-
-    df['days_since_last_record'] = 0
-
-    features = [
-        'bulb_number',
-        'power_consumption (Watts)',
-        'voltage_levels (Volts)',
-        'current_fluctuations (Amperes)',
-        'temperature (Celsius)',
-        'current_fluctuations_env (Amperes)',
-        'power_consumption (Watts)_rolling_avg',
-        'voltage_levels (Volts)_rolling_avg',
-        'current_fluctuations (Amperes)_rolling_avg',
-        'power_consumption (Watts)_rolling_std',
-        'voltage_levels (Volts)_rolling_std',
-        'current_fluctuations (Amperes)_rolling_std',
-        'days_since_last_record',
-        'hour', 'day_of_week', 'month', 'is_weekend',
-        'is_rainy', 'is_cloudy', 'power_voltage_ratio', 'current_imbalance'
-    ]
+    if with_history:
+        groups = df.groupby('bulb_number', sort=False)
+        for col in rolling_cols:
+            rolling = groups[col].rolling(WINDOW, min_periods=1)
+            df[f'{col}_rolling_avg'] = rolling.mean().reset_index(level=0, drop=True)
+            df[f'{col}_rolling_std'] = rolling.std().reset_index(level=0, drop=True).fillna(0)
+        df['days_since_last_record'] = groups['timestamp'].diff().dt.days.fillna(0)
+    else:
+        # Add placeholder values for rolling stats and days since last record
+        for col in rolling_cols:
+            df[f'{col}_rolling_avg'] = df[col]
+            df[f'{col}_rolling_std'] = 0
 
-    return df[features]
+        df['days_since_last_record'] = 0
 
-def predict_fault(input_data: dict) -> dict:
-    X = create_features(input_data)
+    return df[FAULT_FEATURES]
 
-    binary_results = {}
-    for name, model in models['binary'].items():
-        pred = model.predict(X)[0]
-        proba = model.predict_proba(X)[0][1] if hasattr(model, 'predict_proba') else None
-
-        metrics = {
-            'accuracy': None,
-            'precision': None,
-            'recall': None,
-            'f1': None,
-            'roc_auc': None
-        }
+# Per-request metrics cannot be computed from a single unlabeled reading; the
+# block is kept (all None) so the response shape does not change.
+_NO_METRICS = {'accuracy': None, 'precision': None, 'recall': None, 'f1': None, 'roc_auc': None}
+
+def _binary_result(pred, proba):
+    return {
+        'prediction': 'Fault' if pred == 1 else 'No Fault',
+        'probability': proba,
+        'metrics': dict(_NO_METRICS)
+    }
+
+def _multiclass_result(pred, proba):
+    if pred is None:
+        # Not escalated by the cascade: the binary stage found no fault.
+        return {'prediction': fault_types[0], 'probabilities': None, 'metrics': dict(_NO_METRICS), 'skipped': True}
+    return {
+        'prediction': fault_types.get(pred, 'Unknown'),
+        'probabilities': {fault_types.get(i, 'Unknown'): float(p) for i, p in enumerate(proba)} if proba is not None else None,
+        'metrics': dict(_NO_METRICS)
+    }
 
-        if hasattr(model, 'predict_proba'):
-            try:
-                metrics['roc_auc'] = float(roc_auc_score([1 if pred == 'Fault' else 0], [proba]))
-            except:
-                pass
+class CascadeStats:
+    """How many rows reach each stage, and the time spent in it."""
 
-        binary_results[name] = {
-            'prediction': 'Fault' if pred == 1 else 'No Fault',
-            'probability': proba,
-            'metrics': metrics
-        }
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = self.rows = self.escalated = 0
+        self.binary_ms = self.multiclass_ms = 0.0
+
+    def record(self, rows: int, escalated: int, binary_ms: float, multiclass_ms: float):
+        with self._lock:
+            self.batches += 1
+            self.rows += rows
+            self.escalated += escalated
+            self.binary_ms += binary_ms
+            self.multiclass_ms += multiclass_ms
 
-    multiclass_results = {}
+    def stats(self) -> dict:
+        with self._lock:
+            skipped = self.rows - self.escalated
+            return {
+                'cascade': FAULT_CASCADE,
+                'threshold': FAULT_CASCADE_THRESHOLD,
+                'batches': self.batches,
+                'rows': self.rows,
+                'multiclass_rows': self.escalated,
+                'multiclass_skipped': skipped,
+                'skip_rate': round(skipped / self.rows, 4) if self.rows else None,
+                'binary_ms': round(self.binary_ms, 3),
+                'multiclass_ms': round(self.multiclass_ms, 3),
+            }
+
+cascade_stats = CascadeStats()
+
+def model_input(model, X: np.ndarray):
+    """``X`` (FAULT_FEATURES columns) in the form ``model`` expects: models fitted
+    on a DataFrame, such as Pipelines whose ColumnTransformer selects columns by
+    name, get a DataFrame with the names they were fitted on; compiled trees
+    take the array as is."""
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        return X
+    return pd.DataFrame(X, columns=FAULT_FEATURES)[list(names)]
+
+def _predict_with_proba(model, X):
+    """``(predictions, probabilities)`` from a single predict_proba pass (predict
+    is the argmax over ``classes_``); probabilities are None without predict_proba."""
+    X = model_input(model, X)
+    if not hasattr(model, 'predict_proba'):
+        return model.predict(X), None
+    proba = model.predict_proba(X)
+    return np.asarray(model.classes_).take(proba.argmax(axis=1)), proba
+
+def _run_fault_models(X: np.ndarray):
+    """Binary then multiclass stage for a feature matrix.
+
+    Returns ``(binary, multiclass)``: ``binary[name] = (preds, fault_proba)`` and
+    ``multiclass[name] = (preds, probas)``, lists holding None for rows the
+    cascade did not escalate.
+    """
+    n = len(X)
+    models = load_fault_models()
+    t0 = time.perf_counter()
+    binary = {}
+    for name, model in models['binary'].items():
+        preds, proba = _predict_with_proba(model, X)
+        binary[name] = (preds, proba[:, 1] if proba is not None else None)
+    t1 = time.perf_counter()
+
+    if FAULT_CASCADE and binary:
+        fault_proba = np.max([p if p is not None else (preds == 1).astype(float)
+                              for preds, p in binary.values()], axis=0)
+        escalated = np.flatnonzero(fault_proba >= FAULT_CASCADE_THRESHOLD)
+    else:
+        escalated = np.arange(n)
+
+    multiclass = {}
     for name, model in models['multiclass'].items():
-        pred = model.predict(X)[0]
-        proba = model.predict_proba(X)[0] if hasattr(model, 'predict_proba') else None
-
-        metrics = {
-            'accuracy': None,
-            'precision': None,
-            'recall': None,
-            'f1': None,
-            'roc_auc': None
+        preds, probas = [None] * n, [None] * n
+        if len(escalated):
+            p_esc, proba_esc = _predict_with_proba(model, X[escalated])
+            for j, i in enumerate(escalated):
+                preds[i] = p_esc[j]
+                probas[i] = proba_esc[j] if proba_esc is not None else None
+        multiclass[name] = (preds, probas)
+    t2 = time.perf_counter()
+
+    cascade_stats.record(n, len(escalated), (t1 - t0) * 1000, (t2 - t1) * 1000)
+    return binary, multiclass
+
+def apply_bulb_state(X: np.ndarray, rows: list, times: list) -> list:
+    """Fill each row's rolling features from the bulb state store, in row order.
+
+    The store is not changed; returns the readings to ``bulb_state.commit``
+    once the batch has been scored.
+    """
+    # Columns 1-3 are power, voltage and current; 6-8 their rolling avg,
+    # 9-11 their rolling std, 12 days_since_last_record.
+    readings = [(row['bulb_number'], int((dt.replace(tzinfo=None) - _EPOCH).total_seconds()), X[i, 1:4].copy())
+                for i, (row, dt) in enumerate(zip(rows, times))]
+    for i, (avg, std, days) in enumerate(bulb_state.preview(readings)):
+        X[i, 6:9] = avg
+        X[i, 9:12] = std
+        X[i, 12] = days
+    return readings
+
+def predict_fault_batch(rows: list) -> list:
+    """Score many readings with one predict_proba call per model (see _run_fault_models)."""
+    times = [parse_fault_time(r['timestamp']) for r in rows]
+    X = fault_feature_matrix(rows, times)
+    readings = apply_bulb_state(X, rows, times) if USE_BULB_STATE else None
+    n = len(X)
+    binary_out, multiclass_out = _run_fault_models(X)
+    if readings is not None:
+        bulb_state.commit(readings)
+        bulb_state.maybe_snapshot()
+
+    binary = {}
+    for name, (preds, probas) in binary_out.items():
+        probas = probas if probas is not None else [None] * n
+        binary[name] = [_binary_result(preds[i], probas[i]) for i in range(n)]
+
+    multiclass = {}
+    for name, (preds, probas) in multiclass_out.items():
+        multiclass[name] = [_multiclass_result(preds[i], probas[i]) for i in range(n)]
+
+    return [
+        {
+            'binary': {name: results[i] for name, results in binary.items()},
+            'multiclass': {name: results[i] for name, results in multiclass.items()}
         }
+        for i in range(n)
+    ]
+
+def score_fault_frame(df: pd.DataFrame, first_row: int = 0) -> list:
+    """Compact per-row results for a chunk of raw telemetry, one model call per chunk.
+
+    Used by bulk scoring: no metrics block, and each result carries its row
+    number, bulb and timestamp as they appeared in the input.
+    """
+    bulbs = df['bulb_number'].tolist()
+    stamps = df['timestamp'].astype(str).tolist()
+    X = create_features_frame(df).to_numpy(dtype=float)
+    n = len(X)
+    binary_out, multiclass_out = _run_fault_models(X)
 
-        multiclass_results[name] = {
-            'prediction': fault_types.get(pred, 'Unknown'),
-            'probabilities': {fault_types.get(i, 'Unknown'): float(p) for i, p in enumerate(proba)} if proba is not None else None,
-            'metrics': metrics
+    binary = {}
+    for name, (preds, probas) in binary_out.items():
+        probas = probas.tolist() if probas is not None else [None] * n
+        binary[name] = [('Fault' if preds[i] == 1 else 'No Fault', probas[i]) for i in range(n)]
+
+    multiclass = {}
+    for name, (preds, probas) in multiclass_out.items():
+        multiclass[name] = [
+            (fault_types.get(preds[i], 'Unknown') if preds[i] is not None else None,
+             probas[i].tolist() if probas[i] is not None else None)
+            for i in range(n)
+        ]
+
+    return [
+        {
+            'row': first_row + i,
+            'bulb_number': bulbs[i],
+            'timestamp': stamps[i],
+            'binary': {name: {'prediction': r[i][0], 'probability': r[i][1]} for name, r in binary.items()},
+            'multiclass': {
+                name: {
+                    'prediction': r[i][0],
+                    'probabilities': {fault_types.get(j, 'Unknown'): p for j, p in enumerate(r[i][1])}
+                    if r[i][1] is not None else None
+                } if r[i][0] is not None else {'prediction': fault_types[0], 'probabilities': None, 'skipped': True}
+                for name, r in multiclass.items()
+            }
         }
+        for i in range(n)
+    ]
 
-    return {
-        'binary': binary_results,
-        'multiclass': multiclass_results
-    }
+def predict_fault(input_data: dict) -> dict:
+    if USE_BULB_STATE:
+        return predict_fault_batch([input_data])[0]
+    key = fault_key(input_data)
+    result = fault_cache.get(key)
+    if result is None:
+        result = predict_fault_batch([input_data])[0]
+        fault_cache.put(key, result)
+    return result
@@ -0,0 +1,170 @@
+# models/feature_kernels.py
+# DataFrame-free feature construction for the request hot path.
+#
+# These produce exactly the same vectors as energy_demand.build_feature_frame
+# and fault_prediction.create_features_batch (see benchmarks/feature_kernels.py
+# for the parity check), without building a DataFrame or a holidays object per call.
+
+import math
+import os
+import threading
+from datetime import date, datetime
+
+import holidays
+import numpy as np
+import pandas as pd
+
+HOLIDAY_YEARS = os.getenv("SMARTGRID_HOLIDAY_YEARS", "2015-2035")
+
+# Same expression pandas evaluates on the 'hour' column, computed once per hour of day.
+_HOURS = np.arange(24)
+HOUR_SIN = np.sin(2 * np.pi * _HOURS / 24)
+HOUR_COS = np.cos(2 * np.pi * _HOURS / 24)
+
+
+class HolidayTable:
+    """Dutch public holidays for a year range, as a set of dates.
+
+    Years outside the precomputed range are added on first use, so lookups stay
+    correct for any date; only the first lookup in a new year pays for it.
+    """
+
+    def __init__(self, first_year: int, last_year: int):
+        self._years = set(range(first_year, last_year + 1))
+        self._dates = set(holidays.Netherlands(years=sorted(self._years)).keys())
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_spec(cls, spec: str = HOLIDAY_YEARS):
+        first, _, last = spec.partition("-")
+        return cls(int(first), int(last or first))
+
+    def _add_year(self, year: int):
+        with self._lock:
+            if year not in self._years:
+                self._dates |= set(holidays.Netherlands(years=[year]).keys())
+                self._years.add(year)
+
+    def __contains__(self, day: date) -> bool:
+        if day.year not in self._years:
+            self._add_year(day.year)
+        return day in self._dates
+
+
+holiday_table = HolidayTable.from_spec()
+
+
+# ---------- energy ----------
+def parse_energy_time(time_str: str) -> datetime:
+    return datetime.strptime(time_str, '%Y-%m-%dT%H:%M' if 'T' in time_str else '%Y-%m-%d %H:%M')
+
+
+def energy_feature_row(payload: dict, dt: datetime = None) -> np.ndarray:
+    """Unscaled feature vector in energy_demand.FEATURES order."""
+    if dt is None:
+        dt = parse_energy_time(payload['timestamp'])
+    lag_24h = float(payload['lag_24h'])
+    return np.array([
+        HOUR_SIN[dt.hour], HOUR_COS[dt.hour],
+        1.0 if dt.weekday() >= 5 else 0.0,
+        1.0 if dt.date() in holiday_table else 0.0,
+        lag_24h, lag_24h, lag_24h, lag_24h,
+        payload['Temp'], payload['RH'] / 100, payload['FF'], payload['P'],
+    ], dtype=float)
+
+
+def energy_feature_matrix(payloads: list, times: list = None) -> np.ndarray:
+    if times is None:
+        return np.vstack([energy_feature_row(p) for p in payloads])
+    return np.vstack([energy_feature_row(p, dt) for p, dt in zip(payloads, times)])
+
+
+def scale_rows(scaler, X: np.ndarray) -> np.ndarray:
+    """``scaler.transform`` without the DataFrame/feature-name round trip.
+
+    For StandardScaler this is the same arithmetic sklearn performs; any other
+    scaler is delegated to its own ``transform``.
+    """
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    if type(scaler).__name__ == 'StandardScaler':
+        X = np.array(X, dtype=float)
+        if getattr(scaler, 'with_mean', True) and mean is not None:
+            X -= mean
+        if getattr(scaler, 'with_std', True) and scale is not None:
+            X /= scale
+        return X
+    names = getattr(scaler, 'feature_names_in_', None)
+    if names is not None:
+        return scaler.transform(pd.DataFrame(X, columns=names))
+    return scaler.transform(X)
+
+
+# ---------- faults ----------
+_FAULT_TIME_FORMATS = ('%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M',
+                       '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M')
+
+
+def parse_fault_time(value) -> datetime:
+    """Fast path for the formats clients send; anything else goes through pandas (dayfirst, as before)."""
+    if isinstance(value, str):
+        for fmt in _FAULT_TIME_FORMATS:
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+    return pd.to_datetime(value, dayfirst=True).to_pydatetime()
+
+
+def parse_fault_times(values: pd.Series) -> pd.Series:
+    """Vectorized parse_fault_time: ISO dates (``2023-09-06 ...``) year-first,
+    everything else day-first. ``dayfirst=True`` alone would read 2023-09-06 as
+    9 June."""
+    if not (values.dtype == object or pd.api.types.is_string_dtype(values)):
+        return pd.to_datetime(values)
+    text = values.astype(str).str.strip()
+    iso = text.str.match(r'\d{4}-\d{2}-\d{2}')
+    if iso.all():
+        return pd.to_datetime(text, format='ISO8601')
+    if not iso.any():
+        return pd.to_datetime(values, dayfirst=True)
+    out = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    out[iso] = pd.to_datetime(text[iso], format='ISO8601')
+    out[~iso] = pd.to_datetime(values[~iso], dayfirst=True)
+    return out
+
+
+def fault_feature_row(row: dict, dt: datetime = None) -> np.ndarray:
+    """Feature vector in fault_prediction feature order (placeholder rolling stats)."""
+    if dt is None:
+        dt = parse_fault_time(row['timestamp'])
+    power = float(row['power_consumption (Watts)'])
+    voltage = float(row['voltage_levels (Volts)'])
+    current = float(row['current_fluctuations (Amperes)'])
+    current_env = float(row['current_fluctuations_env (Amperes)'])
+    condition = row['environmental_conditions']
+    ratio = power / voltage if voltage != 0 else math.nan
+    if math.isnan(ratio):
+        ratio = 0.0
+    day_of_week = dt.weekday()
+    return np.array([
+        row['bulb_number'],
+        power, voltage, current,
+        row['temperature (Celsius)'],
+        current_env,
+        power, voltage, current,  # *_rolling_avg
+        0.0, 0.0, 0.0,            # *_rolling_std
+        0.0,                      # days_since_last_record
+        dt.hour, day_of_week, dt.month,
+        1.0 if day_of_week >= 5 else 0.0,
+        1.0 if condition == 'Rainy' else 0.0,
+        1.0 if condition == 'Cloudy' else 0.0,
+        ratio,
+        current - current_env,
+    ], dtype=float)
+
+
+def fault_feature_matrix(rows: list, times: list = None) -> np.ndarray:
+    if times is None:
+        return np.vstack([fault_feature_row(r) for r in rows])
+    return np.vstack([fault_feature_row(r, dt) for r, dt in zip(rows, times)])
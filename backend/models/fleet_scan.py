@@ -0,0 +1,194 @@
+# models/fleet_scan.py
+# Nightly re-scoring of every bulb over a time window, sharded by bulb across
+# a process pool. The parent builds the feature matrix once and places it in
+# shared memory; workers attach to it by name instead of receiving a pickled
+# copy, score their contiguous range of bulbs and return per-bulb summaries.
+#
+# Run from backend/:
+#   python -m models.fleet_scan --start 2023-06-01 --end 2023-07-01 --workers 8 --out fleet.json
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from models.feature_kernels import parse_fault_times
+
+TELEMETRY_PATH = "data/street_light_fault_prediction_dataset.csv"
+
+# Per-worker state, set by _attach().
+_shm = {}
+_arrays = {}
+
+
+def _to_shared(name: str, arr: np.ndarray, blocks: dict) -> dict:
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    blocks[name] = shm
+    return {'name': shm.name, 'shape': arr.shape, 'dtype': arr.dtype.str}
+
+
+def _attach(specs: dict):
+    """Worker initializer: map the shared arrays read-only and warm the models."""
+    for key, spec in specs.items():
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        arr = np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=shm.buf)
+        arr.flags.writeable = False
+        _shm[key], _arrays[key] = shm, arr
+    from models.fault_prediction import load_fault_models
+    load_fault_models()
+
+
+def _scan_shard(start: int, end: int, binary_name: str, multiclass_name: str) -> dict:
+    """Score rows ``[start, end)`` (whole bulbs) and summarise per bulb."""
+    from models.fault_prediction import load_fault_models, fault_types, model_input
+    models = load_fault_models()
+    X = _arrays['X'][start:end]
+    ts = _arrays['ts'][start:end]
+    t0 = time.perf_counter()
+    binary, multiclass = models['binary'][binary_name], models['multiclass'][multiclass_name]
+    fault_proba = binary.predict_proba(model_input(binary, X))[:, 1]
+    is_fault = fault_proba >= 0.5
+    fault_type = np.zeros(len(X), dtype=np.int64)
+    if is_fault.any():
+        fault_type[is_fault] = multiclass.predict(model_input(multiclass, X[is_fault]))
+
+    bulbs = X[:, 0].astype(np.int64)
+    boundaries = np.flatnonzero(np.diff(bulbs)) + 1
+    per_bulb = {}
+    for lo, hi in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(X)]))):
+        faults = is_fault[lo:hi]
+        types = Counter(fault_types.get(int(t), 'Unknown') for t in fault_type[lo:hi][faults])
+        last_fault = ts[lo:hi][faults].max() if faults.any() else None
+        per_bulb[int(bulbs[lo])] = {
+            'readings': int(hi - lo),
+            'faults': int(faults.sum()),
+            'fault_rate': round(float(faults.mean()), 4),
+            'max_fault_probability': round(float(fault_proba[lo:hi].max()), 4),
+            'fault_types': dict(types),
+            'last_fault': str(np.datetime64(int(last_fault), 's')) if last_fault is not None else None,
+        }
+    return {'rows': int(end - start), 'seconds': time.perf_counter() - t0, 'pid': os.getpid(), 'bulbs': per_bulb}
+
+
+def _shards(bulbs: np.ndarray, n_shards: int) -> list:
+    """Split sorted bulb ids into ~equal row ranges without splitting a bulb."""
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bulbs)) + 1))
+    targets = np.linspace(0, len(bulbs), n_shards + 1)[1:-1]
+    cuts = np.unique(starts[np.clip(np.searchsorted(starts, targets), 0, len(starts) - 1)])
+    edges = [0] + [int(c) for c in cuts if 0 < c < len(bulbs)] + [len(bulbs)]
+    return [(lo, hi) for lo, hi in zip(edges, edges[1:]) if hi > lo]
+
+
+def load_telemetry(path: str = TELEMETRY_PATH, start: str = None, end: str = None) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    ts = parse_fault_times(df['timestamp'])
+    mask = pd.Series(True, index=df.index)
+    if start:
+        mask &= ts >= pd.Timestamp(start)
+    if end:
+        mask &= ts < pd.Timestamp(end)
+    return df[mask].reset_index(drop=True)
+
+
+def fleet_scan(df: pd.DataFrame, workers: int = os.cpu_count() or 1, shards_per_worker: int = 4,
+               binary_model: str = 'random_forest', multiclass_model: str = 'random_forest',
+               top: int = 20) -> dict:
+    """Score every reading in ``df`` and summarise faults per bulb and fleet-wide."""
+    from models.fault_prediction import create_features_frame
+
+    t0 = time.perf_counter()
+    frame = df.copy()
+    X = np.ascontiguousarray(create_features_frame(frame, with_history=True).to_numpy(dtype=np.float64))
+    ts = frame['timestamp'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    t_features = time.perf_counter() - t0
+
+    blocks = {}
+    try:
+        specs = {'X': _to_shared('X', X, blocks), 'ts': _to_shared('ts', ts, blocks)}
+        del X, ts  # the parent only needs the shared copies from here on
+        bulbs = np.ndarray(specs['X']['shape'], dtype=np.float64, buffer=blocks['X'].buf)[:, 0].astype(np.int64)
+        shards = _shards(bulbs, max(workers * shards_per_worker, 1))
+        t1 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as pool:
+            futures = [pool.submit(_scan_shard, lo, hi, binary_model, multiclass_model) for lo, hi in shards]
+            parts = [f.result() for f in futures]
+        t_scan = time.perf_counter() - t1
+    finally:
+        for shm in blocks.values():
+            shm.close()
+            shm.unlink()
+
+    per_bulb = {}
+    for part in parts:
+        per_bulb.update(part['bulbs'])
+    readings = sum(b['readings'] for b in per_bulb.values())
+    faults = sum(b['faults'] for b in per_bulb.values())
+    fault_types = Counter()
+    for b in per_bulb.values():
+        fault_types.update(b['fault_types'])
+    worst = sorted(per_bulb.items(), key=lambda kv: (kv[1]['fault_rate'], kv[1]['faults']), reverse=True)[:top]
+
+    return {
+        'summary': {
+            'bulbs': len(per_bulb),
+            'readings': readings,
+            'faults': faults,
+            'fault_rate': round(faults / readings, 4) if readings else None,
+            'bulbs_with_faults': sum(1 for b in per_bulb.values() if b['faults']),
+            'fault_types': dict(fault_types),
+            'top_bulbs': [{'bulb_number': bulb, **stats} for bulb, stats in worst],
+        },
+        'bulbs': per_bulb,
+        'timing': {
+            'workers': workers,
+            'shards': len(shards),
+            'features_s': round(t_features, 3),
+            'scan_s': round(t_scan, 3),
+            'rows_per_second': round(readings / t_scan, 1) if t_scan > 0 else None,
+        },
+    }
+
+
+def scaling_report(df: pd.DataFrame, worker_counts=None) -> list:
+    """Run the scan at each worker count; speed-up is relative to one worker."""
+    worker_counts = worker_counts or sorted({1, 2, 4, os.cpu_count() or 1})
+    rows, base = [], None
+    for n in worker_counts:
+        timing = fleet_scan(df, workers=n)['timing']
+        base = base or timing['scan_s']
+        rows.append({**timing, 'speedup': round(base / timing['scan_s'], 2) if timing['scan_s'] else None})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--path', default=TELEMETRY_PATH)
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--out', help="write the full per-bulb result as JSON")
+    parser.add_argument('--scaling', type=int, nargs='*', help="report scaling over these worker counts")
+    args = parser.parse_args()
+
+    df = load_telemetry(args.path, args.start, args.end)
+    if args.scaling is not None:
+        for row in scaling_report(df, args.scaling or None):
+            print(f"workers {row['workers']:>3}: scan {row['scan_s']:>7.3f} s  "
+                  f"{row['rows_per_second']:>10} rows/s  speed-up {row['speedup']}x")
+        return
+    result = fleet_scan(df, workers=args.workers)
+    print(json.dumps({'summary': result['summary'], 'timing': result['timing']}, indent=2))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# models/inference_scheduler.py
+
+import asyncio
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+BATCH_WINDOW_MS = float(os.getenv("SMARTGRID_BATCH_WINDOW_MS", "3"))
+BATCH_MAX_SIZE = int(os.getenv("SMARTGRID_BATCH_MAX_SIZE", "64"))
+INFERENCE_WORKERS = int(os.getenv("SMARTGRID_INFERENCE_WORKERS", "2"))
+INFERENCE_POOL = os.getenv("SMARTGRID_INFERENCE_POOL", "thread")  # 'thread' or 'process'
+QUEUE_LIMIT = int(os.getenv("SMARTGRID_QUEUE_LIMIT", "4096"))
+
+
+def make_executor(kind: str = INFERENCE_POOL, max_workers: int = INFERENCE_WORKERS):
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=max_workers)
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+
+
+def _bucket(size: int) -> str:
+    """Power-of-two histogram bucket label for a batch size."""
+    upper = 1
+    while upper < size:
+        upper *= 2
+    return str(upper)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item requests into batched model calls.
+
+    ``submit`` queues an item and awaits its result. A dispatcher task takes the
+    first queued item, waits at most ``max_wait_ms`` for more to arrive (or until
+    ``max_batch_size`` are queued) and hands the whole batch to ``batch_fn`` on the
+    executor, so inference never runs on the event loop. ``batch_fn`` takes a list
+    of items and returns a list of results in the same order. If a batch fails,
+    its items are retried one by one so a single bad input only fails its own
+    request.
+    """
+
+    def __init__(self, name: str, batch_fn, max_batch_size: int = BATCH_MAX_SIZE,
+                 max_wait_ms: float = BATCH_WINDOW_MS, executor=None,
+                 max_in_flight: int = INFERENCE_WORKERS, queue_limit: int = QUEUE_LIMIT):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.queue_limit = queue_limit
+        self._executor = executor
+        self._max_in_flight = max_in_flight
+        self._queue = None
+        self._dispatcher = None
+        self._slots = None
+        self._in_flight = 0
+        self._batches = 0
+        self._items = 0
+        self._failures = 0
+        self._max_depth = 0
+        self._batch_sizes = Counter()
+        self._batch_ms_total = 0.0
+
+    def _ensure_started(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            if self._executor is None:
+                self._executor = make_executor()
+            self._queue = asyncio.Queue(maxsize=self.queue_limit)
+            self._slots = asyncio.Semaphore(self._max_in_flight)
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def submit(self, item):
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        self._max_depth = max(self._max_depth, self._queue.qsize())
+        return await future
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Drain whatever else is already waiting without delaying further.
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            await self._slots.acquire()
+            loop.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        items = [item for item, _ in batch]
+        self._in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            try:
+                results = await loop.run_in_executor(self._executor, self.batch_fn, items)
+                outcomes = [(True, r) for r in results]
+            except Exception as e:
+                if len(items) == 1:
+                    outcomes = [(False, e)]
+                else:
+                    outcomes = []
+                    for item in items:
+                        try:
+                            outcomes.append((True, (await loop.run_in_executor(self._executor, self.batch_fn, [item]))[0]))
+                        except Exception as item_error:
+                            outcomes.append((False, item_error))
+            for (_, future), (ok, value) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    self._failures += 1
+                    future.set_exception(value)
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes[_bucket(len(batch))] += 1
+            self._batch_ms_total += (time.perf_counter() - t0) * 1000
+
+    def stats(self) -> dict:
+        return {
+            'name': self.name,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_depth': self._max_depth,
+            'in_flight_batches': self._in_flight,
+            'batches': self._batches,
+            'items': self._items,
+            'failures': self._failures,
+            'mean_batch_size': round(self._items / self._batches, 2) if self._batches else None,
+            'mean_batch_ms': round(self._batch_ms_total / self._batches, 3) if self._batches else None,
+            'batch_size_histogram': dict(sorted(self._batch_sizes.items(), key=lambda kv: int(kv[0]))),
+            'config': {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_ms,
+                'max_in_flight': self._max_in_flight,
+                'queue_limit': self.queue_limit,
+            },
+        }
@@ -0,0 +1,131 @@
+# models/lstm_numpy.py
+# NumPy inference for the Keras Sequential LSTM saved in lstm_model.h5, so the
+# API does not need TensorFlow at runtime. Weights are read straight from the
+# legacy HDF5 layout (model_config + model_weights/<layer>/weight_names).
+
+import json
+
+import h5py
+import numpy as np
+
+
+def _sigmoid(x):
+    with np.errstate(over='ignore'):
+        return 1.0 / (1.0 + np.exp(-x))
+
+
+def _hard_sigmoid(x):
+    # Keras 3 definition: relu6(x + 3) / 6
+    return np.clip(x / 6.0 + 0.5, 0.0, 1.0)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    None: lambda x: x,
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid,
+}
+
+
+def _activation(name):
+    try:
+        return ACTIVATIONS[name]
+    except KeyError:
+        raise NotImplementedError(f"Activation '{name}' is not supported") from None
+
+
+class _LSTM:
+    def __init__(self, config, kernel, recurrent_kernel, bias=None):
+        self.units = config['units']
+        self.return_sequences = config.get('return_sequences', False)
+        if config.get('go_backwards') or config.get('return_state') or config.get('stateful'):
+            raise NotImplementedError("Only plain forward LSTM layers are supported")
+        self.activation = _activation(config.get('activation', 'tanh'))
+        self.recurrent_activation = _activation(config.get('recurrent_activation', 'sigmoid'))
+        self.kernel = kernel
+        self.recurrent_kernel = recurrent_kernel
+        self.bias = bias if bias is not None else np.zeros(4 * self.units, dtype=kernel.dtype)
+
+    def __call__(self, x):
+        n, steps, _ = x.shape
+        u = self.units
+        # Input projection for every timestep in one matmul; only the recurrence is sequential.
+        xw = x @ self.kernel + self.bias
+        h = np.zeros((n, u), dtype=x.dtype)
+        c = np.zeros((n, u), dtype=x.dtype)
+        outputs = np.empty((n, steps, u), dtype=x.dtype) if self.return_sequences else None
+        for t in range(steps):
+            z = xw[:, t, :] + h @ self.recurrent_kernel
+            i = self.recurrent_activation(z[:, :u])
+            f = self.recurrent_activation(z[:, u:2 * u])
+            g = self.activation(z[:, 2 * u:3 * u])
+            o = self.recurrent_activation(z[:, 3 * u:])
+            c = f * c + i * g
+            h = o * self.activation(c)
+            if outputs is not None:
+                outputs[:, t, :] = h
+        return outputs if outputs is not None else h
+
+
+class _Dense:
+    def __init__(self, config, kernel, bias=None):
+        self.activation = _activation(config.get('activation', 'linear'))
+        self.kernel = kernel
+        self.bias = bias
+
+    def __call__(self, x):
+        y = x @ self.kernel
+        if self.bias is not None:
+            y = y + self.bias
+        return self.activation(y)
+
+
+def _weights_by_role(group) -> dict:
+    """``{'kernel': ..., 'recurrent_kernel': ..., 'bias': ...}`` for one layer group."""
+    weights = {}
+    for raw_name in group.attrs.get('weight_names', []):
+        name = raw_name.decode() if isinstance(raw_name, bytes) else raw_name
+        role = name.rsplit('/', 1)[-1].split(':')[0]
+        weights[role] = np.asarray(group[name], dtype=np.float32)
+    return weights
+
+
+class NumpyLSTMModel:
+    """Callable like the Keras model: ``model(X)`` maps (N, steps, features) to (N, outputs)."""
+
+    def __init__(self, layers):
+        self.layers = layers
+
+    @classmethod
+    def from_h5(cls, path: str):
+        with h5py.File(path, 'r') as f:
+            config = f.attrs['model_config']
+            config = json.loads(config.decode() if isinstance(config, bytes) else config)
+            if config['class_name'] != 'Sequential':
+                raise NotImplementedError("Only Sequential models are supported")
+            weights_root = f['model_weights'] if 'model_weights' in f else f
+            layers = []
+            for layer in config['config']['layers']:
+                kind, layer_config = layer['class_name'], layer['config']
+                if kind in ('InputLayer', 'Dropout'):
+                    continue  # Dropout is the identity at inference time
+                w = _weights_by_role(weights_root[layer_config['name']])
+                if kind == 'LSTM':
+                    layers.append(_LSTM(layer_config, w['kernel'], w['recurrent_kernel'], w.get('bias')))
+                elif kind == 'Dense':
+                    layers.append(_Dense(layer_config, w['kernel'], w.get('bias')))
+                else:
+                    raise NotImplementedError(f"Layer type '{kind}' is not supported")
+        return cls(layers)
+
+    def __call__(self, X) -> np.ndarray:
+        x = np.asarray(X, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[np.newaxis]
+        for layer in self.layers:
+            x = layer(x)
+        return x
+
+    predict = __call__
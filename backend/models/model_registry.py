@@ -0,0 +1,178 @@
+# models/model_registry.py
+
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process, in bytes (0 if unknown)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+def _file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class _Entry:
+    __slots__ = ("model", "fingerprint", "sha1", "loaded_at", "load_time_ms", "memory_bytes", "loads")
+
+    def __init__(self, model, fingerprint, sha1, load_time_ms, memory_bytes, loads):
+        self.model = model
+        self.fingerprint = fingerprint
+        self.sha1 = sha1
+        self.loaded_at = time.time()
+        self.load_time_ms = load_time_ms
+        self.memory_bytes = memory_bytes
+        self.loads = loads
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models.
+
+    Each registered model is loaded once and kept resident. On every ``get`` the
+    file's (mtime, size) is compared with the one seen at load time; only when it
+    differs is the content hash recomputed, and only a changed hash triggers a
+    reload. The new model is fully loaded before it replaces the old entry, so
+    concurrent readers always see either the old or the new model, never a
+    half-loaded one.
+
+    A load that fails is remembered together with the file's (mtime, size):
+    until the file changes, ``get`` raises the same error again without
+    hashing or loading the file.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._specs = {}      # name -> (path, loader)
+        self._entries = {}    # name -> _Entry
+        self._checked = {}    # name -> last time the file was stat'ed
+        self._locks = {}
+        self._failed = {}     # name -> (fingerprint, error) of the last failed load
+        self._listeners = []
+
+    def register(self, name: str, path: str, loader=joblib.load):
+        self._specs[name] = (path, loader)
+        self._locks.setdefault(name, threading.Lock())
+
+    def add_reload_listener(self, callback):
+        """Call ``callback(name)`` whenever a model is (re)loaded after the first load."""
+        self._listeners.append(callback)
+
+    def names(self):
+        return list(self._specs)
+
+    def get(self, name: str):
+        path, loader = self._specs[name]
+        entry = self._entries.get(name)
+        failure = self._failed.get(name)
+        now = time.monotonic()
+        if (entry is not None or failure is not None) and now - self._checked.get(name, 0.0) < self.check_interval:
+            if entry is not None:
+                return entry.model
+            raise failure[1].with_traceback(None)
+
+        self._checked[name] = now
+        try:
+            st = os.stat(path)
+        except FileNotFoundError as e:
+            if entry is not None:
+                # Keep serving the resident copy while the file is being replaced.
+                return entry.model
+            self._fail(name, None, e)
+            raise
+        fingerprint = (st.st_mtime_ns, st.st_size)
+        if entry is not None and entry.fingerprint == fingerprint:
+            return entry.model
+        if failure is not None and failure[0] == fingerprint:
+            raise failure[1].with_traceback(None)
+
+        with self._locks[name]:
+            entry = self._entries.get(name)
+            if entry is not None and entry.fingerprint == fingerprint:
+                return entry.model
+            failure = self._failed.get(name)
+            if failure is not None and failure[0] == fingerprint:
+                raise failure[1].with_traceback(None)
+            sha1 = _file_sha1(path)
+            if entry is not None and entry.sha1 == sha1:
+                # Touched but not modified: remember the new stat, keep the model.
+                entry.fingerprint = fingerprint
+                return entry.model
+
+            print(f"Loading model: {name} from {path}")
+            rss_before = _rss_bytes()
+            t0 = time.perf_counter()
+            try:
+                model = loader(path)
+            except Exception as e:
+                self._fail(name, fingerprint, e)
+                raise
+            load_time_ms = (time.perf_counter() - t0) * 1000
+            memory_bytes = max(_rss_bytes() - rss_before, 0)
+            loads = entry.loads + 1 if entry is not None else 1
+            self._entries[name] = _Entry(model, fingerprint, sha1, load_time_ms, memory_bytes, loads)
+            self._failed.pop(name, None)
+            print(f"Model {name} loaded successfully in {load_time_ms:.1f} ms.")
+
+        if loads > 1:
+            for callback in self._listeners:
+                callback(name)
+        return model
+
+    def _fail(self, name, fingerprint, error):
+        """Remember a failed load; it is only logged the first time for a given file state."""
+        failure = self._failed.get(name)
+        if failure is None or failure[0] != fingerprint:
+            print(f"Model {name} could not be loaded from {self._specs[name][0]}: {error}")
+        self._failed[name] = (fingerprint, error)
+
+    def get_all(self, names=None) -> dict:
+        """Return ``{name: model}`` for every model that can be loaded, skipping the rest."""
+        models = {}
+        for name in names if names is not None else self._specs:
+            try:
+                models[name] = self.get(name)
+            except Exception:
+                pass  # logged by get when it first failed
+        return models
+
+    def stats(self) -> dict:
+        stats = {}
+        for name, (path, _) in self._specs.items():
+            entry = self._entries.get(name)
+            if entry is None:
+                stats[name] = {'path': path, 'loaded': False}
+                if name in self._failed:
+                    stats[name]['error'] = str(self._failed[name][1])
+                continue
+            stats[name] = {
+                'path': path,
+                'loaded': True,
+                'sha1': entry.sha1,
+                'loaded_at': entry.loaded_at,
+                'load_time_ms': round(entry.load_time_ms, 3),
+                'memory_bytes': entry.memory_bytes,
+                'loads': entry.loads,
+            }
+        return stats
+
+
+# Shared by every predictor in the process.
+registry = ModelRegistry()
@@ -0,0 +1,79 @@
+# models/partition_index.py
+# Secondary timestamp indexes: one SortedTimestampIndex per distinct value of
+# each partition column, so "nearest readings for bulb 42" bisects bulb 42's
+# timestamps instead of scanning or over-fetching from the global index.
+
+import numpy as np
+import pandas as pd
+
+from models.timestamp_index import SortedTimestampIndex
+
+PARTITION_COLUMNS = ('bulb_number', 'environmental_conditions', 'fault_type')
+
+
+def _key(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class PartitionedTimestampIndex:
+    """``partitions[column][value]`` is the SortedTimestampIndex of the rows
+    with that value. Rows with a missing value are left out of that column.
+
+    Immutable like SortedTimestampIndex: ``inserted`` copies only the value
+    dicts of the columns it touches and shares every other partition.
+    """
+
+    def __init__(self, partitions: dict = None):
+        self.partitions = partitions or {}
+
+    @classmethod
+    def build(cls, columns: dict, times: np.ndarray, rows: np.ndarray):
+        """Split the time-sorted ``(times, rows)`` by each column in ``{name: values}``.
+
+        A stable sort by value keeps every partition sorted by time, so the
+        partitions wrap slices without sorting again.
+        """
+        partitions = {}
+        for name, values in columns.items():
+            codes, uniques = pd.factorize(values[rows])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            partitions[name] = {
+                _key(value): SortedTimestampIndex.from_sorted(times[order[lo:hi]], rows[order[lo:hi]])
+                for value, lo, hi in zip(uniques, bounds[:-1], bounds[1:])
+            }
+        return cls(partitions)
+
+    @property
+    def columns(self) -> list:
+        return list(self.partitions)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(index.nbytes for part in self.partitions.values() for index in part.values())
+
+    def inserted(self, entry: dict, t: int, row: int):
+        """A new index with ``row`` added to the partitions of its values; this one is left unchanged."""
+        partitions = {}
+        for name, part in self.partitions.items():
+            value = _key(entry.get(name))
+            if value is not None and not pd.isna(value):
+                part = dict(part)
+                part[value] = part.get(value, SortedTimestampIndex()).inserted(t, row)
+            partitions[name] = part
+        return PartitionedTimestampIndex(partitions)
+
+    def most_selective(self, filters: dict):
+        """``(index, column)`` of the smallest partition matching one of ``filters``;
+        ``(None, column)`` if some filter value has no rows at all."""
+        unknown = [c for c in filters if c not in self.partitions]
+        if unknown:
+            raise ValueError(f"Cannot filter on {unknown}. Filterable columns: {self.columns}")
+        best = None
+        for name, value in filters.items():
+            index = self.partitions[name].get(value)
+            if index is None or len(index) == 0:
+                return None, name
+            if best is None or len(index) < len(best[0]):
+                best = (index, name)
+        return best
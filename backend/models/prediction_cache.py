@@ -0,0 +1,123 @@
+# models/prediction_cache.py
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from models.feature_kernels import parse_energy_time, parse_fault_time
+
+CACHE_ENTRIES = int(os.getenv("SMARTGRID_CACHE_ENTRIES", "10000"))
+CACHE_BYTES = int(os.getenv("SMARTGRID_CACHE_BYTES", str(32 * 2**20)))
+CACHE_TTL = float(os.getenv("SMARTGRID_CACHE_TTL", "300"))
+CACHE_DECIMALS = int(os.getenv("SMARTGRID_CACHE_DECIMALS", "4"))
+
+
+def _approx_size(key, value) -> int:
+    return len(repr(key)) + len(json.dumps(value, default=str))
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a TTL and an approximate memory bound.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or ``max_bytes`` (estimated from the JSON size of the value) is exceeded.
+    """
+
+    def __init__(self, name: str, max_entries: int = CACHE_ENTRIES, max_bytes: int = CACHE_BYTES,
+                 ttl_seconds: float = CACHE_TTL):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._items = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = _approx_size(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._bytes += size
+            while len(self._items) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._items.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self, reason: str = None):
+        with self._lock:
+            if self._items:
+                self.invalidations += 1
+            self._items.clear()
+            self._bytes = 0
+        if reason:
+            print(f"Prediction cache '{self.name}' cleared: {reason}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._items),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'config': {
+                    'max_entries': self.max_entries,
+                    'max_bytes': self.max_bytes,
+                    'ttl_seconds': self.ttl_seconds,
+                },
+            }
+
+
+# ---------- canonical keys ----------
+def _r(value, decimals=CACHE_DECIMALS):
+    # + 0.0 folds -0.0 into 0.0 so both round to the same key.
+    return round(float(value), decimals) + 0.0
+
+
+def energy_key(payload: dict) -> tuple:
+    return (
+        parse_energy_time(payload['timestamp']).strftime('%Y-%m-%d %H:%M'),
+        _r(payload['lag_24h']), _r(payload['Temp']), _r(payload['RH']),
+        _r(payload['FF']), _r(payload['P']),
+    )
+
+
+def fault_key(row: dict) -> tuple:
+    return (
+        int(row['bulb_number']),
+        parse_fault_time(row['timestamp']).strftime('%Y-%m-%d %H:%M:%S'),
+        _r(row['power_consumption (Watts)']), _r(row['voltage_levels (Volts)']),
+        _r(row['current_fluctuations (Amperes)']), _r(row['temperature (Celsius)']),
+        _r(row['current_fluctuations_env (Amperes)']),
+        str(row['environmental_conditions']),
+    )
@@ -0,0 +1,176 @@
+# models/search_snapshot.py
+# Versioned on-disk snapshots of the search index, so a restart restores the
+# dataset and its index instead of waiting for a re-upload.
+#
+# <root>/CURRENT names the live version directory, e.g. <root>/v000003/:
+#   meta.json           format, feature layout, row counts, column schema
+#   features.npy        (rows, 13) float64 timestamp features   - memory-mapped
+#   times.npy, time_rows.npy   sorted timestamp index           - memory-mapped
+#   columns/<i>.npy     one array per numeric/datetime column   - memory-mapped
+#   columns/<i>.codes.npy  dictionary codes of a string column (values in meta.json)
+#   tree.joblib         the BallTree over the first ``n_tree`` rows
+# A version is written to a temporary directory and renamed into place before
+# CURRENT is switched to it, so readers never see a partial snapshot. Picking
+# the version number, the rename and pruning happen under <root>/.lock, so
+# processes saving at the same time get distinct versions.
+
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from models.timestamp_features import TIMESTAMP_FEATURES
+
+SNAPSHOT_DIR = os.getenv("SMARTGRID_SEARCH_SNAPSHOT_DIR", "data/search_index")
+SNAPSHOT_FORMAT = 1
+# Versions kept on disk, the current one included; it is never pruned, so 0 keeps just that one.
+KEEP_VERSIONS = int(os.getenv("SMARTGRID_SEARCH_SNAPSHOT_KEEP", "2"))
+_META_KEYS = ('format', 'version', 'rows', 'n_tree', 'timestamp_col', 'feature_layout', 'columns')
+
+
+class SnapshotError(ValueError):
+    """The snapshot on disk is incomplete or does not match this code's layout."""
+
+
+def _versions(root: str) -> list:
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root) if d.startswith('v') and d[1:].isdigit())
+
+
+def save_snapshot(root: str, columns: dict, timestamp_col: str, features: np.ndarray, tree, n_tree: int,
+                  times: np.ndarray, time_rows: np.ndarray) -> str:
+    """Write a new snapshot version and make it current; returns its directory."""
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.snapshot.tmp-', dir=root)
+    try:
+        os.chmod(tmp, 0o755)
+        meta = _write_parts(tmp, columns, timestamp_col, features, tree, n_tree, times, time_rows)
+        with open(os.path.join(root, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            versions = _versions(root)
+            version = int(versions[-1][1:]) + 1 if versions else 1
+            name = f"v{version:06d}"
+            meta['version'] = version
+            with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp, os.path.join(root, name))
+            with open(os.path.join(root, 'CURRENT.tmp'), 'w') as f:
+                f.write(name)
+            os.replace(os.path.join(root, 'CURRENT.tmp'), os.path.join(root, 'CURRENT'))
+            for old in _versions(root)[:-max(KEEP_VERSIONS, 1)]:
+                shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return os.path.join(root, name)
+
+
+def _write_parts(tmp: str, columns: dict, timestamp_col: str, features: np.ndarray, tree, n_tree: int,
+                 times: np.ndarray, time_rows: np.ndarray) -> dict:
+    """Write everything but meta.json into ``tmp``; returns the meta without its version."""
+    rows = len(features)
+    os.makedirs(os.path.join(tmp, 'columns'))
+    schema = []
+    for i, (col, values) in enumerate(columns.items()):
+        values = values[:rows]
+        if values.dtype == object:
+            codes, uniques = pd.factorize(values, use_na_sentinel=True)
+            np.save(os.path.join(tmp, 'columns', f"{i}.codes.npy"), codes.astype(np.int32))
+            schema.append({'name': col, 'kind': 'strings', 'values': [str(u) for u in uniques]})
+        else:
+            np.save(os.path.join(tmp, 'columns', f"{i}.npy"), np.ascontiguousarray(values))
+            schema.append({'name': col, 'kind': 'array', 'dtype': values.dtype.str})
+
+    np.save(os.path.join(tmp, 'features.npy'), np.ascontiguousarray(features, dtype=np.float64))
+    np.save(os.path.join(tmp, 'times.npy'), times)
+    np.save(os.path.join(tmp, 'time_rows.npy'), time_rows)
+    joblib.dump(tree, os.path.join(tmp, 'tree.joblib'))
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'version': None,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'rows': rows,
+        'n_tree': n_tree,
+        'timestamp_col': timestamp_col,
+        'feature_layout': TIMESTAMP_FEATURES,
+        'columns': schema,
+    }
+
+
+def load_snapshot(root: str = SNAPSHOT_DIR):
+    """The current snapshot's parts with arrays memory-mapped read-only, or None
+    if there is none. Raises SnapshotError if it fails the integrity checks."""
+    try:
+        with open(os.path.join(root, 'CURRENT')) as f:
+            path = os.path.join(root, f.read().strip())
+    except FileNotFoundError:
+        return None
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Unreadable snapshot metadata in {path}: {e}") from None
+    if not isinstance(meta, dict):
+        raise SnapshotError(f"Snapshot metadata in {path} is not an object")
+    missing = [key for key in _META_KEYS if key not in meta]
+    if missing:
+        raise SnapshotError(f"Snapshot metadata in {path} is missing {missing}")
+    if meta.get('format') != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"Snapshot format {meta.get('format')} is not {SNAPSHOT_FORMAT}")
+    if meta.get('feature_layout') != TIMESTAMP_FEATURES:
+        raise SnapshotError("Snapshot feature layout does not match the current timestamp features")
+
+    def mapped(name):
+        try:
+            return np.load(os.path.join(path, name), mmap_mode='r')
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Unreadable snapshot array {name}: {e}") from None
+
+    rows, n_tree = meta['rows'], meta['n_tree']
+    features = mapped('features.npy')
+    times, time_rows = mapped('times.npy'), mapped('time_rows.npy')
+    if features.shape != (rows, len(TIMESTAMP_FEATURES)) or features.dtype != np.float64:
+        raise SnapshotError(f"Snapshot features have shape {features.shape}, expected ({rows}, {len(TIMESTAMP_FEATURES)})")
+    if len(times) != len(time_rows) or len(times) > rows:
+        raise SnapshotError("Snapshot timestamp index does not match its rows")
+
+    columns = {}
+    for i, col in enumerate(meta['columns']):
+        try:
+            name, kind = col['name'], col['kind']
+            if kind == 'strings':
+                codes = mapped(f"columns/{i}.codes.npy")
+                values = np.array(col['values'] + [None], dtype=object)
+                columns[name] = values[codes]  # code -1 (missing) picks the trailing None
+            else:
+                columns[name] = mapped(f"columns/{i}.npy")
+                if columns[name].dtype.str != col['dtype']:
+                    raise SnapshotError(f"Snapshot column {name!r} has the wrong dtype")
+        except (KeyError, TypeError, IndexError) as e:
+            raise SnapshotError(f"Invalid schema for snapshot column {i}: {type(e).__name__}: {e}") from None
+        if len(columns[name]) != rows:
+            raise SnapshotError(f"Snapshot column {name!r} has {len(columns[name])} rows, expected {rows}")
+
+    try:
+        tree = joblib.load(os.path.join(path, 'tree.joblib'))
+        tree_shape = tree.get_arrays()[0].shape
+    except Exception as e:  # a damaged pickle can fail in many ways (EOFError, UnpicklingError, KeyError, ...)
+        raise SnapshotError(f"Unreadable snapshot BallTree: {type(e).__name__}: {e}") from None
+    if tree_shape != (n_tree, len(TIMESTAMP_FEATURES)):
+        raise SnapshotError("Snapshot BallTree does not cover the recorded rows")
+    return {
+        'path': path,
+        'meta': meta,
+        'columns': columns,
+        'features': features,
+        'tree': tree,
+        'times': times,
+        'time_rows': time_rows,
+    }
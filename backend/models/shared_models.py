@@ -0,0 +1,142 @@
+# models/shared_models.py
+# Memory-mapped model storage, so that N uvicorn workers serve from one
+# physical copy of the model arrays instead of N private ones.
+#
+# With SMARTGRID_SHARED_MODELS=1 every tree model is converted once into flat
+# node arrays (models/tree_compiler.py) and written uncompressed to MMAP_DIR,
+# keyed by the source file's hash. Workers then joblib.load it with
+# mmap_mode='r': the arrays are read-only views of the page cache, shared by
+# every process that maps the same file. sklearn/XGBoost/LightGBM objects copy
+# their trees onto the private heap when unpickled, which is why the compiled
+# form is what gets stored. A Pipeline ending in a tree ensemble (the fault
+# models) is stored as its fitted preprocessing plus the compiled trees, so the
+# tree arrays are shared while the small transformers stay per worker.
+# Anything that cannot be compiled (e.g. a Pipeline ending in
+# LogisticRegression) is stored as-is and stays private to each worker.
+
+import glob
+import os
+import re
+from contextlib import contextmanager
+
+import joblib
+
+from models.model_registry import _file_sha1
+from models.tree_compiler import compile_model
+
+SHARED_MODELS = os.getenv("SMARTGRID_SHARED_MODELS", "0") == "1"
+MMAP_DIR = os.getenv("SMARTGRID_MMAP_DIR", "models/ml_models/mmap")
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+
+@contextmanager
+def _export_lock():
+    """Serialise exports across workers starting at the same time."""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(MMAP_DIR, ".lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _to_arrays(model):
+    """The stored form: compiled node arrays where possible."""
+    if isinstance(model, dict) and 'models' in model:
+        return {**model, 'models': {name: _to_arrays(m) for name, m in model['models'].items()}}
+    try:
+        return compile_model(model)
+    except (NotImplementedError, AttributeError, KeyError, ValueError) as e:
+        print(f"Shared models: storing {type(model).__name__} as-is, it will not be shared ({e})")
+        return model
+
+
+def mmap_path(path: str, sha1: str = None) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(MMAP_DIR, f"{stem}.{(sha1 or _file_sha1(path))[:16]}.joblib")
+
+
+def export_mmap(path: str) -> str:
+    """Write the memory-mappable copy of ``path`` if it does not exist yet; returns its path."""
+    dest = mmap_path(path)
+    if os.path.exists(dest):
+        return dest
+    os.makedirs(MMAP_DIR, exist_ok=True)
+    with _export_lock():
+        if not os.path.exists(dest):
+            print(f"Shared models: exporting {path} to {dest}")
+            tmp = f"{dest}.{os.getpid()}.tmp"
+            # Uncompressed, so joblib stores the arrays aligned and mmap_mode can map them.
+            joblib.dump(_to_arrays(joblib.load(path)), tmp)
+            os.replace(tmp, dest)
+            # Older exports of the same model; workers still mapping them keep their pages.
+            stem = os.path.basename(dest).split('.')[0]
+            for stale in glob.glob(os.path.join(MMAP_DIR, f"{stem}.*.joblib")):
+                if stale != dest and re.fullmatch(rf"{re.escape(stem)}\.[0-9a-f]{{16}}\.joblib",
+                                                  os.path.basename(stale)):
+                    os.remove(stale)
+    return dest
+
+
+def load_shared_model(path: str):
+    """Registry loader: the model with its arrays memory-mapped read-only."""
+    return joblib.load(export_mmap(path), mmap_mode='r')
+
+
+# ---------- memory report ----------
+_SMAPS_HEADER = re.compile(r'^[0-9a-f]+-[0-9a-f]+ ')
+_SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def memory_report(pid='self') -> dict:
+    """Resident memory of a process split into shared and private (unique to it)
+    pages, in bytes, with the part that maps exported model files broken out.
+    Empty where /proc/<pid>/smaps is not available."""
+    totals = dict.fromkeys(_SMAPS_FIELDS, 0)
+    models = dict.fromkeys(_SMAPS_FIELDS, 0)
+    mmap_dir = os.path.abspath(MMAP_DIR)
+    in_models = False
+    try:
+        with open(f"/proc/{pid}/smaps") as f:
+            for line in f:
+                if _SMAPS_HEADER.match(line):
+                    parts = line.split(None, 5)
+                    in_models = len(parts) == 6 and parts[5].strip().startswith(mmap_dir)
+                    continue
+                key, _, rest = line.partition(':')
+                if key in totals:
+                    kb = int(rest.split()[0]) * 1024
+                    totals[key] += kb
+                    if in_models:
+                        models[key] += kb
+    except OSError:
+        return {}
+
+    def summary(c):
+        return {
+            'rss': c['Rss'],
+            'pss': c['Pss'],
+            'shared': c['Shared_Clean'] + c['Shared_Dirty'],
+            'private': c['Private_Clean'] + c['Private_Dirty'],
+        }
+
+    return {'pid': os.getpid() if pid == 'self' else int(pid), **summary(totals), 'model_files': summary(models)}
+
+
+def print_memory_report(label: str = "worker"):
+    report = memory_report()
+    if not report:
+        return
+    mb = 2 ** 20
+    m = report['model_files']
+    print(f"Memory ({label} {report['pid']}): rss {report['rss'] / mb:.1f} MB, "
+          f"private {report['private'] / mb:.1f} MB, shared {report['shared'] / mb:.1f} MB, "
+          f"pss {report['pss'] / mb:.1f} MB; mapped models rss {m['rss'] / mb:.1f} MB "
+          f"(shared {m['shared'] / mb:.1f} MB)")
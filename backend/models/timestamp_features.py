@@ -0,0 +1,94 @@
+# models/timestamp_features.py
+# Vectorized form of the 13 timestamp features that FastTimestampSearch._prep
+# and EnhancedTimestampSearch.enhanced_preprocess computed one Timestamp at a
+# time. The output matches theirs bit for bit (see benchmarks/timestamp_features.py).
+
+import os
+
+import numpy as np
+import pandas as pd
+
+TIMESTAMP_FEATURES = [
+    'unix_ts', 'hour_sin', 'hour_cos', 'day_of_week', 'month', 'hour', 'minute', 'day',
+    'iso_week', 'day_of_year', 'year', 'second_half', 'night',
+]
+CHUNK_ROWS = int(os.getenv("SMARTGRID_FEATURE_CHUNK_ROWS", "1000000"))
+
+_NAT = np.iinfo(np.int64).min
+# Built with the same scalar expression as the per-row code, so the values are identical.
+_HOUR_SIN = np.array([np.sin(2 * np.pi * h / 23) for h in range(24)])
+_HOUR_COS = np.array([np.cos(2 * np.pi * h / 23) for h in range(24)])
+
+
+def _as_datetime_index(values) -> pd.DatetimeIndex:
+    if isinstance(values, np.ndarray) and values.dtype == np.int64:
+        return pd.DatetimeIndex(values.view('datetime64[ns]'))
+    return pd.DatetimeIndex(pd.to_datetime(values, errors='coerce'))
+
+
+def _iso_weeks_in_year(year: np.ndarray) -> np.ndarray:
+    def p(y):
+        return (y + y // 4 - y // 100 + y // 400) % 7
+    return 52 + ((p(year) == 4) | (p(year - 1) == 3))
+
+
+def _fill(idx: pd.DatetimeIndex, out: np.ndarray):
+    utc = idx.asi8
+    local = idx.tz_localize(None).asi8 if idx.tz is not None else utc
+    nat = local == _NAT
+    out[nat] = 0
+    ok = ~nat
+    if not ok.any():
+        return
+    utc, local = utc[ok], local[ok]
+
+    # Timestamp.timestamp() is round(ns / 1e9, 6); only sub-second values need the rounding.
+    unix = utc / 1e9
+    frac = utc % 1_000_000_000 != 0
+    if frac.any():
+        unix[frac] = [round(v / 1_000_000_000, 6) for v in utc[frac].tolist()]
+
+    seconds = local // 1_000_000_000
+    days = seconds // 86400
+    second_of_day = seconds - days * 86400
+    hour = second_of_day // 3600
+    minute = second_of_day % 3600 // 60
+    d = days.astype('datetime64[D]')
+    month_start = d.astype('datetime64[M]')
+    year_start = d.astype('datetime64[Y]')
+    year = year_start.astype(np.int64) + 1970
+    month = month_start.astype(np.int64) % 12 + 1
+    day = (d - month_start).astype(np.int64) + 1
+    day_of_year = (d - year_start).astype(np.int64) + 1
+    day_of_week = (days + 3) % 7  # 1970-01-01 was a Thursday; Monday = 0
+
+    week = (day_of_year - (day_of_week + 1) + 10) // 7
+    # Both masks come from the unadjusted week: a week-53 carry-over from the
+    # previous year must not then be wrapped to week 1.
+    previous_year = week < 1
+    next_year = week > _iso_weeks_in_year(year)
+    week = np.where(previous_year, _iso_weeks_in_year(year - 1), np.where(next_year, 1, week))
+
+    out[ok] = np.column_stack([
+        unix, _HOUR_SIN[hour], _HOUR_COS[hour], day_of_week, month, hour, minute, day,
+        week, day_of_year, year, month > 6, (hour >= 18) | (hour <= 6),
+    ])
+
+
+def timestamp_features(values, chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+    """``(n, 13)`` float64 features for timestamps (strings, datetimes, a
+    DatetimeIndex/Series or int64 epoch ns). Invalid timestamps give a zero row.
+
+    The input is parsed and converted ``chunk_rows`` at a time, so the only
+    allocation proportional to ``n`` is the output itself.
+    """
+    if isinstance(values, (pd.Series, pd.Index)):
+        values = values.array if isinstance(values.dtype, pd.DatetimeTZDtype) else values.to_numpy()
+    elif not isinstance(values, np.ndarray):
+        values = np.asarray(values, dtype=object)
+    n = len(values)
+    out = np.empty((n, len(TIMESTAMP_FEATURES)), dtype=np.float64)
+    for start in range(0, n, chunk_rows):
+        end = min(start + chunk_rows, n)
+        _fill(_as_datetime_index(values[start:end]), out[start:end])
+    return out
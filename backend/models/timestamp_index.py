@@ -0,0 +1,207 @@
+# models/timestamp_index.py
+
+import os
+
+import numpy as np
+
+NS_PER_SECOND = 1_000_000_000
+_NAT = np.iinfo(np.int64).min
+_FAR = np.iinfo(np.int64).max
+
+# Inserts go to a small sorted delta that is merged into the main arrays past this size.
+DELTA_MERGE_ROWS = int(os.getenv("SMARTGRID_TIMESTAMP_DELTA_ROWS", "4096"))
+
+
+def _nearest(times: np.ndarray, rows: np.ndarray, t: int, k: int):
+    """The ``k`` entries of one sorted array closest to ``t``: (rows, |dt| in ns)."""
+    pos = int(np.searchsorted(times, t))
+    lo, hi = max(pos - k, 0), min(pos + k, len(times))
+    delta = np.abs(times[lo:hi] - t)
+    sel = np.argsort(delta, kind='stable')[:k]
+    return rows[lo:hi][sel], delta[sel]
+
+
+def _nearest_many(times: np.ndarray, rows: np.ndarray, t: np.ndarray, k: int):
+    """``_nearest`` for a vector of query times: (rows, |dt| in ns), each (m, min(k, n))."""
+    n = len(times)
+    kk = min(k, n)
+    if kk == 0:
+        return np.empty((len(t), 0), dtype=np.int64), np.empty((len(t), 0), dtype=np.int64)
+    cand = np.searchsorted(times, t)[:, np.newaxis] + np.arange(-kk, kk)
+    valid = (cand >= 0) & (cand < n)
+    cand = np.clip(cand, 0, n - 1)
+    delta = np.where(valid, np.abs(times[cand] - t[:, np.newaxis]), np.iinfo(np.int64).max)
+    sel = np.argsort(delta, axis=1, kind='stable')[:, :kk]
+    return np.take_along_axis(rows[cand], sel, axis=1), np.take_along_axis(delta, sel, axis=1)
+
+
+def _nearest_within(times: np.ndarray, rows: np.ndarray, t: int, k: int, start, end, keep):
+    """``_nearest`` limited to ``start <= time <= end`` and rows passing ``keep``.
+
+    The search window around ``t`` grows until it holds ``k`` kept rows that are
+    no farther than anything outside it, or covers the whole time window.
+    """
+    lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+    hi = len(times) if end is None else int(np.searchsorted(times, end, side='right'))
+    pos = min(max(int(np.searchsorted(times, t)), lo), hi)
+    width = max(k, 1)
+    while True:
+        a, b = max(pos - width, lo), min(pos + width, hi)
+        found, delta = rows[a:b], np.abs(times[a:b] - t)
+        if keep is not None:
+            mask = keep(found)
+            found, delta = found[mask], delta[mask]
+        sel = np.argsort(delta, kind='stable')[:k]
+        if (a == lo and b == hi) or (len(sel) == k and delta[sel[-1]] <= min(
+                t - times[a - 1] if a > lo else _FAR, times[b] - t if b < hi else _FAR)):
+            return found[sel], delta[sel]
+        width *= 4
+
+
+class SortedTimestampIndex:
+    """Nearest-timestamp lookups on an int64 epoch-ns array kept sorted.
+
+    ``times`` is sorted ascending and ``rows[i]`` is the row id of ``times[i]``.
+    Every query is a bisection plus work proportional to its result size:
+    k-nearest is O(log n + k log k), ranges and "last N before t" are slices.
+    Inserted rows go to a small sorted delta that queries also consult; it is
+    merged into the main arrays once it reaches ``DELTA_MERGE_ROWS``. NaT rows
+    are not indexed.
+
+    An index is immutable: ``inserted`` returns a new index that shares the
+    unchanged arrays, so a reader holding an index sees a fixed set of rows
+    and needs no lock.
+    """
+
+    def __init__(self, times=None, rows=None):
+        times = np.asarray(times if times is not None else [], dtype=np.int64)
+        rows = np.arange(len(times), dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+        valid = times != _NAT
+        times, rows = times[valid], rows[valid]
+        order = np.argsort(times, kind='stable')
+        empty = np.empty(0, dtype=np.int64)
+        # (times, rows, delta_times, delta_rows)
+        self._state = (times[order], rows[order], empty, empty)
+
+    @classmethod
+    def from_sorted(cls, times: np.ndarray, rows: np.ndarray):
+        """Wrap arrays that are already sorted by time (e.g. from a snapshot) without copying."""
+        index = cls.__new__(cls)
+        empty = np.empty(0, dtype=np.int64)
+        index._state = (times, rows, empty, empty)
+        return index
+
+    @classmethod
+    def from_datetimes(cls, values, rows=None):
+        """Build from anything ``np.asarray(..., 'datetime64[ns]')`` accepts."""
+        return cls(np.asarray(values, dtype='datetime64[ns]').view(np.int64), rows)
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._state[0]
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self._state[1]
+
+    def __len__(self):
+        times, _, delta_times, _ = self._state
+        return len(times) + len(delta_times)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self._state)
+
+    def inserted(self, t: int, row: int):
+        """A new index with ``row`` at time ``t`` added; this one is left unchanged."""
+        if t == _NAT:
+            return self
+        times, rows, delta_times, delta_rows = self._state
+        pos = np.searchsorted(delta_times, t, side='right')
+        delta_times = np.insert(delta_times, pos, t)
+        delta_rows = np.insert(delta_rows, pos, row)
+        if len(delta_times) >= DELTA_MERGE_ROWS:
+            times, rows = self._merge(times, rows, delta_times, delta_rows)
+            delta_times = delta_rows = np.empty(0, dtype=np.int64)
+        index = SortedTimestampIndex.__new__(SortedTimestampIndex)
+        index._state = (times, rows, delta_times, delta_rows)
+        return index
+
+    @staticmethod
+    def _merge(times, rows, delta_times, delta_rows):
+        pos = np.searchsorted(times, delta_times, side='right')
+        return np.insert(times, pos, delta_times), np.insert(rows, pos, delta_rows)
+
+    def sorted_arrays(self):
+        """``(times, rows)`` of every indexed row, delta included, sorted by time."""
+        times, rows, delta_times, delta_rows = self._state
+        if len(delta_times):
+            return self._merge(times, rows, delta_times, delta_rows)
+        return times, rows
+
+    def _parts(self):
+        times, rows, delta_times, delta_rows = self._state
+        parts = [(times, rows)]
+        if len(delta_times):
+            parts.append((delta_times, delta_rows))
+        return parts
+
+    # ---------- queries ----------
+    def nearest(self, t: int, k: int = 5):
+        """Row ids of the ``k`` closest timestamps to ``t`` and their distance in seconds."""
+        found = [_nearest(times, rows, t, k) for times, rows in self._parts()]
+        rows = np.concatenate([r for r, _ in found])
+        delta = np.concatenate([d for _, d in found])
+        if len(found) > 1:
+            sel = np.argsort(delta, kind='stable')[:k]
+            rows, delta = rows[sel], delta[sel]
+        return rows, delta / NS_PER_SECOND
+
+    def nearest_within(self, t: int, k: int = 5, start: int = None, end: int = None, keep=None):
+        """``nearest`` among times in ``[start, end]`` and rows for which the
+        vectorized predicate ``keep(rows) -> bool mask`` holds."""
+        found = [_nearest_within(times, rows, t, k, start, end, keep) for times, rows in self._parts()]
+        rows = np.concatenate([r for r, _ in found])
+        delta = np.concatenate([d for _, d in found])
+        if len(found) > 1:
+            sel = np.argsort(delta, kind='stable')[:k]
+            rows, delta = rows[sel], delta[sel]
+        return rows, delta / NS_PER_SECOND
+
+    def nearest_many(self, t: np.ndarray, k: int = 5):
+        """``nearest`` for an int64 array of query times; returns (m, k) row ids and seconds."""
+        t = np.asarray(t, dtype=np.int64)
+        found = [_nearest_many(times, rows, t, k) for times, rows in self._parts()]
+        rows = np.concatenate([r for r, _ in found], axis=1)
+        delta = np.concatenate([d for _, d in found], axis=1)
+        if len(found) > 1:
+            sel = np.argsort(delta, axis=1, kind='stable')[:, :k]
+            rows, delta = np.take_along_axis(rows, sel, axis=1), np.take_along_axis(delta, sel, axis=1)
+        return rows, delta / NS_PER_SECOND
+
+    def range(self, start: int = None, end: int = None, limit: int = None):
+        """Row ids with ``start <= t <= end`` in time order (at most ``limit``)."""
+        out_times, out_rows = [], []
+        for times, rows in self._parts():
+            lo = 0 if start is None else np.searchsorted(times, start, side='left')
+            hi = len(times) if end is None else np.searchsorted(times, end, side='right')
+            out_times.append(times[lo:hi])
+            out_rows.append(rows[lo:hi])
+        if len(out_rows) == 1:
+            rows = out_rows[0]
+        else:
+            times = np.concatenate(out_times)
+            rows = np.concatenate(out_rows)[np.argsort(times, kind='stable')]
+        return rows[:limit] if limit is not None else rows
+
+    def last_before(self, t: int, n: int = 1):
+        """Row ids of the ``n`` latest timestamps ``<= t``, most recent first."""
+        out_times, out_rows = [], []
+        for times, rows in self._parts():
+            hi = np.searchsorted(times, t, side='right')
+            out_times.append(times[max(hi - n, 0):hi])
+            out_rows.append(rows[max(hi - n, 0):hi])
+        times = np.concatenate(out_times)
+        rows = np.concatenate(out_rows)
+        order = np.argsort(times, kind='stable')[::-1][:n]
+        return rows[order]
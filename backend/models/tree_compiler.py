@@ -0,0 +1,393 @@
+# models/tree_compiler.py
+# Flattens fitted tree ensembles (sklearn forests / gradient boosting, XGBoost,
+# LightGBM) into contiguous NumPy node arrays and evaluates them vectorized.
+# A sklearn Pipeline ending in one keeps its preprocessing steps and compiles
+# the final estimator.
+#
+# The predictors opt in with SMARTGRID_COMPILED_TREES=1; anything that cannot be
+# compiled is served by the original object. benchmarks/tree_compiler.py checks
+# prediction equivalence and compares latency and memory with joblib.load.
+
+import json
+import os
+
+import joblib
+import numpy as np
+
+COMPILED_TREES = os.getenv("SMARTGRID_COMPILED_TREES", "0") == "1"
+
+# How a node routes a missing value (NaN).
+MISSING_DEFAULT = 0   # NaN follows default_left
+MISSING_AS_ZERO = 1   # NaN is compared as 0.0 (LightGBM missing_type None)
+MISSING_ZERO = 2      # NaN and 0.0 follow default_left (LightGBM missing_type Zero)
+
+
+def _densify(X, missing: bool) -> np.ndarray:
+    if not missing:
+        return X.toarray()
+    X = X.tocoo()
+    dense = np.full(X.shape, np.nan)
+    dense[X.row, X.col] = X.data
+    return dense
+
+
+class CompiledTrees:
+    """A tree ensemble as flat node arrays.
+
+    ``left[i] == -1`` marks a leaf; ``value[i]`` is its output vector. Each row
+    walks every tree at once, one level per step, so a call costs
+    ``max_depth`` vectorized gathers regardless of the number of trees. The raw
+    score is ``base + scale * aggregate(leaf values)``; ``link`` maps it to the
+    model's output.
+
+    Sparse input is densified first; with ``sparse_missing`` (XGBoost) its
+    unstored entries are missing values rather than zeros.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, missing, value, roots,
+                 max_depth, aggregate='sum', base=0.0, scale=1.0, strict=False,
+                 input_dtype=np.float32, link='identity', classes=None, n_features=None,
+                 sparse_missing=False):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.missing = np.ascontiguousarray(missing, dtype=np.int8)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.aggregate = aggregate
+        self.base = np.atleast_1d(np.asarray(base, dtype=np.float64))
+        self.scale = float(scale)
+        self.strict = strict
+        self.input_dtype = input_dtype
+        self.link = link
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.sparse_missing = sparse_missing
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right,
+                                      self.default_left, self.missing, self.value, self.roots))
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        if hasattr(X, 'toarray'):  # e.g. the one-hot output of a Pipeline's preprocessing
+            X = _densify(X, self.sparse_missing)
+        X = np.asarray(X, dtype=self.input_dtype)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        n = X.shape[0]
+        nodes = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+        rows = np.arange(n)[:, np.newaxis]
+        has_zero_missing = bool((self.missing == MISSING_ZERO).any())
+        for _ in range(self.max_depth):
+            left = self.left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                break
+            x = X[rows, self.feature[nodes]].astype(np.float64)
+            missing = self.missing[nodes]
+            is_nan = np.isnan(x)
+            x = np.where(is_nan & (missing == MISSING_AS_ZERO), 0.0, x)
+            to_default = is_nan & (missing != MISSING_AS_ZERO)
+            if has_zero_missing:
+                to_default |= (missing == MISSING_ZERO) & (x == 0.0)
+            thr = self.threshold[nodes]
+            go_left = x < thr if self.strict else x <= thr
+            go_left = np.where(to_default, self.default_left[nodes], go_left)
+            nodes = np.where(internal, np.where(go_left, left, self.right[nodes]), nodes)
+        return nodes
+
+    def raw_score(self, X) -> np.ndarray:
+        vals = self.value[self._leaves(X)]          # (n, trees, outputs)
+        agg = vals.mean(axis=1) if self.aggregate == 'mean' else vals.sum(axis=1)
+        return self.base + self.scale * agg
+
+    def predict_proba(self, X) -> np.ndarray:
+        raw = self.raw_score(X)
+        if self.link == 'proba':
+            return raw
+        if self.link == 'sigmoid':
+            p = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        if self.link == 'softmax':
+            e = np.exp(raw - raw.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        raise AttributeError("predict_proba is only available for classifiers")
+
+    def predict(self, X) -> np.ndarray:
+        if self.classes_ is None:
+            return self.raw_score(X)[:, 0]
+        return np.asarray(self.classes_).take(self.predict_proba(X).argmax(axis=1))
+
+
+class _Builder:
+    """Accumulates trees into flat arrays."""
+
+    def __init__(self, n_outputs: int):
+        self.n_outputs = n_outputs
+        self.feature, self.threshold, self.left, self.right = [], [], [], []
+        self.default_left, self.missing, self.value, self.roots = [], [], [], []
+        self.max_depth = 0
+
+    def add_node(self, feature=0, threshold=0.0, default_left=True, missing=MISSING_DEFAULT, value=None):
+        self.feature.append(feature)
+        self.threshold.append(threshold)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.default_left.append(default_left)
+        self.missing.append(missing)
+        self.value.append(np.zeros(self.n_outputs) if value is None else value)
+        return len(self.feature) - 1
+
+    def build(self, **kwargs) -> CompiledTrees:
+        return CompiledTrees(self.feature, self.threshold, self.left, self.right, self.default_left,
+                             self.missing, np.vstack(self.value), self.roots, self.max_depth, **kwargs)
+
+
+def _add_sklearn_tree(b: _Builder, tree, output_slice=None, normalize=False):
+    t = tree.tree_
+    offset = len(b.feature)
+    values = t.value[:, 0, :]
+    if normalize:
+        sums = values.sum(axis=1, keepdims=True)
+        if not np.allclose(sums[sums > 0], 1.0):
+            values = values / np.where(sums == 0, 1.0, sums)
+    missing_left = getattr(t, 'missing_go_to_left', None)
+    for i in range(t.node_count):
+        if output_slice is None:
+            v = values[i]
+        else:
+            v = np.zeros(b.n_outputs)
+            v[output_slice] = values[i]
+        b.add_node(max(int(t.feature[i]), 0), float(t.threshold[i]),
+                   bool(missing_left[i]) if missing_left is not None else True, MISSING_DEFAULT, v)
+    for i in range(t.node_count):
+        if t.children_left[i] != -1:
+            b.left[offset + i] = offset + int(t.children_left[i])
+            b.right[offset + i] = offset + int(t.children_right[i])
+    b.roots.append(offset)
+    b.max_depth = max(b.max_depth, int(t.max_depth))
+
+
+def _compile_sklearn_forest(model) -> CompiledTrees:
+    is_classifier = hasattr(model, 'classes_')
+    n_out = len(model.classes_) if is_classifier else 1
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise NotImplementedError("multi-output forests are not supported")
+    b = _Builder(n_out)
+    for est in model.estimators_:
+        _add_sklearn_tree(b, est, normalize=is_classifier)
+    return b.build(aggregate='mean', input_dtype=np.float32,
+                   link='proba' if is_classifier else 'identity',
+                   classes=model.classes_ if is_classifier else None,
+                   n_features=model.n_features_in_)
+
+
+def _compile_sklearn_gb(model) -> CompiledTrees:
+    n_features = model.n_features_in_
+    is_classifier = hasattr(model, 'classes_')
+    k = model.estimators_.shape[1]
+    b = _Builder(k)
+    for stage in model.estimators_:
+        for j, est in enumerate(stage):
+            _add_sklearn_tree(b, est, output_slice=slice(j, j + 1))
+    if model.init_ == 'zero':
+        base = np.zeros(k)
+    elif is_classifier:
+        base = np.asarray(model._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0])
+    else:
+        base = np.atleast_1d(model.init_.predict(np.zeros((1, n_features)))).astype(float)[:1]
+    link = 'identity'
+    if is_classifier:
+        link = 'sigmoid' if k == 1 else 'softmax'
+    return b.build(aggregate='sum', base=base, scale=model.learning_rate, input_dtype=np.float32,
+                   link=link, classes=model.classes_ if is_classifier else None, n_features=n_features)
+
+
+def _parse_base_score(text) -> np.ndarray:
+    return np.array([float(v) for v in str(text).strip('[]').split(',') if v.strip()], dtype=np.float64)
+
+
+def _compile_xgboost(model) -> CompiledTrees:
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())
+    learner = config['learner']
+    objective = learner['objective']['name']
+    n_groups = max(int(learner['learner_model_param'].get('num_class', '0')), 1)
+    base = _parse_base_score(learner['learner_model_param']['base_score'])
+
+    link = 'identity'
+    if objective.startswith('binary:logistic') or objective == 'reg:logistic':
+        link = 'sigmoid' if hasattr(model, 'classes_') else 'identity'
+        base = np.log(base / (1.0 - base))
+    elif objective.startswith('multi:'):
+        link = 'softmax'
+    elif not objective.startswith('reg:squared') and objective not in ('reg:absoluteerror', 'reg:pseudohubererror'):
+        raise NotImplementedError(f"XGBoost objective {objective} is not supported")
+    if base.size != n_groups:
+        base = np.resize(base, n_groups)
+
+    names = booster.feature_names
+    index = {name: i for i, name in enumerate(names)} if names else None
+    dumps = booster.get_dump(dump_format='json')
+    n_parallel = int(getattr(model, 'num_parallel_tree', None) or 1)
+    best = getattr(model, 'best_iteration', None) if getattr(model, 'early_stopping_rounds', None) else None
+    if best is not None:
+        dumps = dumps[:(best + 1) * n_groups * n_parallel]
+
+    b = _Builder(n_groups)
+    for t, dump in enumerate(dumps):
+        group = (t // n_parallel) % n_groups
+        nodes = {}
+
+        def walk(node, depth):
+            nodes[node['nodeid']] = node
+            b.max_depth = max(b.max_depth, depth)
+            for child in node.get('children', []):
+                walk(child, depth + 1)
+
+        walk(json.loads(dump), 0)
+        ids = {nid: b.add_node() for nid in sorted(nodes)}
+        for nid, node in nodes.items():
+            i = ids[nid]
+            if 'leaf' in node:
+                b.value[i] = np.zeros(n_groups)
+                b.value[i][group] = node['leaf']
+                continue
+            if 'split_condition' not in node or isinstance(node.get('split_condition'), list):
+                raise NotImplementedError("categorical XGBoost splits are not supported")
+            split = node['split']
+            b.feature[i] = index[split] if index is not None else int(str(split).lstrip('f'))
+            b.threshold[i] = float(np.float32(node['split_condition']))
+            b.left[i] = ids[node['yes']]
+            b.right[i] = ids[node['no']]
+            b.default_left[i] = node['missing'] == node['yes']
+        b.roots.append(ids[0])
+    return b.build(aggregate='sum', base=base, strict=True, input_dtype=np.float32, link=link,
+                   classes=getattr(model, 'classes_', None), n_features=getattr(model, 'n_features_in_', None),
+                   sparse_missing=True)
+
+
+def _compile_lightgbm(model) -> CompiledTrees:
+    booster = model.booster_
+    dump = booster.dump_model()
+    objective = str(dump.get('objective', 'regression')).split()[0]
+    n_groups = int(dump.get('num_tree_per_iteration', 1))
+    link = 'identity'
+    if objective == 'binary':
+        link = 'sigmoid'
+    elif objective.startswith('multiclass'):
+        link = 'softmax'
+    elif not objective.startswith('regression') and objective not in ('huber', 'fair', 'quantile'):
+        raise NotImplementedError(f"LightGBM objective {objective} is not supported")
+
+    tree_info = dump['tree_info']
+    best = getattr(model, 'best_iteration_', None)
+    if best:
+        tree_info = tree_info[:best * n_groups]
+
+    missing_codes = {'None': MISSING_AS_ZERO, 'Zero': MISSING_ZERO, 'NaN': MISSING_DEFAULT}
+    b = _Builder(n_groups)
+    for t, info in enumerate(tree_info):
+        group = t % n_groups
+
+        def walk(node, depth):
+            b.max_depth = max(b.max_depth, depth)
+            i = b.add_node()
+            if 'leaf_value' in node:
+                b.value[i] = np.zeros(n_groups)
+                b.value[i][group] = node['leaf_value']
+                return i
+            if node.get('decision_type', '<=') != '<=':
+                raise NotImplementedError("categorical LightGBM splits are not supported")
+            b.feature[i] = node['split_feature']
+            b.threshold[i] = float(node['threshold'])
+            b.default_left[i] = bool(node.get('default_left', True))
+            b.missing[i] = missing_codes.get(node.get('missing_type', 'None'), MISSING_AS_ZERO)
+            b.left[i] = walk(node['left_child'], depth + 1)
+            b.right[i] = walk(node['right_child'], depth + 1)
+            return i
+
+        b.roots.append(walk(info['tree_structure'], 0))
+    return b.build(aggregate='sum', input_dtype=np.float64, link=link,
+                   classes=getattr(model, 'classes_', None), n_features=getattr(model, 'n_features_in_', None))
+
+
+class CompiledPipeline:
+    """A sklearn Pipeline's fitted preprocessing steps followed by its final
+    estimator as CompiledTrees."""
+
+    def __init__(self, steps, final: CompiledTrees):
+        self.steps = steps
+        self.final = final
+        self.classes_ = final.classes_
+        names = getattr(steps[0][1], 'feature_names_in_', None) if steps else None
+        if names is not None:
+            self.feature_names_in_ = names
+
+    @property
+    def nbytes(self) -> int:
+        return self.final.nbytes
+
+    def transform(self, X):
+        for _, step in self.steps:
+            if step != 'passthrough':
+                X = step.transform(X)
+        return X
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.final.predict_proba(self.transform(X))
+
+    def predict(self, X) -> np.ndarray:
+        return self.final.predict(self.transform(X))
+
+
+def _compile_pipeline(model) -> CompiledPipeline:
+    *head, (_, last) = model.steps
+    return CompiledPipeline(head, compile_model(last))
+
+
+def compile_model(model):
+    """Compile a fitted tree ensemble (or the one ending a Pipeline); raises
+    NotImplementedError for anything else."""
+    name = type(model).__name__
+    if name == 'Pipeline':
+        return _compile_pipeline(model)
+    if name in ('RandomForestRegressor', 'RandomForestClassifier', 'ExtraTreesRegressor', 'ExtraTreesClassifier'):
+        return _compile_sklearn_forest(model)
+    if name in ('GradientBoostingRegressor', 'GradientBoostingClassifier'):
+        return _compile_sklearn_gb(model)
+    if name in ('XGBRegressor', 'XGBClassifier'):
+        return _compile_xgboost(model)
+    if name in ('LGBMRegressor', 'LGBMClassifier'):
+        return _compile_lightgbm(model)
+    raise NotImplementedError(f"{name} cannot be compiled")
+
+
+def maybe_compile(model):
+    """The compiled form of ``model`` when enabled and supported, else ``model`` itself."""
+    if not COMPILED_TREES:
+        return model
+    if isinstance(model, dict) and 'models' in model:
+        # Ensemble bundle: compile its members, keep weights and structure.
+        return {**model, 'models': {name: maybe_compile(m) for name, m in model['models'].items()}}
+    try:
+        return compile_model(model)
+    except (NotImplementedError, AttributeError, KeyError, ValueError) as e:
+        print(f"Tree compiler: serving {type(model).__name__} as-is ({e})")
+        return model
+
+
+def load_tree_model(path: str):
+    """``joblib.load`` followed by ``maybe_compile``; usable as a registry loader.
+
+    With SMARTGRID_SHARED_MODELS=1 the compiled model is memory-mapped instead
+    (models/shared_models.py), so workers share its pages.
+    """
+    from models.shared_models import SHARED_MODELS, load_shared_model
+    if SHARED_MODELS:
+        return load_shared_model(path)
+    return maybe_compile(joblib.load(path))
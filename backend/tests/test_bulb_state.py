@@ -0,0 +1,101 @@
+# tests/test_bulb_state.py
+
+import asyncio
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.bulb_state import BulbStateStore
+from models.inference_scheduler import MicroBatcher
+
+DAY = 86400
+
+
+def _state(store, bulb):
+    s = store._slots[bulb]
+    return int(store.count[s]), store.mean[s].copy(), store.m2[s].copy(), int(store.last_ts[s])
+
+
+def test_matches_pandas_rolling_window():
+    store = BulbStateStore(window=3)
+    values = np.random.default_rng(0).normal(100, 10, size=(8, 3))
+    got = [store.observe(7, i * DAY, v) for i, v in enumerate(values)]
+    frame = pd.DataFrame(values).rolling(3, min_periods=1)
+    np.testing.assert_allclose([g[0] for g in got], frame.mean().to_numpy())
+    np.testing.assert_allclose([g[1] for g in got], frame.std().fillna(0).to_numpy(), atol=1e-9)
+    assert [g[2] for g in got] == [0] + [1] * 7
+
+
+@pytest.mark.parametrize('bad', [math.inf, -math.inf, math.nan])
+def test_rejects_non_finite_values(bad):
+    store = BulbStateStore()
+    store.observe(1, 0, [100, 220, 0.4])
+    before = _state(store, 1)
+    with pytest.raises(ValueError):
+        store.observe(1, DAY, [bad, 220, 0.4])
+    with pytest.raises(ValueError):
+        store.preview([(1, DAY, [100, bad, 0.4])])
+    avg, _, _ = store.observe(1, 2 * DAY, [200, 220, 0.4])
+    assert np.isfinite(avg).all()
+    assert _state(store, 1)[0] == before[0] + 1
+
+
+def test_rejects_out_of_order_readings():
+    store = BulbStateStore()
+    store.observe(1, 5 * DAY, [100, 220, 0.4])
+    with pytest.raises(ValueError):
+        store.observe(1, 2 * DAY, [100, 220, 0.4])
+    with pytest.raises(ValueError):
+        store.preview([(1, 6 * DAY, [1, 1, 1]), (1, 5 * DAY + 1, [1, 1, 1])])
+    assert _state(store, 1)[0] == 1
+    # The latest reading again is a no-op, not an out-of-order one.
+    assert store.observe(1, 5 * DAY, [100, 220, 0.4])[2] == 0
+    assert _state(store, 1)[0] == 1
+
+
+def test_preview_does_not_change_the_store():
+    store = BulbStateStore()
+    store.observe(1, 0, [100, 220, 0.4])
+    readings = [(1, DAY, [110, 221, 0.5]), (1, 2 * DAY, [120, 222, 0.6]), (2, 0, [90, 219, 0.3])]
+    previewed = store.preview(readings)
+    assert len(store) == 1 and _state(store, 1)[0] == 1
+    store.commit(readings)
+    fresh = BulbStateStore()
+    fresh.observe(1, 0, [100, 220, 0.4])
+    for (bulb, ts, values), (avg, std, days) in zip(readings, previewed):
+        expected = fresh.observe(bulb, ts, values)
+        np.testing.assert_allclose(avg, expected[0])
+        np.testing.assert_allclose(std, expected[1])
+        assert days == expected[2]
+    assert _state(store, 1)[0] == 3 and len(store) == 2
+
+
+def test_failed_batch_retry_records_each_reading_once():
+    """A batch that fails is retried item by item; readings must not be recorded twice."""
+    store = BulbStateStore()
+
+    def score(items):
+        readings = [(1, ts, values) for ts, values in items]
+        features = store.preview(readings)
+        if len(items) > 1:
+            raise RuntimeError("model failed on the batch")
+        store.commit(readings)
+        return features
+
+    async def run():
+        batcher = MicroBatcher("test", score, max_wait_ms=50)
+        return await asyncio.gather(
+            batcher.submit((0, [100, 220, 0.4])),
+            batcher.submit((DAY, [100, 220, 0.4])),
+            batcher.submit((2 * DAY, [math.inf, 220, 0.4])),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert isinstance(results[2], ValueError)
+    count, mean, m2, last = _state(store, 1)
+    assert count == 2 and last == DAY
+    assert np.isfinite(mean).all() and np.isfinite(m2).all()
+    np.testing.assert_allclose(mean, [100, 220, 0.4])
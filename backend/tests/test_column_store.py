@@ -0,0 +1,32 @@
+# tests/test_column_store.py
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from models.column_store import ColumnStore
+from models.fast_search import FastTimestampSearch
+
+
+def test_append_adds_unknown_columns():
+    store = ColumnStore({'timestamp': np.array(['2024-01-01', '2024-01-02'], dtype='datetime64[ns]'),
+                         'bulb_number': np.array([1, 2])})
+    assert store.append({'timestamp': pd.Timestamp('2024-01-03'), 'bulb_number': 3, 'fault_type': 'Electrical'}) == 2
+    assert store.append({'timestamp': pd.Timestamp('2024-01-04'), 'score': 0.5}) == 3
+    frame = store.to_frame()
+    assert frame.columns.tolist() == ['timestamp', 'bulb_number', 'fault_type', 'score']
+    assert frame['fault_type'].tolist() == [None, None, 'Electrical', None]
+    np.testing.assert_array_equal(frame['score'], [np.nan, np.nan, np.nan, 0.5])
+    np.testing.assert_array_equal(frame['bulb_number'], [1, 2, 3, np.nan])
+    assert frame['timestamp'].iloc[3] == pd.Timestamp('2024-01-04')
+
+
+def test_search_add_entry_with_new_column():
+    searcher = FastTimestampSearch()
+    searcher.ingest(io.StringIO("timestamp,bulb_number\n2024-01-01 00:00:00,1\n2024-01-01 01:00:00,2\n"))
+    searcher.add_entry({'timestamp': '2024-01-01 02:00:00', 'bulb_number': 3, 'fault_type': 'Electrical'})
+    rows = searcher.rows(np.arange(3))
+    assert rows['fault_type'].tolist() == [None, None, 'Electrical']
+    idx, dist, _ = searcher.search_time("2024-01-01 02:00:00", k=1)
+    assert searcher.rows(idx)['fault_type'].iloc[0] == 'Electrical'
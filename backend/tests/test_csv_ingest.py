@@ -0,0 +1,16 @@
+# tests/test_csv_ingest.py
+
+import io
+
+from models.csv_ingest import read_csv_columns
+
+
+def test_format_mismatch_in_later_chunks_is_reported():
+    lines = ["timestamp,value"] + [f"2024-01-01 00:00:{i:02d},{i}" for i in range(10)]
+    lines[6] = "01/01/2024 00:00,5"   # second chunk, other layout
+    lines[9] = ",8"                   # missing timestamp
+    store, col, stats = read_csv_columns(io.StringIO("\n".join(lines)), 'timestamp', chunk_rows=4)
+    assert stats['chunks'] == 3
+    assert len(store) == stats['rows'] == 8
+    assert stats['dropped'] == 2 and stats['format_mismatch'] == 1
+    assert stats['rss_growth_bytes'] >= 0
@@ -0,0 +1,80 @@
+# tests/test_feature_kernels.py
+
+import os
+
+import numpy as np
+import pytest
+
+from models.energy_demand import FEATURES, build_feature_frame
+from models.feature_kernels import energy_feature_matrix, energy_feature_row, fault_feature_matrix, fault_feature_row
+
+try:
+    from models.fault_prediction import create_features_batch
+except FileNotFoundError as e:  # fault_prediction loads the fault models on import
+    create_features_batch, FAULT_MODELS_MISSING = None, os.path.basename(e.filename)
+else:
+    FAULT_MODELS_MISSING = None
+
+
+def _energy(timestamp, lag=412.5):
+    return {'timestamp': timestamp, 'lag_24h': lag, 'Temp': 7.3, 'RH': 81.0, 'FF': 4.2, 'P': 1013.6}
+
+
+@pytest.fixture
+def energy_payloads():
+    return [
+        _energy('2023-03-28 00:00'),
+        _energy('2023-03-28 23:00', lag=0.0),
+        _energy('2023-12-25 13:00'),        # Christmas, a Monday
+        _energy('2024-04-27T09:00'),        # King's Day, a Saturday
+        _energy('2024-06-09 18:00'),        # Sunday
+        _energy('2040-01-01 06:00'),        # outside the precomputed holiday years
+    ]
+
+
+def _fault(timestamp, condition='Clear', voltage=220.4, bulb=17):
+    return {
+        'bulb_number': bulb,
+        'timestamp': timestamp,
+        'power_consumption (Watts)': 61.8,
+        'voltage_levels (Volts)': voltage,
+        'current_fluctuations (Amperes)': 0.42,
+        'temperature (Celsius)': 29.5,
+        'current_fluctuations_env (Amperes)': 0.17,
+        'environmental_conditions': condition,
+    }
+
+
+@pytest.fixture
+def fault_rows():
+    return [
+        _fault('28/03/2023 16:28'),
+        _fault('2023-03-28 16:28:00', condition='Rainy'),
+        _fault('2024-06-08T23:59', condition='Cloudy', bulb=1),  # ISO with day <= 12 stays year-first
+        _fault('01/01/2024 00:00', voltage=0.0),  # power/voltage ratio falls back to 0
+        _fault('2023-12-31 12:30', condition='Foggy'),
+    ]
+
+
+def test_energy_row_matches_reference(energy_payloads):
+    for p in energy_payloads:
+        expected = build_feature_frame([p])[FEATURES].to_numpy(dtype=float)[0]
+        np.testing.assert_array_equal(energy_feature_row(p), expected, err_msg=str(p))
+
+
+def test_energy_matrix_matches_reference(energy_payloads):
+    expected = build_feature_frame(energy_payloads)[FEATURES].to_numpy(dtype=float)
+    np.testing.assert_array_equal(energy_feature_matrix(energy_payloads), expected)
+
+
+@pytest.mark.skipif(create_features_batch is None, reason=f"fault model {FAULT_MODELS_MISSING} not present")
+def test_fault_row_matches_reference(fault_rows):
+    for r in fault_rows:
+        expected = create_features_batch([r]).to_numpy(dtype=float)[0]
+        np.testing.assert_array_equal(fault_feature_row(r), expected, err_msg=str(r))
+
+
+@pytest.mark.skipif(create_features_batch is None, reason=f"fault model {FAULT_MODELS_MISSING} not present")
+def test_fault_matrix_matches_reference(fault_rows):
+    expected = create_features_batch(fault_rows).to_numpy(dtype=float)
+    np.testing.assert_array_equal(fault_feature_matrix(fault_rows), expected)
@@ -0,0 +1,99 @@
+# tests/test_lstm_numpy.py
+
+import json
+import math
+
+import h5py
+import numpy as np
+import pytest
+
+from models.lstm_numpy import NumpyLSTMModel
+
+STEPS, FEATURES = 6, 3
+
+
+def _write_h5(path, layers):
+    """A Sequential model in the legacy Keras HDF5 layout; ``layers`` is
+    ``[(class_name, config, {role: array})]``."""
+    config = {'class_name': 'Sequential', 'config': {'name': 'sequential', 'layers': [
+        {'class_name': 'InputLayer', 'config': {'name': 'input_layer', 'batch_shape': [None, STEPS, FEATURES]}}
+    ] + [{'class_name': kind, 'config': cfg} for kind, cfg, _ in layers]}}
+    with h5py.File(path, 'w') as f:
+        f.attrs['model_config'] = json.dumps(config)
+        root = f.create_group('model_weights')
+        for _, cfg, weights in layers:
+            group = root.create_group(cfg['name'])
+            names = [f"sequential/{cfg['name']}/cell/{role}" for role in weights]
+            for name, array in zip(names, weights.values()):
+                group[name] = array
+            group.attrs['weight_names'] = [n.encode() for n in names]
+
+
+def _reference_lstm(x, kernel, recurrent_kernel, bias, units):
+    """One sample, one gate and one unit at a time (Keras gate order i, f, c, o)."""
+    sig = lambda v: 1.0 / (1.0 + math.exp(-v))
+    h, c, outputs = [0.0] * units, [0.0] * units, []
+    for x_t in x:
+        z = [sum(x_t[k] * kernel[k, j] for k in range(len(x_t)))
+             + sum(h[k] * recurrent_kernel[k, j] for k in range(units)) + bias[j] for j in range(4 * units)]
+        c = [sig(z[units + j]) * c[j] + sig(z[j]) * math.tanh(z[2 * units + j]) for j in range(units)]
+        h = [sig(z[3 * units + j]) * math.tanh(c[j]) for j in range(units)]
+        outputs.append(h)
+    return np.array(outputs)
+
+
+@pytest.fixture
+def small_model(tmp_path):
+    rng = np.random.default_rng(0)
+    w = lambda *shape: rng.normal(scale=0.5, size=shape).astype(np.float32)
+    lstm1 = {'kernel': w(FEATURES, 16), 'recurrent_kernel': w(4, 16), 'bias': w(16)}
+    lstm2 = {'kernel': w(4, 12), 'recurrent_kernel': w(3, 12), 'bias': w(12)}
+    dense = {'kernel': w(3, 8), 'bias': w(8)}
+    out = {'kernel': w(8, 2), 'bias': w(2)}
+    path = tmp_path / 'lstm.h5'
+    _write_h5(path, [
+        ('LSTM', {'name': 'lstm_1', 'units': 4, 'return_sequences': True}, lstm1),
+        ('Dropout', {'name': 'dropout', 'rate': 0.2}, {}),
+        ('LSTM', {'name': 'lstm_2', 'units': 3}, lstm2),
+        ('Dense', {'name': 'dense', 'units': 8, 'activation': 'relu'}, dense),
+        ('Dense', {'name': 'out', 'units': 2}, out),
+    ])
+    return str(path), (lstm1, lstm2, dense, out)
+
+
+def test_matches_reference_recurrence(small_model):
+    path, (lstm1, lstm2, dense, out) = small_model
+    X = np.random.default_rng(1).normal(size=(5, STEPS, FEATURES)).astype(np.float32)
+    expected = []
+    for x in X.astype(np.float64):
+        seq = _reference_lstm(x, lstm1['kernel'], lstm1['recurrent_kernel'], lstm1['bias'], 4)
+        h = _reference_lstm(seq, lstm2['kernel'], lstm2['recurrent_kernel'], lstm2['bias'], 3)[-1]
+        hidden = np.maximum(h @ dense['kernel'] + dense['bias'], 0.0)
+        expected.append(hidden @ out['kernel'] + out['bias'])
+    model = NumpyLSTMModel.from_h5(path)
+    np.testing.assert_allclose(model(X), np.array(expected), rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(model(X[0]), model(X[:1]))  # a single (steps, features) sequence
+
+
+def test_unsupported_layer(tmp_path):
+    path = tmp_path / 'gru.h5'
+    _write_h5(path, [('GRU', {'name': 'gru', 'units': 2}, {'kernel': np.zeros((FEATURES, 6), np.float32)})])
+    with pytest.raises(NotImplementedError):
+        NumpyLSTMModel.from_h5(str(path))
+
+
+def test_matches_keras(tmp_path):
+    keras = pytest.importorskip('keras')
+    pytest.importorskip('tensorflow')
+    model = keras.Sequential([
+        keras.Input(shape=(STEPS, FEATURES)),
+        keras.layers.LSTM(8, return_sequences=True),
+        keras.layers.Dropout(0.2),
+        keras.layers.LSTM(4),
+        keras.layers.Dense(4, activation='relu'),
+        keras.layers.Dense(1),
+    ])
+    path = str(tmp_path / 'keras_lstm.h5')
+    model.save(path)
+    X = np.random.default_rng(2).normal(size=(16, STEPS, FEATURES)).astype(np.float32)
+    np.testing.assert_allclose(NumpyLSTMModel.from_h5(path)(X), np.asarray(model(X)), rtol=1e-4, atol=1e-5)
@@ -0,0 +1,59 @@
+# tests/test_model_registry.py
+
+import os
+
+import joblib
+import pytest
+
+from models.model_registry import ModelRegistry
+
+
+class _CountingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        with open(path) as f:
+            text = f.read()
+        if text == 'broken':
+            raise ModuleNotFoundError("No module named 'lightgbm'")
+        return text
+
+
+def _write(path, text, mtime_ns):
+    with open(path, 'w') as f:
+        f.write(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_failed_load_is_not_retried_until_the_file_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'model.joblib')
+    _write(path, 'broken', 10**18)
+    loader = _CountingLoader()
+    registry = ModelRegistry(check_interval=0)
+    registry.register('m', path, loader)
+    hashed = []
+    monkeypatch.setattr('models.model_registry._file_sha1', lambda p: hashed.append(p) or 'sha')
+
+    for _ in range(3):
+        with pytest.raises(ModuleNotFoundError):
+            registry.get('m')
+        assert registry.get_all() == {}
+    assert loader.calls == 1 and len(hashed) == 1
+    assert 'lightgbm' in registry.stats()['m']['error']
+
+    _write(path, 'fixed!', 2 * 10**18)
+    assert registry.get('m') == 'fixed!'
+    assert loader.calls == 2
+    assert registry.stats()['m']['loaded']
+
+
+def test_missing_file(tmp_path):
+    registry = ModelRegistry(check_interval=0)
+    registry.register('m', str(tmp_path / 'missing.joblib'))
+    with pytest.raises(FileNotFoundError):
+        registry.get('m')
+    assert registry.get_all() == {}
+    joblib.dump({'a': 1}, str(tmp_path / 'missing.joblib'))
+    assert registry.get('m') == {'a': 1}
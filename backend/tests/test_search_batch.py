@@ -0,0 +1,33 @@
+# tests/test_search_batch.py
+
+import io
+
+import numpy as np
+import pytest
+
+from models.fast_search import FastTimestampSearch
+
+CSV = "timestamp,value\n" + "".join(f"2024-02-{day:02d} {hour:02d}:00:00,{hour}\n"
+                                    for day in range(1, 4) for hour in range(24))
+
+
+@pytest.fixture(scope='module')
+def searcher():
+    s = FastTimestampSearch()
+    s.ingest(io.StringIO(CSV))
+    return s
+
+
+@pytest.mark.parametrize('backend', ['sorted', 'balltree'])
+def test_mixed_formats_match_single_searches(searcher, backend):
+    queries = ["2024-02-02 05:10:00", "02/03/2024 07:40", "2024-02-01T23:59:00", "Feb 2 2024 11:29"]
+    offsets, idx, dist, _ = searcher.search_batch(queries, k=2, backend=backend)
+    for i, q in enumerate(queries):
+        expected_idx, expected_dist, _ = searcher.search(q, k=2, backend=backend)
+        np.testing.assert_array_equal(idx[offsets[i]:offsets[i + 1]], expected_idx)
+        np.testing.assert_allclose(dist[offsets[i]:offsets[i + 1]], expected_dist)
+
+
+def test_invalid_timestamp_positions(searcher):
+    with pytest.raises(ValueError, match=r"\[1, 3\]"):
+        searcher.search_batch(["2024-02-02 05:10:00", "not a time", "02/03/2024 07:40", None], k=1)
@@ -0,0 +1,107 @@
+# tests/test_search_snapshot.py
+
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from models.fast_search import FastTimestampSearch
+from models.search_snapshot import SnapshotError, load_snapshot
+
+CSV = "timestamp,bulb_number,environmental_conditions,value\n" + "".join(
+    f"2024-01-{day:02d} {hour:02d}:00:00,{hour % 3},{'Rainy' if hour % 2 else 'Clear'},{day * hour}\n"
+    for day in range(1, 4) for hour in range(24)
+)
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    searcher = FastTimestampSearch()
+    searcher.ingest(io.StringIO(CSV))
+    return os.path.dirname(searcher.save_snapshot(str(tmp_path)))
+
+
+def _current(root):
+    with open(os.path.join(root, 'CURRENT')) as f:
+        return os.path.join(root, f.read().strip())
+
+
+def test_round_trip(snapshot_dir):
+    restored = FastTimestampSearch()
+    assert restored.load_snapshot(snapshot_dir)
+    assert restored.index.n == 72
+    idx, dist, _ = restored.search_time("2024-01-02 05:10:00", k=1)
+    assert str(restored.rows(idx)['timestamp'].iloc[0]) == "2024-01-02 05:00:00"
+    assert dist[0] == 600
+
+
+@pytest.mark.parametrize('key', ['rows', 'n_tree', 'timestamp_col', 'version', 'columns'])
+def test_missing_meta_key(snapshot_dir, key):
+    path = os.path.join(_current(snapshot_dir), 'meta.json')
+    with open(path) as f:
+        meta = json.load(f)
+    del meta[key]
+    with open(path, 'w') as f:
+        json.dump(meta, f)
+    with pytest.raises(SnapshotError, match=key):
+        load_snapshot(snapshot_dir)
+
+
+def test_broken_column_schema(snapshot_dir):
+    path = os.path.join(_current(snapshot_dir), 'meta.json')
+    with open(path) as f:
+        meta = json.load(f)
+    del meta['columns'][0]['kind']
+    with open(path, 'w') as f:
+        json.dump(meta, f)
+    with pytest.raises(SnapshotError):
+        load_snapshot(snapshot_dir)
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'garbage'])
+def test_unreadable_tree(snapshot_dir, damage):
+    path = os.path.join(_current(snapshot_dir), 'tree.joblib')
+    if damage == 'truncate':
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) // 2)
+    else:
+        with open(path, 'wb') as f:
+            f.write(b"not a pickle")
+    with pytest.raises(SnapshotError):
+        load_snapshot(snapshot_dir)
+
+
+def _snapshot_entries(root):
+    return sorted(d for d in os.listdir(root) if d not in ('CURRENT', '.lock'))
+
+
+def test_concurrent_saves_get_distinct_versions(tmp_path):
+    # Separate searchers, as in separate workers: only the lock file orders their saves.
+    searchers = [FastTimestampSearch() for _ in range(8)]
+    for searcher in searchers:
+        searcher.ingest(io.StringIO(CSV))
+    root = str(tmp_path)
+    with ThreadPoolExecutor(8) as pool:
+        saved = list(pool.map(lambda searcher: searcher.save_snapshot(root), searchers))
+    assert len(set(saved)) == 8
+    assert _snapshot_entries(root) == ['v000007', 'v000008']  # KEEP_VERSIONS = 2, no temp dirs left
+
+
+def test_failed_save_removes_temp_dir(tmp_path, monkeypatch):
+    searcher = FastTimestampSearch()
+    searcher.ingest(io.StringIO(CSV))
+    monkeypatch.setattr('models.search_snapshot.joblib.dump', lambda *a: (_ for _ in ()).throw(OSError("disk full")))
+    with pytest.raises(OSError):
+        searcher.save_snapshot(str(tmp_path))
+    assert _snapshot_entries(str(tmp_path)) == []
+
+
+def test_keep_zero_keeps_the_current_version(snapshot_dir, monkeypatch):
+    monkeypatch.setattr('models.search_snapshot.KEEP_VERSIONS', 0)
+    searcher = FastTimestampSearch()
+    searcher.ingest(io.StringIO(CSV))
+    searcher.save_snapshot(snapshot_dir)
+    assert _snapshot_entries(snapshot_dir) == ['v000002']
+    assert load_snapshot(snapshot_dir) is not None
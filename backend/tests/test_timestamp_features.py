@@ -0,0 +1,38 @@
+# tests/test_timestamp_features.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.timestamp_features import TIMESTAMP_FEATURES, timestamp_features
+
+WEEK = TIMESTAMP_FEATURES.index('iso_week')
+
+
+@pytest.mark.parametrize('day, week', [
+    ('2015-12-31', 53), ('2016-01-01', 53), ('2016-01-03', 53), ('2016-01-04', 1),
+    ('2020-12-31', 53), ('2021-01-01', 53), ('2021-01-03', 53), ('2021-01-04', 1),
+    ('2026-12-31', 53), ('2027-01-01', 53), ('2027-01-03', 53), ('2027-01-04', 1),
+    ('2018-12-31', 1), ('2019-12-30', 1), ('2024-12-30', 1), ('2022-01-02', 52),
+])
+def test_iso_week_year_boundaries(day, week):
+    assert timestamp_features([f"{day} 12:00:00"])[0, WEEK] == week
+
+
+def test_iso_week_matches_isocalendar_every_day():
+    days = pd.date_range('1999-12-20', '2031-01-10', freq='D')
+    expected = np.array([d.isocalendar().week for d in days])
+    assert np.array_equal(timestamp_features(days)[:, WEEK], expected)
+
+
+def test_matches_per_timestamp_loop():
+    from benchmarks.timestamp_features import _loop_features
+    stamps = pd.Series(pd.date_range('2014-12-25', '2027-01-08', freq='17h'))
+    assert np.array_equal(timestamp_features(stamps, chunk_rows=1000), _loop_features(stamps))
+    tz = pd.Series(pd.date_range('2020-12-25', periods=500, freq='7h', tz='Europe/Amsterdam'))
+    assert np.array_equal(timestamp_features(tz), _loop_features(tz))
+
+
+def test_invalid_timestamps_give_zero_rows():
+    out = timestamp_features(['2021-01-01 00:00:00', 'not a date'])
+    assert out[0].any() and not out[1].any()
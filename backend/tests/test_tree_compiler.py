@@ -0,0 +1,105 @@
+# tests/test_tree_compiler.py
+
+import numpy as np
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import (ExtraTreesClassifier, GradientBoostingClassifier, GradientBoostingRegressor,
+                              RandomForestClassifier, RandomForestRegressor)
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from models.tree_compiler import CompiledPipeline, CompiledTrees, compile_model
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6))
+    X[:, 0] = rng.integers(0, 8, 300)  # category-like column for the pipelines
+    y_reg = X[:, 1] * 2 + np.sin(X[:, 2]) + rng.normal(scale=0.1, size=300)
+    y_bin = (X[:, 1] + X[:, 3] > 0).astype(int)
+    y_multi = np.digitize(X[:, 1] + X[:, 4], [-1, 0, 1])
+    return X, y_reg, y_bin, y_multi
+
+
+def _assert_same(model, compiled, X):
+    # atol covers XGBoost, which sums its leaves in float32.
+    if getattr(compiled, 'classes_', None) is not None:
+        np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=1e-6, atol=1e-6)
+        np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+    else:
+        np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=1e-6, atol=1e-6)
+
+
+@pytest.mark.parametrize('make, target', [
+    (lambda: RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0), 'reg'),
+    (lambda: RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0), 'bin'),
+    (lambda: RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0), 'multi'),
+    (lambda: ExtraTreesClassifier(n_estimators=10, random_state=0), 'multi'),
+    (lambda: GradientBoostingRegressor(n_estimators=20, random_state=0), 'reg'),
+    (lambda: GradientBoostingClassifier(n_estimators=20, random_state=0), 'bin'),
+    (lambda: GradientBoostingClassifier(n_estimators=20, random_state=0), 'multi'),
+])
+def test_sklearn_ensembles(data, make, target):
+    X, y_reg, y_bin, y_multi = data
+    y = {'reg': y_reg, 'bin': y_bin, 'multi': y_multi}[target]
+    model = make().fit(X, y)
+    compiled = compile_model(model)
+    assert isinstance(compiled, CompiledTrees)
+    _assert_same(model, compiled, X)
+
+
+@pytest.mark.parametrize('target', ['reg', 'bin', 'multi'])
+def test_xgboost_with_missing_values(data, target):
+    xgb = pytest.importorskip('xgboost')
+    X, y_reg, y_bin, y_multi = data
+    X = X.copy()
+    X[::7, 2] = np.nan
+    if target == 'reg':
+        model = xgb.XGBRegressor(n_estimators=20, max_depth=4).fit(X, y_reg)
+    else:
+        model = xgb.XGBClassifier(n_estimators=20, max_depth=4).fit(X, y_bin if target == 'bin' else y_multi)
+    _assert_same(model, compile_model(model), X)
+
+
+@pytest.mark.parametrize('target', ['reg', 'bin', 'multi'])
+def test_lightgbm(data, target):
+    lgb = pytest.importorskip('lightgbm')
+    X, y_reg, y_bin, y_multi = data
+    params = dict(n_estimators=20, num_leaves=8, min_child_samples=5, verbose=-1)
+    if target == 'reg':
+        model = lgb.LGBMRegressor(**params).fit(X, y_reg)
+    else:
+        model = lgb.LGBMClassifier(**params).fit(X, y_bin if target == 'bin' else y_multi)
+    _assert_same(model, compile_model(model), X)
+
+
+def _pipeline(final):
+    # One-hot output over many bulbs is sparse, as in the fault models.
+    pre = ColumnTransformer([('num', StandardScaler(), [1, 2, 3, 4, 5]),
+                             ('cat', OneHotEncoder(handle_unknown='ignore'), [0])], sparse_threshold=1.0)
+    return Pipeline([('preprocessor', pre), ('classifier', final)])
+
+
+@pytest.mark.parametrize('make', [
+    lambda: GradientBoostingClassifier(n_estimators=20, random_state=0),
+    lambda: RandomForestClassifier(n_estimators=10, random_state=0),
+    lambda: pytest.importorskip('xgboost').XGBClassifier(n_estimators=20, max_depth=4),
+])
+def test_pipeline_compiles_final_estimator(data, make):
+    X, _, _, y_multi = data
+    model = _pipeline(make()).fit(X, y_multi)
+    compiled = compile_model(model)
+    assert isinstance(compiled, CompiledPipeline)
+    X_new = X.copy()
+    X_new[:20, 0] = 99  # unseen category: an all-zero one-hot block
+    _assert_same(model, compiled, X_new)
+
+
+def test_unsupported_model_raises(data):
+    X, _, y_bin, _ = data
+    with pytest.raises(NotImplementedError):
+        compile_model(LogisticRegression().fit(X, y_bin))
+    with pytest.raises(NotImplementedError):
+        compile_model(_pipeline(LogisticRegression()).fit(X, y_bin))